@@ -3,12 +3,23 @@ Servidor local para o App Web Tubulão Térmico.
 Serve o frontend estático e a API de otimização (mesma lógica do backend/main.py).
 Uso: python server_local.py  →  http://localhost:5000
 """
+import io
 import json
+import logging
 import os
-from flask import Flask, request, send_from_directory
+import time
+from flask import Flask, Response, request, send_from_directory, stream_with_context
 from flask_cors import CORS
 
-from backend.main import run_otimizacao, run_curva
+from backend.main import (
+    run_otimizacao, run_curva, run_campo, otimizar_lote, run_otimizacao_conjunta, varredura, juntar_varredura, ler_csv,
+    METRICAS, CACHE_GRADE, RESULTADOS, VARREDURA_STREAM_MIN, ARQUIVO, caracteristicas_curva, DEFAULT_T_INI, DEFAULT_A
+)
+from backend.jobs import JOBS, FilaCheia
+from backend.sessoes import SESSOES
+
+# Saída de depuração (passos do least_squares, diagnósticos do ajuste) só com LOG_LEVEL=DEBUG
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING").upper())
 
 app = Flask(__name__, static_folder="static", static_url_path="")
 CORS(app)
@@ -23,6 +34,16 @@ def handle_exception(e):
     return {"error": str(e)}, 500
 
 
+def _cabecalhos_cache(status):
+    """X-Cache (HIT, MISS ou BYPASS), X-Cache-Camada (memoria, disco) e X-Cache-Chave."""
+    if not status.get("chave"):
+        return {"X-Cache": "BYPASS"}
+    cab = {"X-Cache": "HIT" if status["camada"] else "MISS", "X-Cache-Chave": status["chave"]}
+    if status["camada"]:
+        cab["X-Cache-Camada"] = status["camada"]
+    return cab
+
+
 @app.route("/")
 def index():
     return send_from_directory(app.static_folder, "index.html")
@@ -33,11 +54,44 @@ def static_files(path):
     return send_from_directory(app.static_folder, path)
 
 
+_TIPOS_CSV = ("text/csv", "text/plain", "application/csv")
+
+
+def _otimizar_csv(linhas, opcoes):
+    """Lê o CSV em streaming (com a decimação pedida) e roda a regressão.
+
+    opcoes (query string ou campos do formulário): config e chute em JSON, separador, colunas ("0,1"),
+    passo, intervalo_min (h) e max_pontos.
+    """
+    try:
+        config = json.loads(opcoes.get("config") or "null")
+        chute = json.loads(opcoes.get("chute") or "null")
+        colunas = [int(c) for c in opcoes.get("colunas", "0,1").split(",")]
+        tempos, temperaturas, resumo = ler_csv(
+            linhas, separador=opcoes.get("separador") or None, colunas=colunas,
+            passo=int(opcoes.get("passo", 1)), intervalo_min=float(opcoes.get("intervalo_min", 0)),
+            max_pontos=int(opcoes["max_pontos"]) if opcoes.get("max_pontos") else None)
+    except (ValueError, TypeError) as e:
+        return {"error": f"Opções de CSV inválidas: {e}"}, 400
+    if len(tempos) < 2:
+        return {"error": "CSV inválido ou sem dados numéricos.", "csv": resumo}, 400
+
+    status = {}
+    out = run_otimizacao(tempos, temperaturas, chute=chute, config=config, status_cache=status)
+    if "error" in out:
+        return out, 400
+    out["csv"] = resumo
+    out["t_dados"], out["T_dados"] = tempos.tolist(), temperaturas.tolist()
+    return out, 200, _cabecalhos_cache(status)
+
+
 @app.route("/api/otimizar", methods=["POST"])
 def api_otimizar():
-    """Recebe JSON com tempos e temperaturas; devolve parâmetros e pontos do gráfico."""
+    """Recebe JSON com tempos e temperaturas (ou o CSV cru, Content-Type text/csv); devolve parâmetros e pontos do gráfico."""
     if request.method != "POST":
         return {"error": "Método não permitido"}, 405
+    if request.mimetype in _TIPOS_CSV:
+        return _otimizar_csv(io.BufferedReader(request.stream), request.args)
     try:
         data = request.get_json(force=True, silent=True) or {}
     except Exception:
@@ -51,12 +105,225 @@ def api_otimizar():
     if not tempos or not temperaturas:
         return {"error": "Envie 'tempos' e 'temperaturas' no corpo da requisição."}, 400
 
-    out = run_otimizacao(tempos, temperaturas, chute=chute, config=config)
+    status = {}
+    out = run_otimizacao(tempos, temperaturas, chute=chute, config=config, status_cache=status)
+    if "error" in out:
+        return out, 400
+    return out, 200, _cabecalhos_cache(status)
+
+
+@app.route("/api/otimizar_csv", methods=["POST"])
+def api_otimizar_csv():
+    """Upload de CSV: multipart com o arquivo em 'arquivo' e as opções de _otimizar_csv nos campos, ou o CSV cru no corpo."""
+    arquivo = request.files.get("arquivo")
+    if arquivo is not None:
+        return _otimizar_csv(arquivo.stream, request.form)
+    return _otimizar_csv(io.BufferedReader(request.stream), request.args)
+
+
+@app.route("/api/otimizar_conjunto", methods=["POST"])
+def api_otimizar_conjunto():
+    """Ajuste conjunto com cinética compartilhada. Corpo: { series: [{id?, tempos, temperaturas, config?}], chute?, config? }."""
+    data = request.get_json(force=True, silent=True) or {}
+    series = data.get("series")
+    if not isinstance(series, list) or not series:
+        return {"error": "Envie 'series' (lista de {tempos, temperaturas, config?})."}, 400
+    out = run_otimizacao_conjunta(series, chute=data.get("chute"), config=data.get("config"))
     if "error" in out:
         return out, 400
     return out
 
 
+@app.route("/api/otimizar_lote", methods=["POST"])
+def api_otimizar_lote():
+    """Ajusta vários conjuntos em paralelo. Corpo: { conjuntos: [{id?, tempos, temperaturas, chute?, config?}], config? }.
+
+    Responde em NDJSON: uma linha por conjunto assim que o ajuste termina (com 'indice' e 'id'),
+    e uma linha final com 'resumo'.
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    conjuntos = data.get("conjuntos")
+    if not isinstance(conjuntos, list) or not conjuntos:
+        return {"error": "Envie 'conjuntos' (lista de {tempos, temperaturas, config?})."}, 400
+
+    def linhas():
+        for item in otimizar_lote(conjuntos, config=data.get("config")):
+            yield json.dumps(item) + "\n"
+
+    return Response(stream_with_context(linhas()), mimetype="application/x-ndjson",
+                    headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"})
+
+
+@app.route("/api/sweep", methods=["POST"])
+def api_sweep():
+    """Varredura de parâmetros para estudos de projeto.
+
+    Corpo: { base?, config?, grade: {eixo: [valores]} | combinacoes: [{eixo: valor}], tempos?, saida?, stream? }.
+    Eixos: os 9 parâmetros, "params" (vetor completo), "diametro", "raio" e "T_ini". saida "metricas"
+    (padrão: T_pico, t_pico, taxa_max, t_taxa_max) ou "curvas". Com stream (ou respostas grandes)
+    responde em NDJSON: cabeçalho, um bloco em colunas por linha (com 'indices') e o resumo.
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    if not data.get("grade") and not data.get("combinacoes"):
+        return {"error": "Envie 'grade' ({eixo: [valores]}) ou 'combinacoes' ([{eixo: valor}])."}, 400
+    try:
+        cabecalho, blocos = varredura(data)
+    except (ValueError, TypeError) as e:
+        return {"error": str(e)}, 400
+    valores = cabecalho["n"] * (len(cabecalho["tempos"]) if "tempos" in cabecalho else 5)
+    if not data.get("stream", valores > VARREDURA_STREAM_MIN):
+        return juntar_varredura(cabecalho, blocos)
+
+    def linhas():
+        t0 = time.perf_counter()
+        yield json.dumps({"cabecalho": cabecalho}) + "\n"
+        n_blocos = 0
+        for bloco in blocos:
+            n_blocos += 1
+            yield json.dumps(bloco) + "\n"
+        yield json.dumps({"resumo": {"n": cabecalho["n"], "blocos": n_blocos, "tempo_s": time.perf_counter() - t0}}) + "\n"
+
+    return Response(stream_with_context(linhas()), mimetype="application/x-ndjson",
+                    headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"})
+
+
+@app.route("/api/jobs", methods=["POST"])
+def api_jobs_criar():
+    """Enfileira uma regressão (mesmo corpo de /api/otimizar) e devolve 202 com o id do job; 429 se a fila estiver cheia."""
+    data = request.get_json(force=True, silent=True) or {}
+    tempos = data.get("tempos", [])
+    temperaturas = data.get("temperaturas", [])
+    if not tempos or not temperaturas:
+        return {"error": "Envie 'tempos' e 'temperaturas' no corpo da requisição."}, 400
+    try:
+        job_id = JOBS.submeter(tempos, temperaturas, chute=data.get("chute"), config=data.get("config"))
+    except FilaCheia as e:
+        return {"error": f"Servidor ocupado: {e}."}, 429, {"Retry-After": "10"}
+    return JOBS.estado(job_id), 202, {"Location": f"/api/jobs/{job_id}"}
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def api_jobs_estado(job_id):
+    """Status (fila, executando, concluido, erro, cancelado) e progresso: passo, iteração e custo atual."""
+    out = JOBS.estado(job_id)
+    if out is None:
+        return {"error": "Job não encontrado."}, 404
+    return out
+
+
+@app.route("/api/jobs/<job_id>/resultado", methods=["GET"])
+def api_jobs_resultado(job_id):
+    """Resultado do ajuste (como em /api/otimizar); 409 enquanto o job não estiver concluído."""
+    estado = JOBS.estado(job_id)
+    if estado is None:
+        return {"error": "Job não encontrado."}, 404
+    out = JOBS.resultado(job_id)
+    if out is None:
+        return estado, 409
+    return out
+
+
+@app.route("/api/jobs/<job_id>", methods=["DELETE"])
+def api_jobs_cancelar(job_id):
+    """Cancela o job (na fila: imediatamente; em execução: na próxima iteração do ajuste)."""
+    out = JOBS.cancelar(job_id)
+    if out is None:
+        return {"error": "Job não encontrado."}, 404
+    return out
+
+
+@app.route("/api/sessoes", methods=["POST"])
+def api_sessoes_criar():
+    """Registra uma concretagem para monitoramento. Corpo: { config?, tempos?, temperaturas? }."""
+    data = request.get_json(force=True, silent=True) or {}
+    sessao = SESSOES.criar(data.get("config"))
+    if data.get("tempos"):
+        out = SESSOES.anexar(sessao.id, data["tempos"], data.get("temperaturas", []))
+        if "error" in out:
+            return out, 400
+    return sessao.resumo(), 201, {"Location": f"/api/sessoes/{sessao.id}"}
+
+
+@app.route("/api/sessoes/<sessao_id>/leituras", methods=["POST"])
+def api_sessoes_leituras(sessao_id):
+    """Acrescenta leituras { tempos, temperaturas, reajustar? } e devolve o reajuste a quente."""
+    data = request.get_json(force=True, silent=True) or {}
+    if not data.get("tempos") or not data.get("temperaturas"):
+        return {"error": "Envie 'tempos' e 'temperaturas' no corpo da requisição."}, 400
+    out = SESSOES.anexar(sessao_id, data["tempos"], data["temperaturas"], reajustar=data.get("reajustar", True))
+    if out is None:
+        return {"error": "Sessão não encontrada."}, 404
+    if "error" in out:
+        return out, 400
+    return out
+
+
+@app.route("/api/sessoes/<sessao_id>", methods=["GET"])
+def api_sessoes_estado(sessao_id):
+    """Resumo da sessão e o último ajuste."""
+    sessao = SESSOES.obter(sessao_id)
+    if sessao is None:
+        return {"error": "Sessão não encontrada."}, 404
+    return {**sessao.resumo(), "resultado": sessao.resultado}
+
+
+@app.route("/api/sessoes/<sessao_id>", methods=["DELETE"])
+def api_sessoes_remover(sessao_id):
+    if not SESSOES.remover(sessao_id):
+        return {"error": "Sessão não encontrada."}, 404
+    return {"id": sessao_id, "removida": True}
+
+
+def _sem_arquivo():
+    return {"error": "Arquivo de ajustes desligado (defina ARQUIVO_AJUSTES)."}, 503
+
+
+@app.route("/api/ajustes", methods=["GET"])
+def api_ajustes_listar():
+    """Ajustes arquivados, mais recentes primeiro. Query: limite, deslocamento, rotulo, <caracteristica>_min/_max."""
+    if not ARQUIVO.ativo:
+        return _sem_arquivo()
+    filtros = {k: v for k, v in request.args.items() if k not in ("limite", "deslocamento")}
+    try:
+        return ARQUIVO.listar(filtros, int(request.args.get("limite", 100)), int(request.args.get("deslocamento", 0)))
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+
+@app.route("/api/ajustes/vizinhos", methods=["POST"])
+def api_ajustes_vizinhos():
+    """Ajustes arquivados mais parecidos com uma curva. Corpo: { tempos, temperaturas, config?, k? }."""
+    if not ARQUIVO.ativo:
+        return _sem_arquivo()
+    data = request.get_json(force=True, silent=True) or {}
+    tempos, temperaturas = data.get("tempos") or [], data.get("temperaturas") or []
+    if not tempos or len(tempos) != len(temperaturas):
+        return {"error": "Envie 'tempos' e 'temperaturas' do mesmo tamanho."}, 400
+    cfg = data.get("config") or {}
+    a = float(cfg["diametro"]) / 2.0 if "diametro" in cfg else float(cfg.get("raio", DEFAULT_A))
+    carac = caracteristicas_curva(tempos, temperaturas, float(cfg.get("T_ini", DEFAULT_T_INI)), a)
+    return {"caracteristicas": carac, "vizinhos": ARQUIVO.vizinhos(carac, int(data.get("k", 5)))}
+
+
+@app.route("/api/ajustes/<int:ajuste_id>", methods=["GET"])
+def api_ajustes_obter(ajuste_id):
+    if not ARQUIVO.ativo:
+        return _sem_arquivo()
+    out = ARQUIVO.obter(ajuste_id)
+    if out is None:
+        return {"error": "Ajuste não encontrado."}, 404
+    return out
+
+
+@app.route("/api/ajustes/<int:ajuste_id>", methods=["DELETE"])
+def api_ajustes_remover(ajuste_id):
+    if not ARQUIVO.ativo:
+        return _sem_arquivo()
+    if not ARQUIVO.remover(ajuste_id):
+        return {"error": "Ajuste não encontrado."}, 404
+    return {"id": ajuste_id, "removido": True}
+
+
 @app.route("/api/curva", methods=["POST"])
 def api_curva():
     """Gera apenas a curva T x t. Corpo: { params, config?, tempos? }."""
@@ -69,10 +336,33 @@ def api_curva():
     params = data.get("params", [])
     if not params:
         return {"error": "Envie 'params' (lista de 9 parâmetros)."}, 400
-    out = run_curva(params, config=data.get("config"), tempos=data.get("tempos"))
+    status = {}
+    out = run_curva(params, config=data.get("config"), tempos=data.get("tempos"), status_cache=status)
     if "error" in out:
         return out, 400
-    return out
+    return out, 200, _cabecalhos_cache(status)
+
+
+@app.route("/api/campo", methods=["POST"])
+def api_campo():
+    """Campo T(r, t) no concreto e no solo. Corpo: { params, config?, tempos?, raios? }."""
+    data = request.get_json(force=True, silent=True) or {}
+    params = data.get("params", [])
+    if not params:
+        return {"error": "Envie 'params' (lista de 9 parâmetros)."}, 400
+    status = {}
+    out = run_campo(params, config=data.get("config"), tempos=data.get("tempos"), raios=data.get("raios"),
+                    status_cache=status)
+    if "error" in out:
+        return out, 400
+    return out, 200, _cabecalhos_cache(status)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Totais de execuções, tempos por fase e contadores de kernel desde o início do processo."""
+    return {"operacoes": METRICAS.resumo(), "cache_grade": CACHE_GRADE.estatisticas(),
+            "cache_resultados": RESULTADOS.estatisticas()}
 
 
 if __name__ == "__main__":
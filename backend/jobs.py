@@ -0,0 +1,138 @@
+"""
+Jobs assíncronos de regressão: fila local no processo, pool limitado e progresso do least_squares.
+
+POST cria o job e devolve o id; o ajuste roda no pool de processos compartilhado (get_pool) ou,
+sem pool (POOL_WORKERS <= 1), numa thread. O progresso (passo, iteração, custo) vem do callback
+dos least_squares e é publicado num dicionário compartilhado com os workers; o cancelamento de um
+job em execução é pedido pelo mesmo caminho e interrompe o ajuste na iteração seguinte.
+Sem broker externo: o estado vive no processo do servidor (gunicorn com um único worker).
+"""
+import os
+import threading
+import time
+import uuid
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.main import run_otimizacao, acompanhar, AjusteCancelado, get_pool, POOL_WORKERS
+
+JOBS_MAX = int(os.environ.get("JOBS_MAX", 2 * max(POOL_WORKERS, 1)))  # na fila + em execução
+JOBS_TTL_S = float(os.environ.get("JOBS_TTL_S", 3600))  # jobs terminados ficam consultáveis por este tempo
+
+
+class FilaCheia(Exception):
+    """Admissão recusada: já há JOBS_MAX jobs na fila ou em execução."""
+
+
+def _executar(args):
+    """Roda no worker: run_otimizacao publicando o progresso e checando o pedido de cancelamento."""
+    job_id, progresso, cancelados, tempos, temperaturas, chute, config = args
+
+    def reportar(info):
+        progresso[job_id] = info
+        return job_id in cancelados
+
+    progresso[job_id] = {"passo": None, "iteracao": 0, "custo": None, "nfev": 0}
+    with acompanhar(reportar):
+        return run_otimizacao(tempos, temperaturas, chute=chute, config=config)
+
+
+class Job:
+    def __init__(self, job_id, futuro):
+        self.id = job_id
+        self.futuro = futuro
+        self.criado = time.time()
+        self.terminado = None
+        self.progresso = None  # último progresso, guardado quando o job termina
+
+
+class GerenciadorJobs:
+    """Jobs de run_otimizacao com admissão limitada, progresso, resultado e cancelamento."""
+
+    def __init__(self, max_ativos=JOBS_MAX, ttl_s=JOBS_TTL_S):
+        self.max_ativos = max_ativos
+        self.ttl_s = ttl_s
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _iniciar(self):
+        # Com pool de processos, progresso e cancelamentos passam por dicionários de um Manager
+        if self._executor is None:
+            pool = get_pool()
+            if pool is None:
+                self._executor, self._progresso, self._cancelados = ThreadPoolExecutor(1), {}, {}
+            else:
+                gerente = multiprocessing.get_context("spawn").Manager()
+                self._gerente = gerente
+                self._executor, self._progresso, self._cancelados = pool, gerente.dict(), gerente.dict()
+
+    def _limpar(self):
+        agora = time.time()
+        for job_id in [j.id for j in self._jobs.values() if j.terminado and agora - j.terminado > self.ttl_s]:
+            del self._jobs[job_id]
+
+    def submeter(self, tempos, temperaturas, chute=None, config=None):
+        """Enfileira um ajuste e devolve o id; FilaCheia se já houver max_ativos jobs pendentes."""
+        with self._lock:
+            self._iniciar()
+            self._limpar()
+            if sum(not j.futuro.done() for j in self._jobs.values()) >= self.max_ativos:
+                raise FilaCheia(f"{self.max_ativos} jobs na fila ou em execução")
+            job_id = uuid.uuid4().hex
+            futuro = self._executor.submit(_executar, (job_id, self._progresso, self._cancelados,
+                                                       tempos, temperaturas, chute, config))
+            job = self._jobs[job_id] = Job(job_id, futuro)
+        futuro.add_done_callback(lambda _: self._terminar(job))
+        return job_id
+
+    def _terminar(self, job):
+        job.progresso = self._progresso.pop(job.id, None)
+        self._cancelados.pop(job.id, None)
+        job.terminado = time.time()
+
+    def _status(self, job):
+        f = job.futuro
+        if f.cancelled():
+            return "cancelado"
+        if not f.done():
+            return "executando" if job.id in self._progresso else "fila"
+        erro = f.exception()
+        if isinstance(erro, AjusteCancelado):
+            return "cancelado"
+        if erro is not None or "error" in f.result():
+            return "erro"
+        return "concluido"
+
+    def estado(self, job_id):
+        """Status, progresso (passo, iteração, custo) e tempos do job; None se não existir."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        status = self._status(job)
+        progresso = job.progresso if job.terminado else self._progresso.get(job_id)
+        out = {"id": job_id, "status": status, "progresso": progresso, "criado": job.criado,
+               "terminado": job.terminado}
+        if status == "erro":
+            erro = job.futuro.exception()
+            out["error"] = str(erro) if erro is not None else job.futuro.result()["error"]
+        return out
+
+    def resultado(self, job_id):
+        """Resposta de run_otimizacao de um job concluído (None enquanto não terminou)."""
+        job = self._jobs.get(job_id)
+        if job is None or not job.futuro.done() or self._status(job) != "concluido":
+            return None
+        return job.futuro.result()
+
+    def cancelar(self, job_id):
+        """Cancela um job na fila na hora; um em execução para na próxima iteração do least_squares."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if not job.futuro.cancel() and not job.futuro.done():
+            self._cancelados[job_id] = True
+        return self.estado(job_id)
+
+
+JOBS = GerenciadorJobs()
@@ -2,13 +2,33 @@
 Backend App Web Tubulão Térmico - MVP 9 Parâmetros (2 Passos + k_rel)
 """
 import os
+import array
+import csv
+import logging
+import contextlib
+import copy
+import contextvars
 import math
+import time
+import functools
+import itertools
+import hashlib
 import json
+import sqlite3
+import tempfile
+import threading
 import numpy as np
 import scipy.integrate as integrate
 import scipy.stats as stats
-from scipy.special import ive, kve
+from scipy.special import ive, kve, logsumexp
+from scipy.interpolate import RectBivariateSpline
 from scipy.optimize import least_squares
+import scipy.sparse as sparse
+import scipy.signal as signal
+import scipy.optimize as optimize
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+import multiprocessing
 
 try:
     import functions_framework
@@ -18,6 +38,377 @@ except ImportError:
 DEFAULT_A = 0.45
 DEFAULT_T_INI = 25.0
 
+log = logging.getLogger(__name__)
+
+# ==========================================================
+# Instrumentação: tempos por fase e contadores por requisição
+# ==========================================================
+class Perfil:
+    """Tempos por fase (ms) e contadores (nfev, njev, chamadas de kernel) de uma execução."""
+
+    def __init__(self):
+        self.fases = {}
+        self.contadores = {}
+
+    def contar(self, nome, n=1):
+        self.contadores[nome] = self.contadores.get(nome, 0) + n
+
+    def resumo(self):
+        return {"fases_ms": dict(self.fases), "contadores": dict(self.contadores)}
+
+_PERFIL = contextvars.ContextVar("perfil", default=None)
+
+def _contar(nome, n=1):
+    perfil = _PERFIL.get()
+    if perfil is not None:
+        perfil.contar(nome, n)
+
+@contextlib.contextmanager
+def fase(nome):
+    """Acumula o tempo do bloco na fase 'nome' do perfil corrente (sem perfil ativo não faz nada)."""
+    perfil = _PERFIL.get()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        if perfil is not None:
+            perfil.fases[nome] = perfil.fases.get(nome, 0.0) + 1e3 * (time.perf_counter() - t0)
+
+class AjusteCancelado(Exception):
+    """Levantada dentro do least_squares quando quem acompanha o ajuste pede o cancelamento."""
+
+_PROGRESSO = contextvars.ContextVar("progresso", default=None)
+
+@contextlib.contextmanager
+def acompanhar(funcao):
+    """Chama funcao({"passo", "iteracao", "custo", "nfev"}) a cada iteração dos least_squares do bloco.
+
+    Se funcao devolver True, o ajuste é interrompido com AjusteCancelado.
+    """
+    token = _PROGRESSO.set(funcao)
+    try:
+        yield
+    finally:
+        _PROGRESSO.reset(token)
+
+def _callback_passo(passo, parada=None):
+    """Callback do least_squares: progresso para acompanhar() e, com parada, para quando a queda
+    relativa do custo fica abaixo de parada em duas iterações seguidas.
+
+    O critério é o custo, não os parâmetros: no vale plano do passo 2 (k_rel e alphas mal
+    determinados) os parâmetros andam ~1% por iteração enquanto o custo cai ~1e-4, então uma
+    variação relativa dos parâmetros abaixo de 1e-3 nunca acontecia.
+    """
+    funcao = _PROGRESSO.get()
+    if funcao is None and parada is None:
+        return None
+    anterior, quietas = None, [0]
+
+    def callback(intermediate_result):
+        nonlocal anterior
+        r = intermediate_result
+        if funcao is not None and funcao({"passo": passo, "iteracao": int(r.nit), "custo": float(r.cost),
+                                          "nfev": int(r.nfev)}):
+            raise AjusteCancelado(f"ajuste cancelado no {passo}")
+        if parada is not None:
+            if anterior is not None:
+                queda = (anterior - r.cost) / max(anterior, 1e-300)
+                quietas[0] = quietas[0] + 1 if queda < parada else 0
+            anterior = float(r.cost)
+            if quietas[0] >= 2:
+                raise StopIteration
+    return callback
+
+class AgregadorMetricas:
+    """Totais por operação de todas as execuções do processo (servidos em /metrics)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops = {}
+
+    def registrar(self, operacao, perfil, erro=False):
+        with self._lock:
+            op = self._ops.setdefault(operacao, {"execucoes": 0, "erros": 0, "fases_ms": {}, "contadores": {}})
+            op["execucoes"] += 1
+            op["erros"] += int(erro)
+            for nome, ms in perfil.fases.items():
+                f = op["fases_ms"].setdefault(nome, {"total": 0.0, "max": 0.0, "n": 0})
+                f["total"] += ms
+                f["max"] = max(f["max"], ms)
+                f["n"] += 1
+            for nome, n in perfil.contadores.items():
+                op["contadores"][nome] = op["contadores"].get(nome, 0) + n
+
+    def resumo(self):
+        with self._lock:
+            out = copy.deepcopy(self._ops)
+        for op in out.values():
+            for f in op["fases_ms"].values():
+                f["media"] = f["total"] / f["n"]
+        return out
+
+METRICAS = AgregadorMetricas()
+
+def _com_perfil(operacao, config, funcao, *args):
+    """Executa funcao(*args) com um Perfil ativo, registra em METRICAS e anexa o resumo se config["perfil"]."""
+    perfil = Perfil()
+    token = _PERFIL.set(perfil)
+    try:
+        with fase("total"):
+            out = funcao(*args)
+    finally:
+        _PERFIL.reset(token)
+    METRICAS.registrar(operacao, perfil, erro="error" in out)
+    if (config or {}).get("perfil") and "error" not in out:
+        out["perfil"] = perfil.resumo()
+    return out
+
+class CacheLRU:
+    """Cache LRU thread-safe de arrays independentes dos parâmetros ajustados, com limite de memória.
+
+    As chaves são tuplas com hashes de conteúdo (chave_array), então os resíduos de um mesmo
+    least_squares, run_curva e requisições repetidas reaproveitam as mesmas entradas. Valores acima
+    de max_entrada_mb (padrão: o limite total) são devolvidos sem entrar no cache, para que uma
+    avaliação grande e única não despeje as entradas pequenas e reaproveitadas.
+    """
+
+    def __init__(self, max_mb=64, max_entradas=512, max_entrada_mb=None):
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_bytes = int(max_mb * 2**20)
+        self.max_entradas = int(max_entradas)
+        self.max_entrada_bytes = None if max_entrada_mb is None else int(max_entrada_mb * 2**20)
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.recusadas = 0
+
+    def obter(self, chave, fabrica):
+        """Valor em cache para chave ou fabrica() (arrays ficam somente leitura)."""
+        with self._lock:
+            if chave in self._dados:
+                self._dados.move_to_end(chave)
+                self.hits += 1
+                return self._dados[chave][0]
+            self.misses += 1
+        valor = fabrica()
+        self._inserir(chave, valor, substituir=False)
+        return valor
+
+    def consultar(self, chave):
+        """Valor em cache para chave ou None, sem contar hit/miss."""
+        with self._lock:
+            if chave not in self._dados:
+                return None
+            self._dados.move_to_end(chave)
+            return self._dados[chave][0]
+
+    def guardar(self, chave, valor):
+        """Grava (ou substitui) o valor da chave."""
+        self._inserir(chave, valor, substituir=True)
+
+    def _tamanho(self, valor):
+        arrays = valor if isinstance(valor, tuple) else (valor,)
+        for arr in arrays:
+            arr.flags.writeable = False
+        return sum(arr.nbytes for arr in arrays)
+
+    def _inserir(self, chave, valor, substituir):
+        tamanho = self._tamanho(valor)
+        with self._lock:
+            if chave in self._dados:
+                if not substituir:
+                    return
+                self.bytes -= self._dados.pop(chave)[1]
+            if tamanho <= min(self.max_bytes, self.max_entrada_bytes or self.max_bytes):
+                self._dados[chave] = (valor, tamanho)
+                self.bytes += tamanho
+                self._despejar()
+            else:
+                self.recusadas += 1
+
+    def _despejar(self):
+        while self._dados and (self.bytes > self.max_bytes or len(self._dados) > self.max_entradas):
+            _, (_, tamanho) = self._dados.popitem(last=False)
+            self.bytes -= tamanho
+            self.evictions += 1
+
+    def configurar(self, max_mb=None, max_entradas=None, max_entrada_mb=None):
+        with self._lock:
+            if max_mb is not None:
+                self.max_bytes = int(max_mb * 2**20)
+            if max_entradas is not None:
+                self.max_entradas = int(max_entradas)
+            if max_entrada_mb is not None:
+                self.max_entrada_bytes = int(max_entrada_mb * 2**20)
+            self._despejar()
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+            self.bytes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "recusadas": self.recusadas,
+                    "hit_rate": self.hits / total if total else 0.0, "entradas": len(self._dados),
+                    "mb": self.bytes / 2**20, "max_mb": self.max_bytes / 2**20, "max_entradas": self.max_entradas}
+
+def chave_array(arr):
+    """Hash de conteúdo de um array (forma, dtype e bytes) para compor chaves de cache."""
+    arr = np.ascontiguousarray(arr)
+    return (arr.shape, arr.dtype.str, hashlib.blake2b(arr.tobytes(), digest_size=16).hexdigest())
+
+# Grades de inversão, nós da quadratura e razões de Bessel (fixas no passo 1, com alphas fixos).
+# Uma entrada não passa de 1/8 do total: as de um ajuste têm poucos MB, os blocos de uma curva longa ~22 MB.
+_CACHE_GRADE_MB = float(os.environ.get("CACHE_GRADE_MB", 64))
+CACHE_GRADE = CacheLRU(_CACHE_GRADE_MB, int(os.environ.get("CACHE_GRADE_ENTRADAS", 512)),
+                       float(os.environ.get("CACHE_GRADE_ENTRADA_MB", _CACHE_GRADE_MB / 8)))
+# Curvas T(t) já avaliadas por (params, T_ini, raio, motor): outra grade de tempo reaproveita os instantes em comum
+CACHE_PONTOS = CacheLRU(float(os.environ.get("CACHE_PONTOS_MB", 32)), int(os.environ.get("CACHE_PONTOS_ENTRADAS", 256)))
+
+# ==========================================================
+# Cache de resultados (run_curva / run_otimizacao) por hash canônico das entradas
+# ==========================================================
+VERSAO_MOTOR = "2026.12"  # mudar quando o resultado numérico mudar, para invalidar o cache em disco
+_CONFIG_FORA_DA_CHAVE = ("perfil", "estatisticas_cache", "cache")
+
+def chave_resultado(operacao, arrays, config):
+    """Hash canônico de (operação, arrays de entrada, config, versão do motor).
+
+    Os arrays entram pelo conteúdo em float64 (1 e 1.0 dão a mesma chave) e a config como JSON
+    ordenado, sem as opções que só mudam o que é anexado à resposta.
+    """
+    h = hashlib.blake2b(f"{VERSAO_MOTOR}|{operacao}".encode(), digest_size=20)
+    for nome in sorted(arrays):
+        valor = arrays[nome]
+        try:
+            parte = "null" if valor is None else repr(chave_array(np.asarray(valor, dtype=float)))
+        except (TypeError, ValueError):
+            parte = json.dumps(valor, sort_keys=True, default=str)
+        h.update(f"|{nome}={parte}".encode())
+    cfg = {k: v for k, v in (config or {}).items() if k not in _CONFIG_FORA_DA_CHAVE}
+    h.update(json.dumps(cfg, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+class CacheResultados(CacheLRU):
+    """Respostas JSON em LRU na memória e, opcionalmente, em disco (sobrevive a reinícios e é
+    compartilhado entre workers do gunicorn). Sem diretório, só a camada de memória é usada.
+    """
+
+    def __init__(self, max_mb=64, max_entradas=1024, diretorio=None, disco_mb=512):
+        super().__init__(max_mb, max_entradas)
+        self.diretorio = diretorio
+        self.disco_bytes = int(disco_mb * 2**20)
+        self.hits_disco = 0
+        self._gravacoes = 0
+
+    def _tamanho(self, valor):
+        return len(valor)
+
+    def _arquivo(self, chave):
+        return os.path.join(self.diretorio, chave[:2], chave + ".json")
+
+    def _ler_disco(self, chave):
+        if not self.diretorio:
+            return None
+        try:
+            with open(self._arquivo(chave), "rb") as f:
+                dados = f.read()
+            os.utime(self._arquivo(chave))  # mtime = último acesso, usado na poda
+            return dados
+        except OSError:
+            return None
+
+    def _gravar_disco(self, chave, dados):
+        arquivo = self._arquivo(chave)
+        try:
+            os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(arquivo), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(dados)
+            os.replace(tmp, arquivo)  # atômico: outro worker nunca lê um arquivo pela metade
+        except OSError as e:
+            log.warning("cache de resultados em disco indisponível: %s", e)
+            return
+        self._gravacoes += 1
+        if self._gravacoes % 64 == 0:
+            self._podar_disco()
+
+    def _podar_disco(self):
+        """Apaga os arquivos acessados há mais tempo até caber em disco_bytes."""
+        arquivos = []
+        for raiz, _, nomes in os.walk(self.diretorio):
+            for nome in nomes:
+                caminho = os.path.join(raiz, nome)
+                try:
+                    st = os.stat(caminho)
+                except OSError:
+                    continue
+                arquivos.append((st.st_mtime, st.st_size, caminho))
+        total = sum(a[1] for a in arquivos)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= self.disco_bytes:
+                break
+            with contextlib.suppress(OSError):
+                os.remove(caminho)
+            total -= tamanho
+
+    def obter_resultado(self, chave, fabrica, status=None):
+        """Resposta em cache ou fabrica() (respostas com "error" não são guardadas).
+
+        status (dict opcional) recebe {"chave", "camada"}: "memoria", "disco" ou None (calculado).
+        Cada chamada devolve uma cópia nova, que pode ser alterada por quem chamou.
+        """
+        camada, dados = "memoria", self.consultar(chave)
+        if dados is None:
+            camada, dados = "disco", self._ler_disco(chave)
+            if dados is not None:
+                self.guardar(chave, dados)
+        with self._lock:
+            if dados is None:
+                self.misses += 1
+            elif camada == "disco":
+                self.hits_disco += 1
+            else:
+                self.hits += 1
+        if status is not None:
+            status.update(chave=chave, camada=camada if dados is not None else None)
+        _contar(f"cache_resultados_{camada if dados is not None else 'miss'}")
+        if dados is not None:
+            return json.loads(dados)
+        out = fabrica()
+        if "error" not in out:
+            dados = json.dumps({k: v for k, v in out.items() if k not in ("perfil", "cache")}).encode()
+            self.guardar(chave, dados)
+            if self.diretorio:
+                self._gravar_disco(chave, dados)
+        return out
+
+    def estatisticas(self):
+        out = super().estatisticas()
+        total = self.hits + self.hits_disco + self.misses
+        out.update(hits_disco=self.hits_disco, diretorio=self.diretorio,
+                   hit_rate=(self.hits + self.hits_disco) / total if total else 0.0)
+        return out
+
+RESULTADOS = CacheResultados(float(os.environ.get("CACHE_RESULTADOS_MB", 64)),
+                             int(os.environ.get("CACHE_RESULTADOS_ENTRADAS", 1024)),
+                             os.environ.get("CACHE_RESULTADOS_DIR") or None,
+                             float(os.environ.get("CACHE_RESULTADOS_DISCO_MB", 512)))
+
+def _com_cache(operacao, arrays, config, status, fabrica):
+    """Passa fabrica pelo cache de resultados, a menos que config["cache"] seja False."""
+    cfg = config or {}
+    if cfg.get("cache", True) is False:
+        if status is not None:
+            status.update(chave=None, camada=None)
+        return fabrica()
+    out = RESULTADOS.obter_resultado(chave_resultado(operacao, arrays, cfg), fabrica, status)
+    if cfg.get("estatisticas_cache") and "error" not in out:
+        out["cache"] = CACHE_GRADE.estatisticas()
+    return out
+
 def get_stehfest_V(n=10):
     V = np.zeros(n)
     for i in range(1, n + 1):
@@ -39,6 +430,12 @@ _NODES_GLeg, _WEIGHTS_GLeg = np.polynomial.legendre.leggauss(150)
 _NODES_U = 0.5 * (_NODES_GLeg + 1)
 _WEIGHTS_U = 0.5 * _WEIGHTS_GLeg
 
+# Para s complexo (inversão de Euler) a integral é feita no eixo real: y = Re(s)·t = e^ξ, trapézio em ξ
+# (convergência exponencial), e o fator oscilatório e^(-i·Im(s)·t) entra nos pesos.
+_XI_TRAP = np.linspace(-25.0, np.log(40.0), 961)
+_Y_TRAP = np.exp(_XI_TRAP)
+_G_TRAP = (_XI_TRAP[1] - _XI_TRAP[0]) * _Y_TRAP * np.exp(-_Y_TRAP)
+
 def T_adi_hill(t, dT1, dT2, t1, b1, t2, b2):
     """Elevação Adiabática de Temperatura (°C) - Versão Vetorizada Estável"""
     # Evita overflow t^b e trata t <= 0 usando forma 1/(1+(tau/t)^b)
@@ -49,81 +446,776 @@ def T_adi_hill(t, dT1, dT2, t1, b1, t2, b2):
         res = res1 + res2
     return np.where(t > 0, res, 0.0)
 
-def get_theta_bar_centro(s, params, a):
+# Camadas de quadratura para s real: "reference" é o Gauss-Legendre de 150 nós em u; "fast" e
+# "standard" usam trapézios aninhados em ξ = ln(s·t) com n nós iniciais escolhidos por coluna de s.
+# O integrando é analítico em ξ com polos a pi/beta do eixo real (transição de Hill), então o erro do
+# trapézio com passo h é ~exp(-2·pi²/(beta·h)): "passo" é o beta_max·h do primeiro nível (1.5 -> ~2e-6;
+# o nível seguinte, com metade do passo, ~4e-12). A coluna é aceita com I_(2n) quando
+# |I_(2n) - I_n| <= rtol·|I_(2n)| (o erro de I_(2n) é da ordem do quadrado dessa diferença) ou ao
+# chegar a n_max; as que não passam seguem dobrando sozinhas. "corte" trunca o intervalo abaixo da
+# transição de Hill, onde o integrando cai como e^((1+beta)·ξ). A inversão de Stehfest amplifica o
+# erro relativo de theta_bar por ~1e5.
+QUADRATURAS = {
+    "fast": {"passo": 1.5, "rtol": 1e-4, "corte": 28.0, "n_max": 512},
+    "standard": {"passo": 1.2, "rtol": 1e-6, "corte": 32.0, "n_max": 1024},
+    "reference": None,
+    "table": None,  # tabela de g(tau·s, beta) nos kernels; integrandos genéricos usam a referência
+}
+DEFAULT_QUADRATURA = "reference"
+_XI_MAX = np.log(40.0)  # e^(-40) no topo do intervalo
+
+def _limite_inferior_xi(s_flat, hill, corte=32.0):
+    """Início do intervalo em ξ por coluna: abaixo da transição de Hill o integrando cai como y^(1+beta)."""
+    if hill is None:
+        return np.full(s_flat.shape, -25.0)
+    taus, betas = hill
+    lo = np.minimum(np.log(np.outer(s_flat, taus)), 0.0) - corte / (1.0 + betas)
+    return np.maximum(np.min(lo, axis=1), -40.0)
+
+def _nos_iniciais(largura, camada):
+    """Intervalos iniciais (n nós - 1) para largura = beta_max·(hi - lo): passo <= camada["passo"],
+    arredondado para m·2^k com m em 4..7 (poucos valores distintos, no máximo 25% acima)."""
+    n = np.clip(np.asarray(largura, dtype=float) / camada["passo"], 4.0, camada["n_max"] / 2)
+    k = np.floor(np.log2(n / 4.0))
+    return (np.ceil(n / 2**k) * 2**k).astype(int)
+
+def _trapezio_adaptativo(s_flat, funcao, camada, hill):
+    """Trapézios aninhados em ξ ∈ [lo, ln 40] com estimativa de erro a posteriori por coluna."""
+    lo = _limite_inferior_xi(s_flat, hill, camada["corte"])
+    beta_max = np.max(hill[1]) if hill is not None else 1.0
+    n_ini = _nos_iniciais((_XI_MAX - lo) * beta_max, camada)
+    res = None
+
+    def soma_nos(cols, n_int, novos):
+        # n_int intervalos: n_int + 1 nós; 'novos' avalia só os pontos médios introduzidos ao dobrar
+        j = np.arange(1, n_int, 2) if novos else np.arange(n_int + 1)
+        xi = lo[cols] + (_XI_MAX - lo[cols]) * (j.reshape(-1, 1) / n_int)
+        y = np.exp(xi)
+        return np.sum(funcao(y / s_flat[cols]) * np.exp(xi - y), axis=-2)
+
+    for n0 in np.unique(n_ini):
+        cols, n_int = np.flatnonzero(n_ini == n0), int(n0)
+        soma = soma_nos(cols, n_int, novos=False)
+        if res is None:
+            res = np.zeros(soma.shape[:-1] + s_flat.shape, dtype=soma.dtype)
+        I_ant = soma * (_XI_MAX - lo[cols]) / n_int
+        while cols.size:
+            n_int *= 2
+            soma = soma + soma_nos(cols, n_int, novos=True)
+            I_novo = soma * (_XI_MAX - lo[cols]) / n_int
+            eixos = tuple(range(I_novo.ndim - 1))
+            escala = np.max(np.abs(I_novo), axis=eixos) + 1e-300
+            r = np.max(np.abs(I_novo - I_ant), axis=eixos) / escala
+            aceito = (r <= camada["rtol"]) | (n_int >= camada["n_max"])
+            res[..., cols[aceito]] = I_novo[..., aceito]
+            cols, soma, I_ant = cols[~aceito], soma[..., ~aceito], I_novo[..., ~aceito]
+    return res / s_flat
+
+def _contando_integrandos(funcao):
+    def contada(t_nodes):
+        G = funcao(t_nodes)
+        _contar("integrandos", G.size)
+        return G
+    return contada
+
+def _transformada_laplace(s_flat, funcao, quadratura=None, hill=None, cache=True):
+    """Transformada de Laplace ∫0^∞ g(t) e^(-st) dt nos pontos s_flat (M,).
+
+    funcao(t_nodes) avalia g nos instantes t_nodes (n, U) e devolve (..., n, U); o resultado
+    tem forma (..., M). hill = (taus, betas) ajusta o intervalo do trapézio adaptativo. O contador
+    "integrandos" soma os valores de g calculados (nós × colunas × conjuntos), o custo da quadratura.
+    Para s complexo as colunas com o mesmo Re(s) (os nós s_k = beta_k/t de um mesmo instante)
+    compartilham os nós em t, e a fase e^(-i·c·y), c = Im(s)/Re(s), vira um produto matricial.
+    """
+    funcao = _contando_integrandos(funcao)
+    if np.iscomplexobj(s_flat):
+        sigma, inv_s = np.unique(s_flat.real, return_inverse=True)
+        c, inv_c = np.unique(np.round(s_flat.imag / s_flat.real, 12), return_inverse=True)
+        G = funcao(_Y_TRAP.reshape(-1, 1) / sigma)
+        if sigma.size * c.size <= 4 * s_flat.size:
+            fase = _G_TRAP.reshape(-1, 1) * np.exp(-1j * np.outer(_Y_TRAP, c)) # (n, C)
+            return (np.swapaxes(G, -1, -2) @ fase)[..., inv_s, inv_c] / sigma[inv_s]
+        # Nós sem estrutura comum: fase coluna a coluna
+        fase = _G_TRAP.reshape(-1, 1) * np.exp(-1j * np.outer(_Y_TRAP, c[inv_c]))
+        return np.einsum('nm,...nm->...m', fase, G[..., inv_s]) / sigma[inv_s]
+
+    camada = QUADRATURAS[quadratura or DEFAULT_QUADRATURA]
+    if camada is not None:
+        return _trapezio_adaptativo(s_flat, funcao, camada, hill)
+    # Substituição u = e^(-st): (1/s) * integral de 0 a 1 de g(-ln(u)/s) du
+    nos = lambda: (-np.log(np.maximum(_NODES_U.reshape(-1, 1), 1e-15)) / s_flat, _WEIGHTS_U.reshape(-1, 1) / s_flat)
+    t_nodes, pesos = CACHE_GRADE.obter(("nos_gl", chave_array(s_flat)), nos) if cache else nos()
+    return np.einsum('nm,...nm->...m', pesos, funcao(t_nodes))
+
+# ----------------------------------------------------------
+# Tabela adimensional da transformada de Hill
+# ----------------------------------------------------------
+# L[1/(1+(tau/t)^beta)](s) = g(tau·s, beta)/s, com g(x, beta) = ∫0^∞ e^(-y)/(1+(x/y)^beta) dy em (0, 1):
+# a transformada de T_adi depende só de (tau·s, beta) e da amplitude. A tabela guarda ln g numa grade
+# ln x × ln beta e interpola por spline quíntico. Erro máximo em ln g (= erro relativo em g) medido
+# contra ln_g_hill em 2·10^4 pontos aleatórios do domínio (ln x em [-25, 25], beta em [0.5, 10]): 3e-8,
+# o que dá ~1e-4 °C em T com Stehfest-10 (a referência de 150 nós erra até ~4 °C com beta alto).
+# Colunas fora do domínio voltam à quadratura de referência; s complexo (Euler) não usa a tabela.
+_TABELA_LNX = np.linspace(-25.0, 25.0, 501)
+_TABELA_LNB = np.linspace(np.log(0.5), np.log(10.0), 200)
+_TABELA_VERSAO = 1
+CACHE_DIR = os.environ.get("TUBULAO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tubulao"))
+_tabela_hill = None
+_tabela_lock = threading.Lock()
+
+def ln_g_hill(lnx, beta):
+    """ln g(x, beta) na grade lnx (X,) × beta (B,) por trapézio em ξ = ln y (erro ~1e-13).
+
+    O integrando e^(ξ - e^ξ)/(1 + e^(beta(ln x - ξ))) é analítico em ξ com polos a pi/beta do
+    eixo real, então o passo h = min(0.1, 0.3/beta) já dá convergência exponencial.
+    """
+    lnx = np.asarray(lnx, dtype=float).reshape(-1, 1)
+    beta = np.atleast_1d(np.asarray(beta, dtype=float))
+    res = np.empty((lnx.shape[0], beta.size))
+    for j, b in enumerate(beta):
+        h = min(0.1, 0.3 / b)
+        xi = np.arange(-70.0, np.log(60.0), h)
+        # ln[e^(ξ - e^ξ)·h] - ln(1 + e^(beta(ln x - ξ))), somado em escala log (g ~ x^-beta para x grande)
+        res[:, j] = logsumexp(np.log(h) + xi - np.exp(xi) - np.logaddexp(0.0, b * (lnx - xi)), axis=1)
+    return res
+
+def get_tabela_hill():
+    """Spline de ln g(ln x, ln beta), carregado do cache em disco ou construído (~5 s) na primeira chamada."""
+    global _tabela_hill
+    if _tabela_hill is not None:
+        return _tabela_hill
+    with _tabela_lock:
+        if _tabela_hill is None:
+            caminho = os.path.join(CACHE_DIR, f"hill_tabela_v{_TABELA_VERSAO}.npz")
+            try:
+                with np.load(caminho) as arq:
+                    ln_g = arq["ln_g"]
+                if ln_g.shape != (_TABELA_LNX.size, _TABELA_LNB.size):
+                    raise ValueError("tabela com forma inesperada")
+            except Exception:  # ausente, truncado (BadZipFile) ou de outra grade: reconstrói
+                ln_g = ln_g_hill(_TABELA_LNX, np.exp(_TABELA_LNB))
+                try:
+                    os.makedirs(CACHE_DIR, exist_ok=True)
+                    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".npz.tmp")
+                    with os.fdopen(fd, "wb") as f:
+                        np.savez(f, ln_g=ln_g)
+                    os.replace(tmp, caminho)  # atômico: outro worker nunca lê a tabela pela metade
+                except OSError:
+                    pass  # sem disco gravável: a tabela fica só em memória
+            _tabela_hill = RectBivariateSpline(_TABELA_LNX, _TABELA_LNB, ln_g, kx=5, ky=5)
+    return _tabela_hill
+
+def _transformada_hill_tabela(s_flat, P, derivadas=False):
+    """Transformada de T_adi pela tabela para s real (M,) e parâmetros de Hill P (U, >=6).
+
+    Retorna (U, M); com derivadas=True retorna (U, 7, M) = [T_adi, d/d(dT1, dT2, tau1, beta1, tau2, beta2)].
+    Termos fora do domínio da tabela são recalculados com a quadratura de referência.
+    """
+    tabela = get_tabela_hill()
+    res = np.zeros((P.shape[0], 7 if derivadas else 1, s_flat.size))
+    fora = np.zeros((P.shape[0], s_flat.size), dtype=bool)
+    for i_dT, i_tau, i_b in ((0, 2, 3), (1, 4, 5)):
+        dT, tau, b = (P[:, [j]] for j in (i_dT, i_tau, i_b))
+        lnx = np.log(tau * s_flat)
+        lnb = np.broadcast_to(np.log(b), lnx.shape)
+        fora |= (lnx < _TABELA_LNX[0]) | (lnx > _TABELA_LNX[-1]) | (lnb < _TABELA_LNB[0]) | (lnb > _TABELA_LNB[-1])
+        g = np.exp(tabela.ev(lnx, lnb)) / s_flat
+        res[:, 0] += dT * g
+        if derivadas:
+            res[:, 1 + i_dT] = g
+            res[:, 1 + i_tau] = dT * g * tabela.ev(lnx, lnb, dx=1) / tau
+            res[:, 1 + i_b] = dT * g * tabela.ev(lnx, lnb, dy=1) / b
+    linhas = np.flatnonzero(fora.any(axis=1))
+    for u in linhas:
+        dT1, dT2, t1, b1, t2, b2 = P[u, :6]
+        cols = np.flatnonzero(fora[u])
+        nodais = _nodais_hill(dT1, dT2, t1, b1, t2, b2) if derivadas else \
+            (lambda t_nodes, p=P[u, :6]: T_adi_hill(t_nodes, *p)[np.newaxis])
+        res[u][:, cols] = _transformada_laplace(s_flat[cols], nodais, "reference")
+    return res if derivadas else res[:, 0]
+
+def _nodais_hill(dT1, dT2, t1, b1, t2, b2):
+    """Integrandos (7, n, U) da transformada de T_adi e de suas derivadas nos 6 parâmetros de Hill."""
+    def nodais(t_nodes):
+        G = np.zeros((7,) + t_nodes.shape)  # [T_adi, d/d(dT1, dT2, tau1, beta1, tau2, beta2)]
+        with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+            for i_dT, i_tau, i_b, dT, tau, b in ((0, 2, 3, dT1, t1, b1), (1, 4, 5, dT2, t2, b2)):
+                h = 1.0 / (1.0 + (tau / t_nodes)**b)
+                hh = h * (1.0 - h)
+                G[0] += dT * h
+                G[1 + i_dT] = h
+                G[1 + i_tau] = -dT * b / tau * hh
+                G[1 + i_b] = -dT * hh * np.log(tau / t_nodes)
+        return G
+    return nodais
+
+# ----------------------------------------------------------
+# Tabela das funções de Bessel do acoplamento com o solo
+# ----------------------------------------------------------
+# term_sub = 1/(I0(z1)·D), D = 1 + k_rel·sqrt(beta2/beta1)·(I1/I0)(z1)·(K0/K1)(z2), z2 = z1·sqrt(beta1/beta2):
+# k_rel e a razão de difusividades entram só algebricamente, então basta tabelar em ln z as três
+# funções de uma variável ln ive0, I1/I0 e K0/K1. Hermite cúbico com as derivadas exatas
+# ((ln ive0)' = I1/I0 - 1, (I1/I0)' = 1 - (I1/I0)/z - (I1/I0)^2, (K0/K1)' = -1 + (K0/K1)^2 + (K0/K1)/z)
+# em 2401 nós de ln z em [-10, 8]: erro relativo <= 2e-11 (ver validar_bessel_tabela). Fora do
+# domínio, e para s complexo, usa-se ive/kve.
+BESSEL = ("exact", "table")
+DEFAULT_BESSEL = "exact"
+_BESSEL_LNZ = np.linspace(-10.0, 8.0, 2401)
+
+@functools.lru_cache(maxsize=1)
+def get_tabela_bessel():
+    """Valores (3, n) e derivadas em ln z já multiplicadas pelo passo (3, n) de ln ive0, I1/I0 e K0/K1."""
+    z = np.exp(_BESSEL_LNZ)
+    i0, rI, rK = ive(0, z), ive(1, z) / ive(0, z), kve(0, z) / kve(1, z)
+    h = _BESSEL_LNZ[1] - _BESSEL_LNZ[0]
+    valores = np.stack([np.log(i0), rI, rK])
+    derivadas = h * np.stack([z * (rI - 1.0), z - rI - z * rI**2, -z + z * rK**2 + rK])
+    return valores, derivadas
+
+def _bessel_exato(z1, z2):
+    I0_a_scaled = ive(0, z1)
+    return I0_a_scaled, ive(1, z1) / I0_a_scaled, kve(0, z2) / kve(1, z2)
+
+def _bessel_solo(z1, z2, bessel=None, cache=False):
+    """(ive0(z1), I1/I0(z1), K0/K1(z2)) exatos ou pela tabela ("table", só para z real).
+
+    Só com cache=True (alphas fixos, motor["alphas_fixos"] no passo 1) o resultado vai ao CACHE_GRADE:
+    com alphas livres cada iteração tem z novos e o cache só custaria hash, inserção e despejos.
+    """
+    if not cache:
+        return _bessel_calc(z1, z2, bessel)
+    return CACHE_GRADE.obter(("bessel", chave_array(z1), chave_array(z2), bessel or DEFAULT_BESSEL),
+                             lambda: _bessel_calc(z1, z2, bessel))
+
+def _bessel_calc(z1, z2, bessel=None):
+    if (bessel or DEFAULT_BESSEL) != "table" or np.iscomplexobj(z1):
+        return _bessel_exato(z1, z2)
+    valores, derivadas = get_tabela_bessel()
+    h = _BESSEL_LNZ[1] - _BESSEL_LNZ[0]
+
+    def hermite(z, linhas):
+        u = (np.log(z) - _BESSEL_LNZ[0]) / h
+        i = np.clip(u.astype(int), 0, _BESSEL_LNZ.size - 2)
+        t = u - i
+        t2, c = t * t, 1.0 - t
+        v, d = valores[linhas], derivadas[linhas]
+        return ((1 + 2 * t) * c * c * v[:, i] + t * c * c * d[:, i]
+                + t2 * (3 - 2 * t) * v[:, i + 1] - t2 * c * d[:, i + 1])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ln_i0, rI = hermite(z1, [0, 1])
+        rK = hermite(z2, [2])[0]
+    I0_a_scaled = np.exp(ln_i0)
+    fora = (z1 < math.exp(_BESSEL_LNZ[0])) | (z1 > math.exp(_BESSEL_LNZ[-1])) | \
+        (z2 < math.exp(_BESSEL_LNZ[0])) | (z2 > math.exp(_BESSEL_LNZ[-1]))
+    if np.any(fora):
+        I0_a_scaled, rI, rK = (np.array(x, dtype=float) for x in (I0_a_scaled, rI, rK))
+        ex = _bessel_exato(z1[fora], z2[fora])
+        I0_a_scaled[fora], rI[fora], rK[fora] = ex
+    return I0_a_scaled, rI, rK
+
+def validar_bessel_tabela(n=100000, seed=0):
+    """Compara a tabela com ive/kve em z aleatórios (log-uniforme no domínio) e no termo do solo.
+
+    Retorna os erros relativos máximos de cada função e de term_sub para k_rel em [0.5, 10] e
+    beta1/beta2 em [0.1, 10].
+    """
+    rng = np.random.default_rng(seed)
+    z1 = np.exp(rng.uniform(_BESSEL_LNZ[0] + 1.2, _BESSEL_LNZ[-1] - 1.2, n))
+    z2 = z1 * np.exp(rng.uniform(np.log(0.1), np.log(10.0), n) / 2)
+    k_rel = rng.uniform(0.5, 10.0, n)
+    flux = k_rel * z1 / z2
+    res = {}
+    termos = {}
+    for bessel in BESSEL:
+        i0, rI, rK = _bessel_calc(z1, z2, bessel)
+        termos[bessel] = (i0, rI, rK, np.exp(-z1) / i0 / (1 + flux * rI * rK))
+    for nome, j in (("ive0", 0), ("razao_I", 1), ("razao_K", 2), ("term_sub", 3)):
+        exato, tabela = termos["exact"][j], termos["table"][j]
+        ok = exato != 0  # term_sub = e^(-z1)/ive0/D zera por underflow para z1 grande
+        res[nome] = float(np.max(np.abs(tabela[ok] - exato[ok]) / np.abs(exato[ok])))
+    return res
+
+def get_theta_bar_centro(s, params, a, motor=None):
     """Retorna a transformada de Laplace do ganho de temperatura no centro. VETORIZADA."""
-    dT1, dT2, t1, b1, t2, b2, k_rel, beta_alpha1, beta_alpha2 = params
-    alpha1 = beta_alpha1 * 1e-4
-    alpha2 = beta_alpha2 * 1e-4
+    res = get_theta_bar_lote(s, [params], a, motor=motor)[0].reshape(np.shape(s))
+    return res if isinstance(s, np.ndarray) else res.item()
 
-    # Transformada de Laplace: (1/s) * integral de 0 a 1 de T(-ln(u)/s) du
-    s_orig = s
+def get_theta_bar_lote(s, params_lote, a, motor=None):
+    """Transformada no centro para P conjuntos de parâmetros numa única passada: (P, 9) -> (P,) + s.shape."""
+    P = np.atleast_2d(np.asarray(params_lote, dtype=float))
+    col = lambda j: P[:, j].reshape(-1, 1)
+    _contar("kernel_theta")
+    _contar("avaliacoes_s", P.shape[0] * np.size(s))
+
+    # Transformada de Laplace de T_adi: T_nodes (P, n, U) nos nós t_nodes (n, U) da quadratura
     s_arr = np.atleast_1d(s)
     orig_shape = s_arr.shape
-    s_flat = s_arr.flatten()
-    
-    # Geramos t_nodes: (150, N_s)
-    t_nodes = -np.log(np.maximum(_NODES_U.reshape(-1, 1), 1e-15)) / s_flat.reshape(1, -1)
-    T_nodes = T_adi_hill(t_nodes, dT1, dT2, t1, b1, t2, b2) 
-    dT_adi_bar_flat = np.sum(_WEIGHTS_U.reshape(-1, 1) * T_nodes, axis=0) / s_flat
-    dT_adi_bar_s = dT_adi_bar_flat.reshape(orig_shape)
-
-    q1 = np.sqrt(s_orig / alpha1)
-    q2 = np.sqrt(s_orig / alpha2)
-    ratio_I = ive(1, q1 * a) / ive(0, q1 * a)
-    ratio_K = kve(0, q2 * a) / kve(1, q2 * a)
-    
-    flux_ratio = k_rel * np.sqrt(alpha2 / alpha1)
-    D_scaled = 1 + flux_ratio * ratio_I * ratio_K
-    I0_a_scaled = ive(0, q1 * a)
-    
+    s_flat = s_arr.reshape(1, -1)
+
+    dT_adi_bar_s = _transformada_adiabatica(s_flat[0], P, motor)
+    term_sub = _termo_solo(s_flat, col(6), col(7), col(8), a, (motor or {}).get("bessel"),
+                           cache=(motor or {}).get("alphas_fixos", False))
+    res = dT_adi_bar_s * (1 - term_sub)
+    return res.reshape((P.shape[0],) + orig_shape)
+
+def _transformada_adiabatica(s_flat, P, motor=None):
+    """ΔT̄_adi(s) dos P conjuntos nos nós s_flat (1-D), pela quadratura do motor: (P, N_s)."""
+    quadratura = (motor or {}).get("quadratura")
+    if quadratura == "table" and not np.iscomplexobj(s_flat):
+        return _transformada_hill_tabela(s_flat, P)
+    camada = QUADRATURAS[quadratura or DEFAULT_QUADRATURA]
+    if camada is not None and not np.iscomplexobj(s_flat):
+        # Camadas adaptativas: conjuntos com o mesmo número inicial de nós (o da coluna mais larga)
+        # dividem uma chamada, em blocos dentro de _LOTE_MAX_BYTES
+        taus, betas = P[:, [2, 4]], P[:, [3, 5]]
+        lo = np.log(s_flat.reshape(-1, 1, 1) * taus)
+        lo = np.maximum(np.min(np.minimum(lo, 0.0) - camada["corte"] / (1.0 + betas), axis=(0, 2)), -40.0)
+        grupos = _nos_iniciais((_XI_MAX - lo) * betas.max(axis=1), camada)
+        res = np.empty((P.shape[0], s_flat.size))
+        for n0 in np.unique(grupos):
+            idx = np.flatnonzero(grupos == n0)
+            bloco = max(1, _LOTE_MAX_BYTES // (6 * 8 * (2 * n0 + 1) * s_flat.size))
+            for i in range(0, idx.size, bloco):
+                g = idx[i:i + bloco]
+                hill = [P[g, j].reshape(-1, 1, 1) for j in range(6)]
+                res[g] = _transformada_laplace(s_flat, lambda t_nodes: T_adi_hill(t_nodes, *hill), quadratura,
+                                               (taus[g].ravel(), betas[g].ravel()))
+        return res
+    hill = [P[:, j].reshape(-1, 1, 1) for j in range(6)]
+    return _transformada_laplace(s_flat, lambda t_nodes: T_adi_hill(t_nodes, *hill),
+                                 cache=(motor or {}).get("cache_grade", True))
+
+def _interface_solo(s, k_rel, beta1, beta2, a, bessel=None, cache=False):
+    """(q1, q2, ive0(q1·a), D_scaled) da interface concreto-solo, com D = 1 + k_rel·√(α2/α1)·I1/I0·K0/K1."""
+    q1 = np.sqrt(s / (beta1 * ALPHA_SCALE))
+    q2 = np.sqrt(s / (beta2 * ALPHA_SCALE))
+    I0_a_scaled, ratio_I, ratio_K = _bessel_solo(q1 * a, q2 * a, bessel, cache)
+    flux_ratio = k_rel * np.sqrt(beta2 / beta1)
+    return q1, q2, I0_a_scaled, 1 + flux_ratio * ratio_I * ratio_K
+
+def _termo_solo(s, k_rel, beta1, beta2, a, bessel=None, cache=False):
+    """term_sub = 1 / (I0(q1·a)·D): fração da elevação adiabática perdida para o solo, no domínio s.
+
+    k_rel, beta1 e beta2 (alphas em escala beta) são escalares ou colunas que se propagam com s.
+    """
+    q1, _, I0_a_scaled, D_scaled = _interface_solo(s, k_rel, beta1, beta2, a, bessel, cache)
+
     # Proteção contra divisões por zero ou NaNs em s muito grandes/pequenos
+    # (ive escala por e^(-|Re z|), por isso o fator de volta usa só a parte real de q1·a)
     mask_valid = (I0_a_scaled != 0) & (D_scaled != 0) & (~np.isinf(I0_a_scaled))
-    term_sub = np.zeros_like(s_orig)
-    if isinstance(s_orig, np.ndarray):
-        term_sub[mask_valid] = (1.0 / I0_a_scaled[mask_valid]) * np.exp(-q1[mask_valid] * a) / D_scaled[mask_valid]
+    term_sub = np.zeros(mask_valid.shape, dtype=D_scaled.dtype)
+    term_sub[mask_valid] = (1.0 / I0_a_scaled[mask_valid]) * np.exp(-np.real(q1[mask_valid]) * a) / D_scaled[mask_valid]
+    return term_sub
+
+def get_theta_bar_campo(s, params, a, raios, motor=None):
+    """Transformada θ̄(r, s) de um conjunto em R raios (concreto r <= a, solo r > a): (R,) + s.shape.
+
+    ΔT̄_adi e o denominador da interface D são calculados uma vez por s; por raio entram só
+    I0(q1·r)/I0(q1·a) no concreto e K0(q2·r)/K0(q2·a) no solo, com θ̄2(a) = θ̄1(a) = ΔT̄_adi·(1 - 1/D).
+    """
+    p = np.asarray(params, dtype=float)
+    s_arr = np.atleast_1d(s)
+    s_flat = s_arr.reshape(-1)
+    r = np.asarray(raios, dtype=float).reshape(-1, 1)
+    _contar("kernel_campo")
+    _contar("avaliacoes_s", np.size(s))
+
+    adi = _transformada_adiabatica(s_flat, p.reshape(1, -1), motor)  # (1, N_s)
+    q1, q2, I0_a_scaled, D_scaled = _interface_solo(s_flat, p[6], p[7], p[8], a, (motor or {}).get("bessel"))
+    res = np.zeros((r.size, s_flat.size), dtype=np.result_type(adi, D_scaled))
+    dentro = r[:, 0] <= a
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        # ive escala por e^(-|Re z|): a razão de I0 volta com e^(Re q1·(r - a)), <= 1 para r <= a
+        fator = ive(0, q1 * r[dentro]) * np.exp(np.real(q1) * (r[dentro] - a)) / (I0_a_scaled * D_scaled)
+        res[dentro] = adi * (1 - np.nan_to_num(fator, nan=0.0, posinf=0.0, neginf=0.0))
+        if not dentro.all():
+            # kve escala por e^z: a razão de K0 volta com e^(-q2·(r - a)), que decai no solo
+            fator = kve(0, q2 * r[~dentro]) * np.exp(-q2 * (r[~dentro] - a)) / kve(0, q2 * a)
+            res[~dentro] = adi * (1 - 1 / D_scaled) * np.nan_to_num(fator, nan=0.0, posinf=0.0, neginf=0.0)
+    return res.reshape((r.size,) + s_arr.shape)
+
+def get_theta_bar_centro_jac(s, params, a, motor=None):
+    """Transformada no centro e suas derivadas exatas em relação aos 9 parâmetros.
+
+    Retorna (theta_bar, dtheta), com dtheta de forma (9,) + s.shape. As derivadas de Hill
+    usam h(1-h) = x/(1+x)^2 (x = (tau/t)^beta), estável mesmo quando x transborda; as do
+    solo derivam ln(termo) = -ln I0(q1 a) - ln D com I0' = I1, (I1/I0)' e (K0/K1)'.
+    """
+    dT1, dT2, t1, b1, t2, b2, k_rel, beta_alpha1, beta_alpha2 = params
+    s_arr = np.atleast_1d(s)
+    s_flat = s_arr.reshape(-1)
+    _contar("kernel_jacobiano")
+    _contar("avaliacoes_s_jacobiano", s_arr.size)
+
+    # Adiabático: mesma quadratura de get_theta_bar_lote, derivada termo a termo
+    quadratura = (motor or {}).get("quadratura")
+    if quadratura == "table" and not np.iscomplexobj(s_flat):
+        transf = _transformada_hill_tabela(s_flat, np.asarray(params, dtype=float)[np.newaxis], derivadas=True)[0]
     else:
-        if mask_valid:
-            term_sub = (1.0 / I0_a_scaled) * np.exp(-q1 * a) / D_scaled
-        
-    res = dT_adi_bar_s * (1 - term_sub)
-    return res if isinstance(s, np.ndarray) else res.item()
+        transf = _transformada_laplace(s_flat, _nodais_hill(dT1, dT2, t1, b1, t2, b2), quadratura,
+                                       (np.array([t1, t2]), np.array([b1, b2])))
+    adi = transf[0].reshape(s_arr.shape)
+    d_adi = transf[1:].reshape((6,) + s_arr.shape)
+
+    # Solo: em escala beta, z1 = a*sqrt(s/(beta1*1e-4)) => dz1/dbeta1 = -z1/(2*beta1)
+    z1 = np.sqrt(s_arr / (beta_alpha1 * ALPHA_SCALE)) * a
+    z2 = np.sqrt(s_arr / (beta_alpha2 * ALPHA_SCALE)) * a
+    I0_a_scaled, ratio_I, ratio_K = _bessel_solo(z1, z2, (motor or {}).get("bessel"), (motor or {}).get("alphas_fixos", False))
+    flux_ratio = k_rel * np.sqrt(beta_alpha2 / beta_alpha1)
+    D_scaled = 1 + flux_ratio * ratio_I * ratio_K
+
+    mask_valid = (I0_a_scaled != 0) & (D_scaled != 0) & (~np.isinf(I0_a_scaled))
+    term_sub = np.zeros(s_arr.shape, dtype=D_scaled.dtype)
+    dlog = np.zeros((3,) + s_arr.shape, dtype=D_scaled.dtype)
+    m = mask_valid
+    rI, rK, D = ratio_I[m], ratio_K[m], D_scaled[m]
+    term_sub[m] = np.exp(-np.real(z1[m])) / I0_a_scaled[m] / D
+    drI = 1.0 - rI / z1[m] - rI**2
+    drK = -1.0 + rK**2 + rK / z2[m]
+    dD_b1 = -flux_ratio * (rI * rK + drI * rK * z1[m]) / (2 * beta_alpha1)
+    dD_b2 = flux_ratio * (rI * rK - rI * drK * z2[m]) / (2 * beta_alpha2)
+    dlog[0][m] = -(D - 1) / (k_rel * D)
+    dlog[1][m] = rI * z1[m] / (2 * beta_alpha1) - dD_b1 / D
+    dlog[2][m] = -dD_b2 / D
+
+    fator = 1 - term_sub
+    theta = adi * fator
+    dtheta = np.empty((N_PARAMS,) + s_arr.shape, dtype=theta.dtype)
+    dtheta[:6] = d_adi * fator
+    dtheta[6:] = -adi * term_sub * dlog
+    return theta, dtheta
+
+# ==========================================================
+# Inversão numérica de Laplace
+# ==========================================================
+# Todos os métodos têm a forma f(t) ≈ (1/t)·Σ_k w_k·Re F(beta_k/t).
+# - "stehfest": Gaver-Stehfest, n termos reais (par; degrada em double acima de ~16).
+# - "euler": Euler/Abate-Whitt, 2n+1 termos complexos com Re(beta) = n·ln(10)/3 > 0.
+# Talbot fixo não é oferecido: o contorno entra em Re(s) < 0, onde a transformada da
+# função de Hill (calculada por quadratura no eixo real) não converge.
+INVERSOES = {"stehfest": 10, "euler": 12}
+DEFAULT_INVERSAO = ("stehfest", 10)
+
+def get_euler_coef(M=12):
+    """Nós beta_k e pesos 10^(M/3)·eta_k da inversão de Euler (Abate-Whitt, 2M+1 termos)."""
+    xi = np.zeros(2 * M + 1)
+    xi[0] = 0.5
+    xi[1:M + 1] = 1.0
+    xi[2 * M] = 2.0 ** -M
+    for k in range(1, M):
+        xi[2 * M - k] = xi[2 * M - k + 1] + 2.0 ** -M * math.comb(M, k)
+    k = np.arange(2 * M + 1)
+    beta = M * np.log(10) / 3 + 1j * np.pi * k
+    return beta, 10 ** (M / 3) * (-1.0) ** k * xi
+
+@functools.lru_cache(maxsize=32)
+def _coef_inversao(inversao):
+    metodo, n = inversao
+    if metodo == "stehfest":
+        return np.arange(1, n + 1) * np.log(2), get_stehfest_V(n) * np.log(2)
+    return get_euler_coef(n)
+
+def _grade_inversao(t_val, inversao=None, cache=True):
+    """Nós S = beta_k/t e pesos W = w_k/t, ambos (K, N_t), tais que f(t) ≈ Re Σ_k W·F(S)."""
+    inversao = tuple(inversao or DEFAULT_INVERSAO)
+    beta, pesos = _coef_inversao(inversao)
+    t_val = np.asarray(t_val, dtype=float)
+    grade = lambda: (beta.reshape(-1, 1) / t_val.reshape(1, -1), pesos.reshape(-1, 1) / t_val.reshape(1, -1))
+    return CACHE_GRADE.obter(("grade", chave_array(t_val), inversao), grade) if cache else grade()
+
+def ler_motor(config=None):
+    """Opções numéricas do motor a partir do config da requisição (levanta ValueError se inválidas).
+
+    "inversao": "stehfest" | "euler" ou {"metodo": ..., "n": ...}.
+    "quadratura": "fast" | "standard" | "reference" | "table" (transformada de T_adi para s real).
+    "bessel": "exact" | "table" (funções de Bessel do termo do solo para s real).
+    "memoria_mb": orçamento dos temporários do avaliador (padrão LOTE_MAX_MB).
+    "float32": saídas T, dT/dt em float32 (os intermediários ficam em float64, ver calc_temperatura_lote).
+    """
+    cfg = config or {}
+    inv = cfg.get("inversao", DEFAULT_INVERSAO[0])
+    metodo, n = (inv.get("metodo", DEFAULT_INVERSAO[0]), inv.get("n")) if isinstance(inv, dict) else (inv, None)
+    if metodo not in INVERSOES:
+        raise ValueError(f"inversao deve ser uma de {sorted(INVERSOES)}.")
+    n = int(n) if n is not None else INVERSOES[metodo]
+    if n < 2 or n > 40 or (metodo == "stehfest" and n % 2):
+        raise ValueError("n da inversão fora do intervalo (stehfest: par entre 2 e 40; euler: 2 a 40).")
+    quadratura = cfg.get("quadratura", DEFAULT_QUADRATURA)
+    if quadratura not in QUADRATURAS:
+        raise ValueError(f"quadratura deve ser uma de {sorted(QUADRATURAS)}.")
+    bessel = cfg.get("bessel", DEFAULT_BESSEL)
+    if bessel not in BESSEL:
+        raise ValueError(f"bessel deve ser um de {sorted(BESSEL)}.")
+    memoria_mb = cfg.get("memoria_mb")
+    if memoria_mb is not None and not float(memoria_mb) > 0:
+        raise ValueError("memoria_mb deve ser positivo.")
+    return {"inversao": (metodo, n), "quadratura": quadratura, "bessel": bessel,
+            "memoria_mb": memoria_mb and float(memoria_mb), "float32": bool(cfg.get("float32", False))}
 
-def calc_temperatura_centro(tempos, params, T_ini=None, a=None):
+# Orçamento de memória do avaliador em lote: limita o temporário (P_bloco, n_nós, K·N_t) de T_adi_hill.
+# Instantes e conjuntos de parâmetros são processados em blocos, então o pico de memória não cresce com N_t.
+_LOTE_MAX_BYTES = int(os.environ.get("LOTE_MAX_MB", 64)) * 2**20
+
+def calc_temperatura_lote(tempos, params_lote, T_ini=None, a=None, derivada=False, motor=None):
+    """Curvas T(t) de P conjuntos de parâmetros: (P, 9) -> (P, N_t).
+
+    Com derivada=True (ou 1) devolve também dT/dt, (T, v), e com derivada=2 também d2T/dt2,
+    (T, v, acel), todos do mesmo theta_bar: L[f'] = s·F e L[f''] = s²·F, pois θ(0) = θ'(0) = 0.
+    Instantes e conjuntos são processados em blocos que mantêm o maior temporário dentro de
+    motor["memoria_mb"] (ou _LOTE_MAX_BYTES), escrevendo em saídas pré-alocadas. motor["float32"]
+    reduz só as saídas: a inversão amplifica o erro relativo de theta_bar por 1e4-1e5, então
+    intermediários em float32 (eps ~6e-8) custariam graus Celsius.
+    """
     _T_ini = T_ini if T_ini is not None else DEFAULT_T_INI
     _a = a if a is not None else DEFAULT_A
-    tempos = np.atleast_1d(tempos)
-    res_T = np.full(tempos.shape, _T_ini, dtype=float)
-    
-    mask = tempos > 0
-    t_val = tempos[mask]
-    if len(t_val) == 0: return res_T
-
-    ln2_t = np.log(2) / t_val
-    i_indices = np.arange(1, 11).reshape(10, 1)
-    S = i_indices * ln2_t.reshape(1, -1) # (10, N_t)
-    
-    theta_bar = get_theta_bar_centro(S, params, _a) # (10, N_t)
-    soma = np.sum(V_STEHFEST.reshape(10, 1) * theta_bar, axis=0)
-    res_T[mask] = _T_ini + soma * ln2_t
-    return res_T
-
-def calc_derivada_centro(tempos, params, a=None):
+    motor = motor or {}
+    ordem = int(derivada)
+    orcamento = int(motor["memoria_mb"] * 2**20) if motor.get("memoria_mb") else _LOTE_MAX_BYTES
+    tempos = np.atleast_1d(np.asarray(tempos, dtype=float))
+    P = np.atleast_2d(np.asarray(params_lote, dtype=float))
+    dtype = np.float32 if motor.get("float32") else float
+    res = [np.full((P.shape[0], tempos.size), _T_ini, dtype=dtype)]
+    res += [np.zeros(res[0].shape, dtype=dtype) for _ in range(ordem)]
+
+    idx = np.flatnonzero(tempos.reshape(-1) > 0)
+    if idx.size > 0:
+        inversao = tuple(motor.get("inversao") or DEFAULT_INVERSAO)
+        # bytes por instante e conjunto: T_adi_hill mantém ~6 temporários (n_nós, K) em float64
+        por_instante = 6 * len(_NODES_U) * len(_coef_inversao(inversao)[0]) * 8
+        n_t = int(min(idx.size, max(1, orcamento // por_instante)))
+        bloco = max(1, orcamento // (por_instante * n_t))
+        if n_t < idx.size:
+            # Blocos de instantes: grades e nós de cada bloco não se repetem, então ficam fora do CACHE_GRADE
+            motor = {**motor, "cache_grade": False}
+        for j in range(0, idx.size, n_t):
+            cols = idx[j:j + n_t]
+            S, W = _grade_inversao(tempos.reshape(-1)[cols], inversao, motor.get("cache_grade", True))
+            pesos = [W]
+            for _ in range(ordem):
+                pesos.append(pesos[-1] * S)
+            for i in range(0, P.shape[0], bloco):
+                theta_bar = get_theta_bar_lote(S, P[i:i + bloco], _a, motor) # (P_bloco, K, n_t)
+                for k, Wk in enumerate(pesos):
+                    res[k][i:i + bloco, cols] += np.real(np.sum(Wk * theta_bar, axis=1))
+    res = [r.reshape((P.shape[0],) + tempos.shape) for r in res]
+    return tuple(res) if ordem else res[0]
+
+def calc_temperatura_centro(tempos, params, T_ini=None, a=None, motor=None):
+    return calc_temperatura_lote(tempos, [params], T_ini=T_ini, a=a, motor=motor)[0]
+
+def calc_derivada_centro(tempos, params, a=None, motor=None):
+    return calc_temperatura_lote(tempos, [params], a=a, derivada=True, motor=motor)[1][0]
+
+def calc_jacobiano_centro(tempos, params, a=None, motor=None):
+    """Jacobiano exato dT/dp (N_t, 9): derivadas de theta_bar invertidas com os mesmos pesos da inversão."""
     _a = a if a is not None else DEFAULT_A
+    motor = motor or {}
     tempos = np.atleast_1d(tempos)
-    res_v = np.zeros(tempos.shape, dtype=float)
-    
+    res_J = np.zeros(tempos.shape + (N_PARAMS,), dtype=float)
+
     mask = tempos > 0
     t_val = tempos[mask]
-    if len(t_val) == 0: return res_v
+    if len(t_val) == 0: return res_J
 
-    ln2_t = np.log(2) / t_val
-    i_indices = np.arange(1, 11).reshape(10, 1)
-    S = i_indices * ln2_t.reshape(1, -1)
-    
-    theta_bar = get_theta_bar_centro(S, params, _a)
-    soma = np.sum(V_STEHFEST.reshape(10, 1) * S * theta_bar, axis=0)
-    res_v[mask] = soma * ln2_t
-    return res_v
+    S, W = _grade_inversao(t_val, motor.get("inversao"))
+    _, dtheta = get_theta_bar_centro_jac(S, params, _a, motor) # (9, K, N_t)
+    res_J[mask] = np.real(np.sum(W * dtheta, axis=1)).T
+    return res_J
+
+def calc_temperatura_campo(tempos, params, raios, T_ini=None, a=None, motor=None):
+    """Campo T(r, t) de um conjunto de parâmetros: (R, N_t), concreto e solo.
+
+    Os instantes são invertidos em blocos que mantêm o temporário (R, K, n_t) dentro do orçamento
+    do motor, como em calc_temperatura_lote.
+    """
+    _T_ini = T_ini if T_ini is not None else DEFAULT_T_INI
+    _a = a if a is not None else DEFAULT_A
+    motor = motor or {}
+    inversao = tuple(motor.get("inversao") or DEFAULT_INVERSAO)
+    orcamento = int(motor["memoria_mb"] * 2**20) if motor.get("memoria_mb") else _LOTE_MAX_BYTES
+    tempos = np.atleast_1d(np.asarray(tempos, dtype=float)).ravel()
+    raios = np.atleast_1d(np.asarray(raios, dtype=float)).ravel()
+    res = np.full((raios.size, tempos.size), _T_ini, dtype=np.float32 if motor.get("float32") else float)
+
+    idx = np.flatnonzero(tempos > 0)
+    # bytes por instante: ~4 temporários complexos (R, K) mais os nós de T_adi_hill
+    K = len(_coef_inversao(inversao)[0])
+    n_t = int(max(1, orcamento // (K * (4 * 16 * raios.size + 6 * len(_NODES_U) * 8))))
+    if n_t < idx.size:
+        motor = {**motor, "cache_grade": False}  # como em calc_temperatura_lote
+    for j in range(0, idx.size, n_t):
+        cols = idx[j:j + n_t]
+        S, W = _grade_inversao(tempos[cols], inversao, motor.get("cache_grade", True))
+        theta_bar = get_theta_bar_campo(S, params, _a, raios, motor)  # (R, K, n_t)
+        res[:, cols] += np.real(np.sum(W * theta_bar, axis=1))
+    return res
+
+# ==========================================================
+# MOTOR DE CONVOLUÇÃO (grades de tempo uniformes)
+# ==========================================================
+# θ̄ = ΔT̄_adi·(1 - term_sub) no tempo é θ(t) = T_adi(t) - ∫₀ᵗ T_adi'(τ)·h(t - τ) dτ, com
+# h = L⁻¹[term_sub/s] (resposta do centro a um degrau unitário de T_adi). h só depende do solo
+# (k_rel, alphas), do raio e do passo da grade; a cinética entra por uma convolução por FFT.
+# "auto" é o padrão da varredura; em run_curva a convolução é opt-in (config["convolucao"])
+CONVOLUCAO_N_MIN = 2000  # em "auto", grades uniformes com pelo menos estes pontos usam a convolução
+CONVOLUCAO_DT_MAX = 1.0  # h; em "auto", passo máximo (erro O(dt²) contra Euler-16: ~0.01 °C a 1 h, ~1.5 °C a 25 h)
+
+def grade_uniforme(tempos):
+    """Passo dt se os tempos formam uma grade uniforme crescente (até 1e-6·dt), senão None."""
+    t = np.asarray(tempos, dtype=float).ravel()
+    if t.size < 3:
+        return None
+    dt = (t[-1] - t[0]) / (t.size - 1)
+    if not dt > 0 or np.max(np.abs(np.diff(t) - dt)) > 1e-6 * dt:
+        return None
+    return dt
+
+def usar_convolucao(tempos, modo="auto"):
+    """Se os tempos vão para calc_temperatura_convolucao: só grades uniformes e, em modo "auto", com
+    pelo menos CONVOLUCAO_N_MIN pontos e passo até CONVOLUCAO_DT_MAX; False ou "nunca" desligam."""
+    if modo is False or modo == "nunca":
+        return False
+    dt = grade_uniforme(tempos)
+    if dt is None:
+        return False
+    return modo != "auto" or (np.size(tempos) >= CONVOLUCAO_N_MIN and dt <= CONVOLUCAO_DT_MAX)
+
+def resposta_degrau(dt, n, k_rel, beta1, beta2, a, motor=None):
+    """h((j + 1/2)·dt), j = 0..n-1, invertida com o método do motor; em cache por geometria e solo."""
+    motor = motor or {}
+    inversao = tuple(motor.get("inversao") or DEFAULT_INVERSAO)
+    bessel = motor.get("bessel") or DEFAULT_BESSEL
+
+    def calcular():
+        beta_k, pesos = _coef_inversao(inversao)
+        t = (np.arange(n) + 0.5) * dt
+        h = np.empty(n)
+        for i in range(0, n, 20000):
+            S = beta_k.reshape(-1, 1) / t[i:i + 20000]
+            H = _termo_solo(S, k_rel, beta1, beta2, a, bessel, cache=False) / S
+            h[i:i + 20000] = np.real(np.sum(pesos.reshape(-1, 1) / t[i:i + 20000] * H, axis=0))
+        _contar("avaliacoes_s_resposta", S.shape[0] * n)
+        return h
+
+    chave = ("resposta", float(dt), int(n), float(k_rel), float(beta1), float(beta2), float(a), inversao, bessel)
+    return CACHE_GRADE.obter(chave, calcular)
+
+def calc_temperatura_convolucao(tempos, params_lote, T_ini=None, a=None, motor=None):
+    """Curvas T(t) de P conjuntos numa grade uniforme por convolução: (P, 9) -> (P, N_t).
+
+    A integral de Stieltjes ∫ h(t - τ) dT_adi(τ) usa os incrementos exatos de T_adi entre nós da
+    grade (também quando T_adi' é singular em t = 0, beta < 1) e h no ponto médio de cada passo
+    (erro O(dt²)). A grade interna começa no primeiro nó <= 0, para tempos que não partem de zero.
+    """
+    _T_ini = T_ini if T_ini is not None else DEFAULT_T_INI
+    _a = a if a is not None else DEFAULT_A
+    t = np.asarray(tempos, dtype=float).ravel()
+    dt = grade_uniforme(t)
+    if dt is None:
+        raise ValueError("a convolução exige uma grade de tempo uniforme e crescente")
+    P = np.atleast_2d(np.asarray(params_lote, dtype=float))
+    k0 = max(int(math.ceil(t[0] / dt - 1e-9)), 0)
+    tau = t[0] + (np.arange(k0 + t.size) - k0) * dt
+    out = np.empty((P.shape[0], t.size))
+    solos, grupo = np.unique(P[:, 6:9], axis=0, return_inverse=True)
+    for g, (k_rel, beta1, beta2) in enumerate(solos):
+        idx = np.flatnonzero(grupo.ravel() == g)
+        h = resposta_degrau(dt, tau.size - 1, k_rel, beta1, beta2, _a, motor)
+        A = T_adi_hill(tau.reshape(1, -1), *(P[idx, j].reshape(-1, 1) for j in range(6)))
+        perdido = signal.fftconvolve(np.diff(A, axis=1), h.reshape(1, -1), axes=1)[:, :tau.size - 1]
+        theta = np.concatenate([A[:, :1], A[:, 1:] - perdido], axis=1)
+        out[idx] = _T_ini + theta[:, k0:]
+    _contar("curvas_convolucao", P.shape[0])
+    return out
+
+def _ler_T_limite(cfg):
+    """config["T_limite"] como float (None se ausente); ValueError se não for numérico."""
+    T_limite = cfg.get("T_limite")
+    if T_limite is None:
+        return None
+    try:
+        return float(T_limite)
+    except (TypeError, ValueError):
+        raise ValueError("T_limite deve ser numérico.") from None
+
+def metricas_curva(params, T_ini=None, a=None, t_min=0.1, t_max=100.0, T_limite=None, motor=None, n_grade=120):
+    """Pico, taxa máxima de aquecimento e tempo acima de T_limite por busca de raízes nas derivadas.
+
+    Uma grade log-espaçada de n_grade instantes (um único passe do kernel para T, dT/dt e d2T/dt2)
+    localiza as trocas de sinal; cada raiz é refinada por brentq com avaliações pontuais.
+    Sem troca de sinal no intervalo o extremo da grade é usado e "pico_interior" fica False.
+    As derivadas herdam o erro da inversão, ampliado por s e s²: com Stehfest-10 o instante do pico
+    pode desviar ~1% e a taxa máxima ~2%; com "euler" os resultados batem com curvas densas.
+    """
+    t = np.geomspace(t_min, t_max, n_grade)
+    T, v, acel = (x[0] for x in calc_temperatura_lote(t, [params], T_ini, a, derivada=2, motor=motor))
+
+    def raizes(y, ordem, nivel=0.0, desce=True):
+        # Trocas de sinal de y - nivel na grade (só + -> - com desce=True), refinadas por brentq
+        y = y - nivel
+        troca = (y[:-1] > 0) & (y[1:] <= 0) if desce else np.sign(y[:-1]) * np.sign(y[1:]) < 0
+        f = lambda x: calc_temperatura_lote([x], [params], T_ini, a, derivada=2, motor=motor)[ordem][0, 0] - nivel
+        return [optimize.brentq(f, t[i], t[i + 1], xtol=1e-8, rtol=1e-10) for i in np.flatnonzero(troca)]
+
+    def valores(ts):
+        if not ts:
+            return np.empty(0), np.empty(0)
+        T_r, v_r, _ = (x[0] for x in calc_temperatura_lote(ts, [params], T_ini, a, derivada=2, motor=motor))
+        return T_r, v_r
+
+    t_picos = raizes(v, 1)
+    T_picos, _ = valores(t_picos)
+    if len(t_picos):
+        i = int(np.argmax(T_picos))
+        t_pico, T_pico = t_picos[i], T_picos[i]
+    else:
+        i = int(np.argmax(T))
+        t_pico, T_pico = t[i], T[i]
+
+    t_infl = raizes(acel, 2)
+    _, v_infl = valores(t_infl)
+    cand_t = np.concatenate([[t[0], t[-1]], t_infl])
+    cand_v = np.concatenate([[v[0], v[-1]], v_infl])
+    i = int(np.argmax(cand_v))
+    out = {"t_pico": float(t_pico), "T_pico": float(T_pico), "pico_interior": bool(len(t_picos)),
+           "t_taxa_max": float(cand_t[i]), "taxa_max": float(cand_v[i])}
+
+    if T_limite is not None:
+        T_limite = float(T_limite)
+        bordas = np.concatenate([[t[0]], raizes(T, 0, T_limite, desce=False), [t[-1]]])
+        meio = calc_temperatura_lote(0.5 * (bordas[:-1] + bordas[1:]), [params], T_ini, a, motor=motor)[0]
+        intervalos = [[float(t0), float(t1)] for t0, t1, Tm in zip(bordas[:-1], bordas[1:], meio) if Tm > T_limite]
+        out["T_limite"] = float(T_limite)
+        out["intervalos_acima"] = intervalos
+        out["tempo_acima"] = float(sum(t1 - t0 for t0, t1 in intervalos))
+    return out
+
+# Referência da comparação de inversões: Euler com quadratura em ln t converge a ~1e-6 °C
+_INVERSAO_REFERENCIA = ("euler", 16)
+_INVERSOES_COMPARADAS = [("stehfest", n) for n in (8, 10, 12, 14, 16)] + [("euler", n) for n in (6, 8, 10, 12, 14)]
+
+def comparar_inversoes(tempos, params, T_ini=None, a=None, tol=1e-3, candidatos=None):
+    """Erro (contra a referência) e custo de cada motor de inversão na mesma curva.
+
+    Retorna {"referencia", "tol", "metodos": [...], "recomendado"}; recomendado é o motor que
+    atinge tol (°C) com o menor número de avaliações de s por instante.
+    """
+    tempos = np.atleast_1d(np.asarray(tempos, dtype=float))
+    T_ref = calc_temperatura_centro(tempos, params, T_ini, a, motor={"inversao": _INVERSAO_REFERENCIA})
+    metodos = []
+    for inv in candidatos or _INVERSOES_COMPARADAS:
+        t0 = time.perf_counter()
+        T = calc_temperatura_centro(tempos, params, T_ini, a, motor={"inversao": inv})
+        dt = time.perf_counter() - t0
+        erro = np.abs(T - T_ref)
+        metodos.append({"metodo": inv[0], "n": inv[1], "avaliacoes_s": len(_coef_inversao(inv)[0]),
+                        "erro_max": float(np.max(erro)), "erro_rms": float(np.sqrt(np.mean(erro**2))),
+                        "tempo_ms": dt * 1e3})
+    aceitos = [m for m in metodos if m["erro_max"] <= tol]
+    melhor = min(aceitos, key=lambda m: (m["avaliacoes_s"], m["erro_max"])) if aceitos else None
+    return {"referencia": {"metodo": _INVERSAO_REFERENCIA[0], "n": _INVERSAO_REFERENCIA[1]}, "tol": tol,
+            "metodos": metodos, "recomendado": melhor and {"metodo": melhor["metodo"], "n": melhor["n"]}}
 
 # 9 Parâmetros: dT_adi1, dT_adi2, tau1, beta1, tau2, beta2, k_rel, beta_alpha1, beta_alpha2
 # beta_alpha = alpha_real × 1e4  (ex: alpha=0.004 m²/h → beta=40)
@@ -131,29 +1223,9 @@ DEFAULT_CHUTE = [45.0, 40.0, 10.0, 3.0, 25.0, 1.5, 2.9, 40.0, 30.0]
 DEFAULT_BOUNDS_INF = [5.0,  5.0,  1.0, 0.5,  1.0, 0.5, 0.5,   5.0,  3.0]
 DEFAULT_BOUNDS_SUP = [90.0, 90.0, 500.0, 10.0, 500.0, 10.0, 10.0, 100.0, 50.0]
 N_PARAMS = 9
+NOMES_PARAMETROS = ["dT_adi1", "dT_adi2", "tau1", "beta1", "tau2", "beta2", "k_rel", "alpha1", "alpha2"]
 ALPHA_SCALE = 1e-4  # fator de conversão beta → alpha
 
-# #region agent log
-_DEBUG_LOG_PATH = os.environ.get("DEBUG_LOG_PATH", "debug.log")
-
-def _to_jsonable(x):
-    if hasattr(x, "tolist"):
-        return [_to_jsonable(v) for v in x]
-    if isinstance(x, (list, tuple)):
-        return [_to_jsonable(v) for v in x]
-    if isinstance(x, (np.floating, np.integer)):
-        return float(x)
-    return x
-
-def _debug_log(msg, data):
-    try:
-        out = {"message": msg, "data": {k: _to_jsonable(v) for k, v in data.items()}}
-        with open(_DEBUG_LOG_PATH, "a") as f:
-            f.write(json.dumps(out) + "\n")
-    except Exception:
-        pass
-# #endregion
-
 def _to_beta_scale(vals):
     """Auto-converte alpha (índices 7,8) de unidades físicas para escala beta.
     Se o valor é pequeno (< 1.0), assume unidade física e multiplica por 1/ALPHA_SCALE."""
@@ -163,141 +1235,899 @@ def _to_beta_scale(vals):
             vals[idx] /= ALPHA_SCALE  # ex: 0.004 → 40
     return vals
 
-def run_otimizacao(tempos, temperaturas, chute=None, config=None):
-    cfg = config or {}
-    T_ini = float(cfg.get("T_ini", DEFAULT_T_INI))
-    a = float(cfg["diametro"]) / 2.0 if "diametro" in cfg else float(cfg.get("raio", DEFAULT_A))
-    chute = chute if chute is not None else list(cfg.get("chute", DEFAULT_CHUTE))
-    bounds_inf = list(cfg.get("bounds_inf", DEFAULT_BOUNDS_INF))
-    bounds_sup = list(cfg.get("bounds_sup", DEFAULT_BOUNDS_SUP))
+# ==========================================================
+# INGESTÃO DE CSV (streaming, com decimação durante a leitura)
+# ==========================================================
+class _Amostrador:
+    """Guarda (t, T) com memória limitada: passo fixo, intervalo mínimo de tempo e, com max_pontos,
+    dobra o passo e descarta metade dos pontos sempre que o buffer chega a 2·max_pontos.
+    """
 
-    # Auto-converter de unidades físicas para escala beta se necessário
-    chute = _to_beta_scale(chute)
-    bounds_inf = _to_beta_scale(bounds_inf)
-    bounds_sup = _to_beta_scale(bounds_sup)
+    def __init__(self, passo=1, intervalo_min=0.0, max_pontos=None):
+        self.passo = max(int(passo), 1)
+        self.intervalo_min = float(intervalo_min)
+        self.max_pontos = int(max_pontos) if max_pontos else None
+        self.t, self.T = array.array("d"), array.array("d")
+        self.validos = 0
+        self._ultimo_t = -math.inf
 
-    print(f"[DIAG] chute (beta):      {[f'{v:.2f}' for v in chute]}")
-    print(f"[DIAG] bounds_inf (beta):  {[f'{v:.2f}' for v in bounds_inf]}")
-    print(f"[DIAG] bounds_sup (beta):  {[f'{v:.2f}' for v in bounds_sup]}")
-    print(f"[DIAG] T_ini={T_ini}, a={a}")
+    def adicionar(self, t, T):
+        self.validos += 1
+        if (self.validos - 1) % self.passo or t < self._ultimo_t + self.intervalo_min:
+            return
+        self._ultimo_t = t
+        self.t.append(t)
+        self.T.append(T)
+        if self.max_pontos and len(self.t) >= 2 * self.max_pontos:
+            self.t, self.T = self.t[::2], self.T[::2]
+            self.passo *= 2
 
+def _separador_csv(linha):
+    if ";" in linha:
+        return ";"
+    return "\t" if "\t" in linha else ","
+
+def ler_csv(linhas, separador=None, colunas=(0, 1), passo=1, intervalo_min=0.0, max_pontos=None):
+    """Lê (tempo, temperatura) de um CSV linha a linha, como o parseCSV do frontend.
+
+    linhas: iterável de str ou bytes (arquivo, request.stream). Separador ',' ';' ou tab (detectado
+    na primeira linha com dígitos se None), vírgula decimal, aspas e cabeçalho opcional; linhas não
+    numéricas, NaN e infinitos são descartados. A decimação (passo, intervalo_min em h, max_pontos)
+    é feita durante a leitura, então a memória acompanha os pontos mantidos e não o tamanho do arquivo.
+    Retorna (tempos, temperaturas, resumo).
+    """
+    amostras = _Amostrador(passo, intervalo_min, max_pontos)
+    i_t, i_T = (int(c) for c in colunas)
+    n_min = max(i_t, i_T) + 1
+    linhas_texto = (l.decode("utf-8-sig", errors="replace") if isinstance(l, bytes) else l for l in linhas)
+    n_linhas = descartadas = 0
+    sep = separador
+    for linha in linhas_texto:
+        n_linhas += 1
+        if not linha.strip():
+            continue
+        if sep is None:
+            if not any(c.isdigit() for c in linha):  # cabeçalho: o separador é detectado na primeira linha de dados
+                descartadas += 1
+                continue
+            sep = _separador_csv(linha)
+        campos = next(csv.reader([linha], delimiter=sep), [])
+        if len(campos) < n_min:
+            descartadas += 1
+            continue
+        try:
+            t = float(campos[i_t].strip().replace(",", "."))
+            T = float(campos[i_T].strip().replace(",", "."))
+        except ValueError:
+            descartadas += 1
+            continue
+        if not (math.isfinite(t) and math.isfinite(T)):
+            descartadas += 1
+            continue
+        amostras.adicionar(t, T)
+    passo_final = max(math.ceil(len(amostras.t) / amostras.max_pontos), 1) if amostras.max_pontos else 1
+    tempos = np.frombuffer(amostras.t, dtype=float)[::passo_final].copy()
+    temperaturas = np.frombuffer(amostras.T, dtype=float)[::passo_final].copy()
+    resumo = {"linhas": n_linhas, "descartadas": descartadas, "validas": amostras.validos,
+              "mantidas": len(tempos), "passo": amostras.passo * passo_final}
+    return tempos, temperaturas, resumo
+
+# ==========================================================
+# REDUÇÃO DOS PONTOS DE AJUSTE
+# ==========================================================
+# Cada redução recebe (t, T, n_pontos, idx_pico) e devolve (t_fit, T_fit, pesos ou None).
+# O orçamento é dividido em 40% até o pico e 60% depois, como a seleção original por índice.
+def _dividir_orcamento(n_pontos):
+    n_antes = max(int(round(0.4 * n_pontos)), 2)
+    return n_antes, max(n_pontos - n_antes, 2)
+
+def _reducao_indice(t, T, n_pontos, idx_pico):
+    """Índices igualmente espaçados antes e depois do pico (padrão: 40 + 60 pontos)."""
+    n_antes, n_depois = _dividir_orcamento(n_pontos)
+    idx = np.unique(np.round(np.concatenate([
+        np.linspace(0, idx_pico, n_antes), np.linspace(idx_pico + 1, len(t) - 1, n_depois)
+    ])).astype(int))
+    idx = idx[(idx >= 0) & (idx < len(t))]
+    return t[idx], T[idx], None
+
+def _variancia_ruido(T):
+    """Variância do ruído pelas segundas diferenças (MAD robusto; a tendência suave quase não entra)."""
+    if len(T) < 5:
+        return 0.0
+    d2 = np.diff(T, 2)
+    return float((1.4826 * np.median(np.abs(d2 - np.median(d2))))**2 / 6.0)
+
+def _reducao_bins(t, T, n_pontos, idx_pico):
+    """Médias em intervalos de tempo iguais (antes e depois do pico), com peso n/σ² por intervalo.
+
+    Em intervalos com 5 pontos ou mais, a média de T é corrigida pela curvatura (parábola ajustada
+    no intervalo, avaliada no tempo médio) e σ² é a variância em torno dessa parábola. O piso de σ² é
+    a variância global do ruído (que também serve aos intervalos menores), então o peso só cai onde o
+    intervalo é mais ruidoso que a curva toda; os pesos saem com média 1.
+    """
+    n_antes, n_depois = _dividir_orcamento(n_pontos)
+    bordas = np.concatenate([np.linspace(t[0], t[idx_pico], n_antes + 1)[:-1],
+                             np.linspace(t[idx_pico], t[-1], n_depois + 1)])
+    bordas[-1] = np.nextafter(bordas[-1], np.inf)
+    grupo = np.searchsorted(bordas, t, side="right") - 1
+    grupo[idx_pico] = n_antes  # o pico abre o primeiro intervalo depois dele
+    nb = len(bordas) - 1
+    n = np.bincount(grupo, minlength=nb).astype(float)
+    ok = n > 0
+    soma = lambda x: np.bincount(grupo, weights=x, minlength=nb)[ok]
+    n = n[ok]
+    t_m, T_m = soma(t) / n, soma(T) / n
+    # Parábola em torno do tempo médio de cada intervalo, na base ortogonal {1, dt, q}:
+    # q = dt² - Var(dt) - (Stq/Stt)·dt; o valor em t_m é T_m - c·Var(dt), com c = Sqy/Sqq
+    dt, dT = t - np.repeat(t_m, n.astype(int)), T - np.repeat(T_m, n.astype(int))
+    div = lambda a, b: np.divide(a, b, out=np.zeros_like(a), where=b > 0)
+    Stt, Sty, Syy = soma(dt * dt), soma(dt * dT), soma(dT * dT)
+    m2 = Stt / n
+    q = dt * dt - np.repeat(m2, n.astype(int))
+    Stq = soma(dt * q)
+    q = q - np.repeat(div(Stq, Stt), n.astype(int)) * dt
+    Sqq, Sqy = soma(q * q), soma(q * dT)
+    c = np.where(n >= 5, div(Sqy, Sqq), 0.0)
+    T_m = T_m - c * m2
+    resid = Syy - div(Sty**2, Stt) - div(Sqy**2, Sqq)
+    var_global = max(_variancia_ruido(T), 1e-12)
+    var = np.where(n >= 5, np.maximum(resid / np.maximum(n - 3, 1), var_global), var_global)
+    pesos = n / var
+    return t_m, T_m, pesos / pesos.mean()
+
+def _reducao_lttb(t, T, n_pontos, idx_pico):
+    """Largest-Triangle-Three-Buckets: mantém os pontos que preservam a forma da curva (e o pico)."""
+    if len(t) <= n_pontos:
+        return t, T, None
+    bordas = np.linspace(1, len(t) - 1, n_pontos - 1).astype(int)
+    idx = [0]
+    for k in range(n_pontos - 2):
+        ini, fim = bordas[k], bordas[k + 1]
+        prox_ini, prox_fim = fim, bordas[k + 2] if k + 2 < len(bordas) else len(t)
+        t_c, T_c = t[prox_ini:prox_fim].mean(), T[prox_ini:prox_fim].mean()
+        a_ = idx[-1]
+        area = np.abs((t[a_] - t_c) * (T[ini:fim] - T[a_]) - (t[a_] - t[ini:fim]) * (T_c - T[a_]))
+        idx.append(ini + int(np.argmax(area)))
+    idx = np.unique(np.append(idx, [idx_pico, len(t) - 1]))
+    return t[idx], T[idx], None
+
+REDUCOES = {"indice": _reducao_indice, "bins": _reducao_bins, "lttb": _reducao_lttb}
+DEFAULT_REDUCAO = "indice"
+DEFAULT_PONTOS_AJUSTE = 100
+
+def reduzir_pontos(t, T, reducao=None):
+    """Aplica a redução config["reducao"] = nome ou {"metodo", "pontos"}: (t_fit, T_fit, pesos, idx_pico)."""
+    reducao = reducao or DEFAULT_REDUCAO
+    reducao = reducao if isinstance(reducao, dict) else {"metodo": reducao}
+    metodo = reducao.get("metodo", DEFAULT_REDUCAO)
+    if metodo not in REDUCOES:
+        raise ValueError(f"reducao deve ser uma de {sorted(REDUCOES)}")
+    n_pontos = max(int(reducao.get("pontos", DEFAULT_PONTOS_AJUSTE)), 12)
+    idx_pico = int(np.argmax(T))
+    t_fit, T_fit, pesos = REDUCOES[metodo](t, T, n_pontos, idx_pico)
+    return t_fit, T_fit, pesos, idx_pico
+
+def _pontos_ajuste(tempos, temperaturas, reducao=None):
+    """Filtra (t > 0.1, sem NaN), ordena e reduz os pontos medidos: (t_exp, T_exp, t_fit, T_fit, pesos, idx_pico)."""
     t_exp = np.asarray(tempos, dtype=float)
     T_exp = np.asarray(temperaturas, dtype=float)
     valid = (t_exp > 0.1) & (~np.isnan(t_exp)) & (~np.isnan(T_exp))
     t_exp, T_exp = t_exp[valid], T_exp[valid]
+    if np.any(np.diff(t_exp) < 0):
+        ordem = np.argsort(t_exp, kind="stable")
+        t_exp, T_exp = t_exp[ordem], T_exp[ordem]
+    return (t_exp, T_exp) + reduzir_pontos(t_exp, T_exp, reducao)
 
-    idx_pico_exp = np.argmax(T_exp)
-    idx_fit = np.unique(np.round(np.concatenate([
-        np.linspace(0, idx_pico_exp, 40), np.linspace(idx_pico_exp + 1, len(t_exp) - 1, 60)
-    ])).astype(int))
-    idx_fit = idx_fit[(idx_fit >= 0) & (idx_fit < len(t_exp))]
-    t_fit, T_fit = t_exp[idx_fit], T_exp[idx_fit]
+# ==========================================================
+# ARQUIVO DE AJUSTES (SQLite local, chutes pelos vizinhos mais próximos)
+# ==========================================================
+# Características da curva medida, conhecidas antes do ajuste, e a escala de cada uma na distância
+CARACTERISTICAS = ("raio", "T_ini", "dT_pico", "ln_t_pico", "ln_t_meio", "ln_t_final")
+_ESCALAS_CARAC = np.array([0.25, 5.0, 5.0, 0.2, 0.2, 0.5])
+
+def caracteristicas_curva(t, T, T_ini, a):
+    """Raio, T_ini, elevação no pico, ln do instante do pico, da meia elevação e do último ponto."""
+    t, T = np.asarray(t, dtype=float), np.asarray(T, dtype=float)
+    i = int(np.argmax(T))
+    dT = float(T[i] - T_ini)
+    meio = np.flatnonzero(T[:i + 1] >= T_ini + 0.5 * dT)
+    t_meio = t[meio[0]] if meio.size else t[i]
+    return {"raio": float(a), "T_ini": float(T_ini), "dT_pico": dT, "ln_t_pico": float(np.log(max(t[i], 1e-3))),
+            "ln_t_meio": float(np.log(max(t_meio, 1e-3))), "ln_t_final": float(np.log(max(t[-1], 1e-3)))}
+
+class ArquivoAjustes:
+    """Ajustes anteriores (parâmetros em escala beta, características da curva, custo, nfev) em SQLite.
+
+    As características de todos os ajustes ficam também numa matriz em memória, recarregada quando
+    o banco muda (PRAGMA data_version para outras conexões, contador local para esta), e os vizinhos mais próximos saem de uma distância euclidiana escalada
+    (_ESCALAS_CARAC). Sem caminho (ARQUIVO_AJUSTES não definido) o arquivo fica desligado.
+    """
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conexao = None
+        self._indice = None  # (versão, ids, matriz de características)
+        self._escritas = 0  # gravações desta conexão (data_version só muda com as de outras conexões)
+
+    @property
+    def ativo(self):
+        return bool(self.caminho)
+
+    def _conectar(self):
+        if self._conexao is None:
+            if os.path.dirname(self.caminho):
+                os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+            con = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False)
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA journal_mode=WAL")
+            colunas = ", ".join(f"{c} REAL NOT NULL" for c in CARACTERISTICAS)
+            con.execute(f"""CREATE TABLE IF NOT EXISTS ajustes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, criado REAL NOT NULL, rotulo TEXT, {colunas},
+                n_pontos INTEGER, custo REAL, erro_mae REAL, nfev INTEGER, params TEXT NOT NULL)""")
+            con.execute("CREATE INDEX IF NOT EXISTS ajustes_raio ON ajustes (raio, dT_pico)")
+            con.commit()
+            self._conexao = con
+        return self._conexao
+
+    def gravar(self, carac, params, custo=None, erro_mae=None, nfev=None, n_pontos=None, rotulo=None):
+        """Acrescenta um ajuste e devolve o id."""
+        with self._lock:
+            con = self._conectar()
+            cur = con.execute(
+                f"INSERT INTO ajustes (criado, rotulo, {', '.join(CARACTERISTICAS)}, n_pontos, custo, erro_mae, nfev, params) "
+                f"VALUES (?, ?, {', '.join('?' * len(CARACTERISTICAS))}, ?, ?, ?, ?, ?)",
+                (time.time(), rotulo, *(carac[c] for c in CARACTERISTICAS), n_pontos, custo, erro_mae, nfev,
+                 json.dumps([float(x) for x in params])))
+            con.commit()
+            self._escritas += 1
+            return cur.lastrowid
+
+    def _matriz(self, con):
+        versao = (con.execute("PRAGMA data_version").fetchone()[0], self._escritas)
+        if self._indice is None or self._indice[0] != versao:
+            linhas = con.execute(f"SELECT id, {', '.join(CARACTERISTICAS)} FROM ajustes ORDER BY id").fetchall()
+            dados = np.array([tuple(l) for l in linhas], dtype=float).reshape(-1, len(CARACTERISTICAS) + 1)
+            self._indice = (versao, dados[:, 0].astype(np.int64), dados[:, 1:] / _ESCALAS_CARAC)
+        return self._indice[1], self._indice[2]
+
+    def vizinhos(self, carac, k=3, distancia_max=None):
+        """Os k ajustes mais próximos das características dadas, com a distância, do mais perto ao mais longe."""
+        with self._lock:
+            con = self._conectar()
+            ids, X = self._matriz(con)
+            if ids.size == 0:
+                return []
+            x = np.array([carac[c] for c in CARACTERISTICAS]) / _ESCALAS_CARAC
+            d = np.sqrt(np.sum((X - x)**2, axis=1))
+            ordem = np.argsort(d)[:k] if ids.size > k else np.argsort(d)
+            if distancia_max is not None:
+                ordem = ordem[d[ordem] <= distancia_max]
+            linhas = {l["id"]: l for l in con.execute(
+                f"SELECT * FROM ajustes WHERE id IN ({', '.join('?' * len(ordem))})", [int(ids[i]) for i in ordem])}
+        return [{**self._linha(linhas[int(ids[i])]), "distancia": float(d[i])} for i in ordem]
 
-    # ==========================================================
-    # PASSO 1: Regressão na Fase de Aquecimento (Meio Infinito)
-    # ==========================================================
-    idx_step1 = [i for i in idx_fit if i <= idx_pico_exp + 5] # Até o pico + pequena margem
-    t_step1, T_step1 = t_exp[idx_step1], T_exp[idx_step1]
+    @staticmethod
+    def _linha(linha):
+        out = dict(linha)
+        out["params"] = json.loads(out["params"])
+        return out
+
+    def obter(self, ajuste_id):
+        with self._lock:
+            linha = self._conectar().execute("SELECT * FROM ajustes WHERE id = ?", (ajuste_id,)).fetchone()
+        return None if linha is None else self._linha(linha)
+
+    def listar(self, filtros=None, limite=100, deslocamento=0):
+        """Ajustes mais recentes primeiro; filtros = {"<caracteristica>_min"/"_max": valor, "rotulo": texto}."""
+        where, valores = [], []
+        for nome, valor in (filtros or {}).items():
+            campo, _, lado = nome.rpartition("_")
+            if campo in CARACTERISTICAS and lado in ("min", "max"):
+                where.append(f"{campo} {'>=' if lado == 'min' else '<='} ?")
+                valores.append(float(valor))
+            elif nome == "rotulo":
+                where.append("rotulo = ?")
+                valores.append(valor)
+            else:
+                raise ValueError(f"filtro desconhecido: {nome}")
+        sql = "SELECT * FROM ajustes" + (" WHERE " + " AND ".join(where) if where else "")
+        with self._lock:
+            con = self._conectar()
+            total = con.execute(sql.replace("SELECT *", "SELECT COUNT(*)", 1), valores).fetchone()[0]
+            linhas = con.execute(sql + " ORDER BY id DESC LIMIT ? OFFSET ?", valores + [int(limite), int(deslocamento)]).fetchall()
+        return {"total": total, "ajustes": [self._linha(l) for l in linhas]}
+
+    def remover(self, ajuste_id):
+        with self._lock:
+            con = self._conectar()
+            n = con.execute("DELETE FROM ajustes WHERE id = ?", (ajuste_id,)).rowcount
+            con.commit()
+            self._escritas += 1
+        return n > 0
+
+ARQUIVO = ArquivoAjustes(os.environ.get("ARQUIVO_AJUSTES") or None)
+
+def _chute_arquivo(arq_cfg, carac, chute, bounds_inf, bounds_sup, t_fit, T_fit, raiz_w, T_ini, a, motor):
+    """Chute (e limites, se pedidos) a partir dos vizinhos no ARQUIVO: (chute, inf, sup, info).
+
+    Os parâmetros dos k vizinhos e o chute original são avaliados numa única chamada em lote nos
+    pontos do ajuste, e o de menor custo vira o chute. Com "limites" os limites passam a envolver
+    os vizinhos com folga de "folga" (relativa, padrão 0.5) de cada lado, dentro dos originais.
+    """
+    vizinhos = ARQUIVO.vizinhos(carac, int(arq_cfg.get("vizinhos", 3)), arq_cfg.get("distancia_max"))
+    info = {"vizinhos": [{"id": v["id"], "distancia": v["distancia"]} for v in vizinhos], "chute": "padrao",
+            "limites": False}
+    if not vizinhos:
+        return chute, bounds_inf, bounds_sup, info
+    inf, sup = np.array(bounds_inf), np.array(bounds_sup)
+    candidatos = np.clip(np.array([chute] + [v["params"] for v in vizinhos], dtype=float), inf, sup)
+    with fase("arquivo"):
+        T_cand = calc_temperatura_lote(t_fit, candidatos, T_ini=T_ini, a=a, motor=motor)
+    custos = 0.5 * np.sum((raiz_w * (T_cand - T_fit))**2, axis=1)
+    melhor = int(np.argmin(custos))
+    if melhor > 0:
+        info["chute"] = vizinhos[melhor - 1]["id"]
+        chute = list(candidatos[melhor])
+    if arq_cfg.get("limites") and len(vizinhos) >= 2:
+        P = candidatos[1:]
+        folga = float(arq_cfg.get("folga", 0.5)) * np.maximum(P.max(axis=0) - P.min(axis=0), 0.1 * np.abs(P).max(axis=0))
+        bounds_inf = list(np.maximum(inf, P.min(axis=0) - folga))
+        bounds_sup = list(np.minimum(sup, P.max(axis=0) + folga))
+        chute = list(np.clip(chute, bounds_inf, bounds_sup))
+        info["limites"] = True
+    return chute, bounds_inf, bounds_sup, info
+
+# ==========================================================
+# PASSOS DO AJUSTE
+# ==========================================================
+def _passo1(t_step1, T_step1, chute, bounds_inf, bounds_sup, T_ini, a, motor, pesos=None, verbose=0,
+            x_scale="jac", tol=1e-5, parada=None):
+    """PASSO 1: regressão na fase de aquecimento (meio infinito), só os 6 parâmetros de Hill.
+
+    pesos (opcional, um por ponto) multiplicam resíduos e jacobiano por sqrt(peso). x_scale, tol
+    (ftol = xtol) e parada (ver _callback_passo) permitem partir a quente de um ajuste anterior.
+    """
+    raiz_w = 1.0 if pesos is None else np.sqrt(pesos)
+    motor = {**motor, "alphas_fixos": True}  # termos de Bessel iguais em todas as iterações: vão ao cache
 
     def residuals_step1(p_hill):
         # Fixa k_rel = 1.0 e alpha1 = alpha2 (fronteira térmica invisível)
         p_full = list(p_hill) + [1.0, chute[7], chute[7]]
-        return calc_temperatura_centro(t_step1, p_full, T_ini=T_ini, a=a) - T_step1
+        return raiz_w * (calc_temperatura_centro(t_step1, p_full, T_ini=T_ini, a=a, motor=motor) - T_step1)
+
+    def jac_step1(p_hill):
+        p_full = list(p_hill) + [1.0, chute[7], chute[7]]
+        return np.reshape(raiz_w, (-1, 1)) * calc_jacobiano_centro(t_step1, p_full, a=a, motor=motor)[:, :6]
 
     chute_step1 = np.clip(chute[:6], bounds_inf[:6], bounds_sup[:6])
-    print("\n[OTIMIZAÇÃO] Iniciando Passo 1 (Aquecimento)...")
-    res1 = least_squares(residuals_step1, chute_step1, bounds=(bounds_inf[:6], bounds_sup[:6]),
-                         method="trf", x_scale="jac", diff_step=1e-6, ftol=1e-5, xtol=1e-5, verbose=2)
-    p_hill_opt = res1.x
-
-    # ==========================================================
-    # PASSO 2: Regressão Completa (Solo ativado)
-    # ==========================================================
-    chute_step2 = np.array(list(p_hill_opt) + [chute[6], chute[7], chute[8]])
-    chute_step2 = np.clip(chute_step2, bounds_inf, bounds_sup)
-    _debug_log("Passo2 entrada", {"len_chute_step2": len(chute_step2), "len_bounds_inf": len(bounds_inf), "len_bounds_sup": len(bounds_sup), "chute_step2": chute_step2})
+    return least_squares(residuals_step1, chute_step1, jac=jac_step1, bounds=(bounds_inf[:6], bounds_sup[:6]),
+                         method="trf", x_scale=x_scale, ftol=tol, xtol=tol, verbose=verbose,
+                         callback=_callback_passo("passo1", parada))
+
+def _passo2(t_fit, T_fit, chute_step2, bounds_inf, bounds_sup, T_ini, a, motor, pesos=None, verbose=0,
+            x_scale="jac", tol=1e-5, parada=None):
+    """PASSO 2: regressão completa (solo ativado) com os 9 parâmetros (demais argumentos como no passo 1)."""
+    raiz_w = 1.0 if pesos is None else np.sqrt(pesos)
+
     def residuals_step2(p_full):
-        return calc_temperatura_centro(t_fit, p_full, T_ini=T_ini, a=a) - T_fit
-
-    print("\n[OTIMIZAÇÃO] Iniciando Passo 2 (Completo 9D)...")
-    res2 = least_squares(residuals_step2, chute_step2, bounds=(bounds_inf, bounds_sup),
-                         method="trf", x_scale="jac", diff_step=1e-6, ftol=1e-5, xtol=1e-5, verbose=2)
-    p_opt = res2.x
-    # Verificação cruzada: custo real vs custo reportado
-    resid_check = calc_temperatura_centro(t_fit, p_opt, T_ini=T_ini, a=a) - T_fit
-    cost_check = 0.5 * np.sum(resid_check**2)
-    igual_678 = [float(p_opt[j]) == float(chute_step2[j]) for j in (6, 7, 8)]
-    print(f"[DIAG] Step1 result:  {[f'{v:.2f}' for v in p_hill_opt]}")
-    print(f"[DIAG] Step2 chute:   {[f'{v:.2f}' for v in chute_step2]}")
-    print(f"[DIAG] Step2 result:  {[f'{v:.2f}' for v in p_opt]}")
-    print(f"[DIAG] Step2 nfev={res2.nfev}, cost_scipy={res2.cost:.4e}, cost_check={cost_check:.4e}, status={res2.status}")
-    print(f"[DIAG] k_rel/a1/a2 unchanged: {igual_678}")
-    _debug_log("Passo2 saida", {"len_p_opt": len(p_opt), "p_opt": p_opt, "chute_step2": chute_step2,
-                                  "p_opt_igual_chute_em_678": igual_678, "res2_nfev": res2.nfev,
-                                  "res2_cost": res2.cost, "res2_optimality": res2.optimality,
-                                  "res2_status": res2.status, "res2_message": res2.message})
+        return raiz_w * (calc_temperatura_centro(t_fit, p_full, T_ini=T_ini, a=a, motor=motor) - T_fit)
 
-    # --- Estatística Assintótica ---
-    conf_raw = float(cfg.get("confianca", 95))
-    confianca_nivel = conf_raw / 100.0 if conf_raw > 1.0 else conf_raw
-    n_obs, p_par = len(t_fit), len(p_opt)
-    df_resid = n_obs - p_par
-    t_crit = stats.t.ppf(1 - (1 - confianca_nivel) / 2, df_resid)
-
-    # Jacobiano do scipy + residuais verificados (cross-check)
-    Fdot = res2.jac
-
-    _debug_log("Jacobiano stats", {
-        "Fdot_col_norms": np.linalg.norm(Fdot, axis=0).tolist(),
-        "Fdot_shape": list(Fdot.shape),
-    })
-
-    # Usar resíduos verificados (avaliados diretamente), não res2.fun
-    # que pode estar em escala interna diferente se x_scale foi usado
-    s2 = np.sum(resid_check**2) / df_resid
-    s = np.sqrt(s2)
-
-    scale_factors = np.linalg.norm(Fdot, axis=0)
-    scale_factors[scale_factors < 1e-12] = 1.0
-    F_scaled = Fdot / scale_factors
-    FtF_s = F_scaled.T @ F_scaled
+    def jac_step2(p_full):
+        return np.reshape(raiz_w, (-1, 1)) * calc_jacobiano_centro(t_fit, p_full, a=a, motor=motor)
+
+    return least_squares(residuals_step2, chute_step2, jac=jac_step2, bounds=(bounds_inf, bounds_sup),
+                         method="trf", x_scale=x_scale, ftol=tol, xtol=tol, verbose=verbose,
+                         callback=_callback_passo("passo2", parada))
+
+def _tarefa_passo1(args):
+    res = _passo1(*args)
+    return res.x, res.cost, res.nfev, res.njev
+
+def _tarefa_passo2(args):
+    res = _passo2(*args)
+    return res.x, res.cost, res.nfev, res.njev, res.jac
+
+# ==========================================================
+# Pool de processos compartilhado (multi-start, lotes, bootstrap)
+# ==========================================================
+POOL_WORKERS = int(os.environ.get("POOL_WORKERS", os.cpu_count() or 1))
+_pool = None
+_pool_lock = threading.Lock()
+_EM_WORKER = False
+
+def _iniciar_worker():
+    # Dentro de um worker (ex.: um ajuste do lote com multi_start) tudo roda em série: sem pools aninhados
+    global _EM_WORKER
+    _EM_WORKER = True
+
+def get_pool():
+    """ProcessPoolExecutor do processo (spawn: seguro sob gunicorn com threads), criado na primeira chamada.
+
+    Devolve None com POOL_WORKERS <= 1 ou dentro de um worker; quem chama executa então no próprio processo.
+    """
+    global _pool
+    if POOL_WORKERS <= 1 or _EM_WORKER:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_iniciar_worker)
+    return _pool
 
-    FtF_s_inv = np.linalg.pinv(FtF_s, rcond=1e-5)
+def _mapear(funcao, tarefas):
+    """map no pool compartilhado (ou em série sem pool), preservando a ordem."""
+    pool = get_pool()
+    return list(pool.map(funcao, tarefas) if pool is not None else map(funcao, tarefas))
+
+def inicios_latin_hypercube(n, chute, bounds_inf, bounds_sup, semente=0):
+    """n pontos de partida: o chute (limitado aos bounds) e n-1 amostras de hipercubo latino.
+
+    Parâmetros cujo intervalo cobre mais de uma década (taus, alphas) são amostrados em escala log.
+    """
+    inf, sup = np.asarray(bounds_inf, dtype=float), np.asarray(bounds_sup, dtype=float)
+    u = stats.qmc.LatinHypercube(d=len(inf), seed=semente).random(max(n - 1, 0))
+    em_log = (inf > 0) & (sup > 10 * inf)
+    amostras = inf + u * (sup - inf)
+    amostras[:, em_log] = np.exp(np.log(inf[em_log]) + u[:, em_log] * np.log(sup[em_log] / inf[em_log]))
+    return np.vstack([np.clip(chute, inf, sup), amostras])
+
+MULTI_START_MAX = int(os.environ.get("MULTI_START_MAX", 64))  # inícios por ajuste
+
+def _ler_multi_start(cfg):
+    """config["multi_start"] (n ou {"n", "poda", "manter_min", "semente"}) validado; ValueError se inválido."""
+    ms_cfg = cfg.get("multi_start") or 1
+    ms_cfg = ms_cfg if isinstance(ms_cfg, dict) else {"n": ms_cfg}
+    desconhecidas = set(ms_cfg) - {"n", "poda", "manter_min", "semente"}
+    if desconhecidas:
+        raise ValueError(f"multi_start: chaves desconhecidas {sorted(desconhecidas)}.")
+    try:
+        n, manter_min, semente = (int(ms_cfg.get(k, padrao)) for k, padrao in (("n", 1), ("manter_min", 2), ("semente", 0)))
+        poda = float(ms_cfg.get("poda", 3.0))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("multi_start deve ser um inteiro ou {n, poda, manter_min, semente} numéricos.") from None
+    if not 1 <= n <= MULTI_START_MAX:
+        raise ValueError(f"multi_start: n deve estar entre 1 e {MULTI_START_MAX}.")
+    if not (manter_min >= 1 and semente >= 0 and 1.0 <= poda < np.inf):
+        raise ValueError("multi_start: manter_min >= 1, semente >= 0 e poda >= 1 (finita).")
+    return {"n": n, "poda": poda, "manter_min": manter_min, "semente": semente}
+
+def _multi_start(ms_cfg, chute, bounds_inf, bounds_sup, t_step1, T_step1, t_fit, T_fit, T_ini, a, motor,
+                 pesos_step1=None, pesos=None):
+    """Ajuste em dois passos a partir de vários inícios no pool de processos.
+
+    Todos os inícios fazem o passo 1; só seguem para o passo 2 os de custo <= poda·(melhor custo)
+    (no mínimo os 'manter_min' melhores). Retorna (p_opt, jacobiano no ótimo, resumo da dispersão).
+    """
+    n, poda, manter_min = ms_cfg["n"], ms_cfg["poda"], ms_cfg["manter_min"]
+    inicios = inicios_latin_hypercube(n, chute, bounds_inf, bounds_sup, ms_cfg["semente"])
+
+    with fase("passo1"):
+        res1 = _mapear(_tarefa_passo1, [(t_step1, T_step1, list(p), bounds_inf, bounds_sup, T_ini, a, motor, pesos_step1)
+                                        for p in inicios])
+    custos1 = np.array([r[1] for r in res1])
+    _contar("nfev_passo1", sum(r[2] for r in res1))
+    _contar("njev_passo1", sum(r[3] for r in res1))
+    ordem = np.argsort(custos1)
+    vivos = [i for k, i in enumerate(ordem) if k < manter_min or custos1[i] <= poda * custos1[ordem[0]]]
+
+    with fase("passo2"):
+        tarefas = [(t_fit, T_fit, np.clip(np.concatenate([res1[i][0], inicios[i][6:]]), bounds_inf, bounds_sup),
+                    bounds_inf, bounds_sup, T_ini, a, motor, pesos) for i in vivos]
+        res2 = _mapear(_tarefa_passo2, tarefas)
+    _contar("nfev_passo2", sum(r[2] for r in res2))
+    _contar("njev_passo2", sum(r[3] for r in res2))
+
+    custos2 = np.array([r[1] for r in res2])
+    melhor = int(np.argmin(custos2))
+    otimos = np.array([r[0] for r in res2])
+    # Os termos de Hill são permutáveis: (dT1, tau1, beta1) <-> (dT2, tau2, beta2) dá a mesma curva.
+    # A dispersão é medida com tau1 <= tau2 para não confundir essa troca com ótimos distintos.
+    fisico = otimos.copy()
+    trocar = fisico[:, 2] > fisico[:, 4]
+    fisico[np.ix_(trocar, [0, 1, 2, 3, 4, 5])] = fisico[np.ix_(trocar, [1, 0, 4, 5, 2, 3])]
+    fisico[:, 7:] *= ALPHA_SCALE
+    resumo = {
+        "inicios": n, "podados": n - len(vivos), "workers": POOL_WORKERS,
+        "custo_melhor": float(custos2[melhor]),
+        "otimos": [{"custo": float(custos2[i]), "custo_passo1": float(custos1[vivos[i]]), "estimado": fisico[i].tolist()}
+                   for i in np.argsort(custos2)],
+        "dispersao": {nome: {"min": float(fisico[:, j].min()), "max": float(fisico[:, j].max()),
+                             "desvio": float(fisico[:, j].std())} for j, nome in enumerate(NOMES_PARAMETROS)},
+    }
+    return otimos[melhor], res2[melhor][4], resumo
+
+INCERTEZAS = ("assintotica", "bootstrap", "monte_carlo")
+
+def _tarefa_reajustes(args):
+    """Reajusta (passo 2, a quente) cada conjunto de temperaturas sintéticas de um lote."""
+    t_fit, amostras, x0, bounds_inf, bounds_sup, T_ini, a, motor, pesos, x_scale = args
+    return np.array([_passo2(t_fit, T_amostra, x0, bounds_inf, bounds_sup, T_ini, a, motor, pesos,
+                             x_scale=x_scale, tol=1e-4).x for T_amostra in amostras])
+
+def _reamostrar(inc_cfg, p_opt, Fdot, resid_w, raiz_w, t_fit, T_fit, pesos, bounds_inf, bounds_sup, T_ini, a, motor):
+    """Amostras de parâmetros por reajustes em dados sintéticos, no pool de processos.
+
+    "bootstrap": resíduos (ponderados, centrados) reamostrados com reposição sobre a curva ajustada;
+    "monte_carlo": ruído gaussiano com a variância estimada (s²/peso). Cada reajuste parte de p_opt
+    com a escala do jacobiano do ajuste. Os lotes são enviados em rodadas até n amostras ou até
+    esgotar tempo_max_s. Retorna (amostras (k, 9), resumo).
+    """
+    metodo = inc_cfg.get("metodo")
+    if metodo not in INCERTEZAS:
+        raise ValueError(f"incerteza deve ser uma de {list(INCERTEZAS)}")
+    n = int(inc_cfg.get("n", 200))
+    tempo_max = float(inc_cfg.get("tempo_max_s", 20.0))
+    rng = np.random.default_rng(inc_cfg.get("semente", 0))
+    t0 = time.perf_counter()
+
+    T_hat = T_fit + resid_w / raiz_w  # curva ajustada nos pontos do ajuste
+    df = max(len(T_fit) - len(p_opt), 1)
+    if metodo == "bootstrap":
+        base = (resid_w - resid_w.mean()) * np.sqrt(len(T_fit) / df)  # correção de alavancagem média
+        sintetico = lambda: T_hat + rng.choice(base, len(base)) / raiz_w
+    else:
+        s = np.sqrt(np.sum(resid_w**2) / df)
+        sintetico = lambda: T_hat + rng.normal(0.0, s, len(T_fit)) / raiz_w
+    normas = np.linalg.norm(Fdot, axis=0)
+    x_scale = np.where(normas > 1e-12, 1.0 / np.maximum(normas, 1e-12), 1.0)
+
+    workers = POOL_WORKERS if get_pool() is not None else 1
+    lote = 4
+    amostras, rodada_s, interrompido = [], 0.0, False
+    while len(amostras) < n:
+        if time.perf_counter() - t0 + rodada_s > tempo_max:
+            interrompido = True
+            break
+        t_rodada = time.perf_counter()
+        faltam = n - len(amostras)
+        tamanhos = [min(lote, faltam - k * lote) for k in range(min(workers, -(-faltam // lote)))]
+        tarefas = [(t_fit, [sintetico() for _ in range(m)], p_opt, bounds_inf, bounds_sup, T_ini, a, motor, pesos, x_scale)
+                   for m in tamanhos]
+        for x in _mapear(_tarefa_reajustes, tarefas):
+            amostras.extend(x)
+        rodada_s = time.perf_counter() - t_rodada
+    _contar("reajustes_incerteza", len(amostras))
+    P = np.array(amostras).reshape(-1, len(p_opt))
+    return P, {"metodo": metodo, "amostras": len(P), "solicitadas": n, "workers": workers,
+               "interrompido_por_tempo": interrompido, "tempo_s": time.perf_counter() - t0}
+
+def _inversa_FtF(F):
+    """(FᵀF)⁻¹ com as colunas de F normalizadas antes da pseudo-inversa (parâmetros em escalas muito diferentes)."""
+    scale_factors = np.linalg.norm(F, axis=0)
+    scale_factors[scale_factors < 1e-12] = 1.0
+    F_scaled = F / scale_factors
+    FtF_s_inv = np.linalg.pinv(F_scaled.T @ F_scaled, rcond=1e-5)
     D_inv = np.diag(1.0 / scale_factors)
-    FtF_inv = D_inv @ FtF_s_inv @ D_inv
+    return D_inv @ FtF_s_inv @ D_inv
+
+def _ajuste_quente(estado, cfg, t_exp, T_exp, idx_pico, t_step1, T_step1, pesos_step1, t_fit, T_fit, pesos,
+                   bounds_inf, bounds_sup, T_ini, a, motor, verbose):
+    """Reajuste a partir do p_opt e da escala do ajuste anterior (sessões de monitoramento).
 
-    Sigma = s2 * FtF_inv
-    SE_param = np.sqrt(np.clip(np.diag(Sigma), 0, None))
-    IC_inf, IC_sup = p_opt - t_crit * SE_param, p_opt + t_crit * SE_param
+    Com o pico já passado (queda >= config["queda_pico"] °C, padrão 0.5, depois dele) o passo 1 é
+    pulado; tolerâncias mais frouxas (config["tol_quente"]) e parada quando o custo para de cair
+    (config["parada"], queda relativa por iteração) mantêm a atualização barata.
+    """
+    x0 = np.clip(np.asarray(estado["p_opt"], dtype=float), bounds_inf, bounds_sup)
+    x_scale = estado.get("x_scale")
+    x_scale = "jac" if x_scale is None else np.asarray(x_scale, dtype=float)
+    tol = float(cfg.get("tol_quente", 1e-4))
+    parada = float(cfg.get("parada", 1e-3))
+    pico_passado = idx_pico < len(T_exp) - 1 and T_exp[idx_pico] - T_exp[-1] >= float(cfg.get("queda_pico", 0.5))
+    info = {"passo1_pulado": bool(pico_passado), "nfev": 0}
+    if not pico_passado:
+        with fase("passo1"):
+            res1 = _passo1(t_step1, T_step1, x0, bounds_inf, bounds_sup, T_ini, a, motor, pesos_step1, verbose,
+                           x_scale=x_scale if isinstance(x_scale, str) else x_scale[:6], tol=tol, parada=parada)
+        _contar("nfev_passo1", res1.nfev)
+        _contar("njev_passo1", res1.njev)
+        info["nfev"] += int(res1.nfev)
+        x0 = np.clip(np.concatenate([res1.x, x0[6:]]), bounds_inf, bounds_sup)
+    with fase("passo2"):
+        res2 = _passo2(t_fit, T_fit, x0, bounds_inf, bounds_sup, T_ini, a, motor, pesos, verbose,
+                       x_scale=x_scale, tol=tol, parada=parada)
+    _contar("nfev_passo2", res2.nfev)
+    _contar("njev_passo2", res2.njev)
+    info["nfev"] += int(res2.nfev)
+    info["parada_antecipada"] = res2.status == -2
+    info["variacao_max"] = float(np.max(np.abs(res2.x - estado["p_opt"]) / np.maximum(np.abs(estado["p_opt"]), 1e-12)))
+    return res2.x, res2.jac, info
 
-    CV_pct = np.zeros(p_par)
-    for idx_cv in range(p_par):
-        if abs(p_opt[idx_cv]) > 1e-10:
-            CV_pct[idx_cv] = (SE_param[idx_cv] / abs(p_opt[idx_cv])) * 100
+def _dois_passos(chute, t_step1, T_step1, pesos_step1, t_fit, T_fit, pesos, bounds_inf, bounds_sup, T_ini, a, motor,
+                 verbose=0, tol=1e-5, fases=("passo1", "passo2")):
+    """Passo 1 (Hill) seguido do passo 2 (9 parâmetros) a partir de chute: (res1, res2).
+
+    fases dá os nomes usados no perfil e nos contadores nfev_/njev_.
+    """
+    with fase(fases[0]):
+        res1 = _passo1(t_step1, T_step1, chute, bounds_inf, bounds_sup, T_ini, a, motor, pesos_step1, verbose, tol=tol)
+    _contar(f"nfev_{fases[0]}", res1.nfev)
+    _contar(f"njev_{fases[0]}", res1.njev)
+    chute_step2 = np.clip(np.array(list(res1.x) + [chute[6], chute[7], chute[8]]), bounds_inf, bounds_sup)
+    with fase(fases[1]):
+        res2 = _passo2(t_fit, T_fit, chute_step2, bounds_inf, bounds_sup, T_ini, a, motor, pesos, verbose, tol=tol)
+    _contar(f"nfev_{fases[1]}", res2.nfev)
+    _contar(f"njev_{fases[1]}", res2.njev)
+    res2.x0 = chute_step2
+    return res1, res2
+
+# Modelo barato das primeiras iterações: tabelas de Hill e de Bessel (erro em T ~1e-3 °C), sem nenhum nó
+# de quadratura. Um só nível, com tolerância frouxa: o modelo barato leva ao vale do custo e a
+# fidelidade completa só entra na convergência final (um segundo nível até tol 1e-5 repetiria o polimento).
+MOTOR_GROSSO = {"quadratura": "table", "bessel": "table"}
+NIVEIS_GROSSOS = ({"pontos": None, "tol": 1e-3},)
+
+def _ajuste_multifidelidade(cfg, chute, t_exp, T_exp, t_step1, T_step1, pesos_step1, t_fit, T_fit, pesos,
+                            bounds_inf, bounds_sup, T_ini, a, motor, verbose):
+    """Ajuste grosso-para-fino: níveis baratos (MOTOR_GROSSO) e só o polimento em fidelidade completa.
+
+    config["fidelidade"] = {"niveis": [{"pontos", "tol"}], "motor", "limiar"} troca o cronograma;
+    o primeiro nível faz os dois passos (pontos None = os da requisição, menos pontos = outra redução),
+    os seguintes só o passo 2. O passo 2 final parte do ótimo grosso com o motor da requisição, e dele
+    saem o jacobiano da covariância e as bandas. Verificação de consistência: no ótimo grosso, o custo
+    do modelo barato tem de concordar com o do completo até "limiar" (relativo, padrão 0.01); senão o
+    modelo barato enganou (fora do domínio das tabelas, por exemplo), e o ajuste em dois passos é
+    refeito do chute em fidelidade completa; fica o de menor custo.
+    """
+    fid = cfg.get("fidelidade")
+    if fid not in ("multi", True) and not isinstance(fid, dict):
+        raise ValueError("fidelidade deve ser 'multi', 'unica' ou {niveis, motor, limiar}.")
+    fid = fid if isinstance(fid, dict) else {}
+    desconhecidas = set(fid) - {"niveis", "motor", "limiar"}
+    desconhecidas |= {k for nivel in fid.get("niveis", ()) for k in nivel if k not in ("pontos", "tol")}
+    if desconhecidas:
+        raise ValueError(f"fidelidade: chaves desconhecidas {sorted(desconhecidas)} (níveis aceitam pontos e tol).")
+    motor_grosso = ler_motor({**MOTOR_GROSSO, **fid.get("motor", {})})
+    reducao = cfg.get("reducao") or DEFAULT_REDUCAO
+    reducao = dict(reducao) if isinstance(reducao, dict) else {"metodo": reducao}
+    raiz_w = 1.0 if pesos is None else np.sqrt(pesos)
+    custo = lambda m, x: 0.5 * np.sum((raiz_w * (calc_temperatura_centro(t_fit, x, T_ini=T_ini, a=a, motor=m) - T_fit))**2)
+
+    x = np.asarray(chute, dtype=float)
+    niveis = []
+    for k, nivel in enumerate(fid.get("niveis", NIVEIS_GROSSOS)):
+        tol = float(nivel.get("tol", 1e-3))
+        if nivel.get("pontos") is None or int(nivel["pontos"]) >= len(t_fit):
+            t_g, T_g, pesos_g, t_g1, T_g1, pesos_g1 = t_fit, T_fit, pesos, t_step1, T_step1, pesos_step1
+        else:
+            t_g, T_g, pesos_g, idx_pico = reduzir_pontos(t_exp, T_exp, {**reducao, "pontos": nivel["pontos"]})
+            no_passo1 = t_g <= t_exp[min(idx_pico + 5, len(t_exp) - 1)]
+            t_g1, T_g1, pesos_g1 = t_g[no_passo1], T_g[no_passo1], None if pesos_g is None else pesos_g[no_passo1]
+        if k == 0:
+            _, res = _dois_passos(x, t_g1, T_g1, pesos_g1, t_g, T_g, pesos_g, bounds_inf, bounds_sup, T_ini, a,
+                                  motor_grosso, verbose, tol=tol, fases=("grosso1", "grosso2"))
+        else:
+            with fase("grosso2"):
+                res = _passo2(t_g, T_g, x, bounds_inf, bounds_sup, T_ini, a, motor_grosso, pesos_g, verbose, tol=tol)
+            _contar("nfev_grosso2", res.nfev)
+            _contar("njev_grosso2", res.njev)
+        x = res.x
+        niveis.append({"pontos": len(t_g), "nfev": int(res.nfev)})
+
+    with fase("passo2"):
+        custo_barato, custo_grosso = custo(motor_grosso, x), custo(motor, x)
+        res = _passo2(t_fit, T_fit, x, bounds_inf, bounds_sup, T_ini, a, motor, pesos, verbose)
+    _contar("nfev_passo2", res.nfev)
+    _contar("njev_passo2", res.njev)
+
+    discrepancia = float(abs(custo_barato - custo_grosso) / custo_grosso) if custo_grosso > 0 else 0.0
+    consistente = discrepancia <= float(fid.get("limiar", 0.01))
+    info = {"niveis": niveis, "nfev_fino": int(res.nfev), "discrepancia_custo": discrepancia,
+            "queda_custo_fino": float(1.0 - res.cost / custo_grosso) if custo_grosso > 0 else 0.0,
+            "variacao_max": float(np.max(np.abs(res.x - x) / np.maximum(np.abs(x), 1e-12))),
+            "consistente": consistente, "refeito": False}
+    if not consistente:
+        _, res_c = _dois_passos(chute, t_step1, T_step1, pesos_step1, t_fit, T_fit, pesos, bounds_inf, bounds_sup,
+                                T_ini, a, motor, verbose)
+        info["refeito"] = True
+        if res_c.cost < res.cost:
+            res = res_c
+    return res.x, res.jac, info
+
+def run_otimizacao_quente(tempos, temperaturas, config=None, estado=None):
+    """run_otimizacao partindo a quente de estado["p_opt"] / estado["x_scale"] (se houver), sem cache
+    de resultados; estado é atualizado com o novo ótimo para a próxima chamada."""
+    estado = {} if estado is None else estado
+    return _com_perfil("otimizar_quente", config, _run_otimizacao, tempos, temperaturas, None, config, estado)
+
+def run_otimizacao(tempos, temperaturas, chute=None, config=None, status_cache=None):
+    """Ajuste em dois passos; config["perfil"] anexa tempos por fase e contadores à resposta.
+
+    config["multi_start"] = n (ou {"n", "poda", "manter_min", "semente"}) ajusta a partir de n
+    inícios de hipercubo latino no pool de processos e devolve também a dispersão dos ótimos locais.
+    config["reducao"] = "indice" | "bins" | "lttb" (ou {"metodo", "pontos"}) escolhe os pontos do ajuste.
+    config["incerteza"] = "bootstrap" | "monte_carlo" (ou {"metodo", "n", "tempo_max_s", "semente"})
+    troca os intervalos assintóticos por percentis de reajustes em dados sintéticos.
+    config["fidelidade"] = "multi" (ou {"niveis", "motor", "limiar"}) faz as primeiras iterações
+    num modelo barato e só a convergência final em fidelidade completa (ver _ajuste_multifidelidade).
+    Com o ARQUIVO de ajustes ativo, todo ajuste é gravado nele (config["arquivo"] = False desliga) e
+    config["arquivo"] = True (ou {"vizinhos", "limites", "folga", "distancia_max"}) parte do melhor
+    vizinho já ajustado (ver _chute_arquivo e _otimizar_arquivo).
+    A resposta vem do cache de resultados quando as entradas já foram ajustadas (config["cache"] = False
+    desliga); status_cache recebe a camada que atendeu.
+    """
+    if ARQUIVO.ativo and (config or {}).get("arquivo") is not False:
+        return _com_perfil("otimizar", config, _otimizar_arquivo, tempos, temperaturas, chute, config, status_cache)
+    arrays = {"tempos": tempos, "temperaturas": temperaturas, "chute": chute}
+    return _com_perfil("otimizar", config, _com_cache, "otimizar", arrays, config, status_cache,
+                       lambda: _run_otimizacao(tempos, temperaturas, chute, config))
+
+def _otimizar_arquivo(tempos, temperaturas, chute, config, status_cache):
+    """run_otimizacao com o ARQUIVO ativo: leitura dos vizinhos e gravação ficam fora do cache de resultados.
+
+    O chute e os limites vindos dos vizinhos entram na chave do cache, então uma resposta guardada só
+    é reaproveitada quando o ajuste partiria do mesmo ponto; o ajuste é gravado também nos acertos
+    do cache, e "arquivo" na resposta descreve sempre esta chamada.
+    """
+    cfg = dict(config or {})
+    arq_cfg = cfg.pop("arquivo", None)
+    T_ini = float(cfg.get("T_ini", DEFAULT_T_INI))
+    a = float(cfg["diametro"]) / 2.0 if "diametro" in cfg else float(cfg.get("raio", DEFAULT_A))
+    try:
+        motor = ler_motor(cfg)
+        t_exp, T_exp, t_fit, T_fit, pesos, _ = _pontos_ajuste(tempos, temperaturas, cfg.get("reducao"))
+    except ValueError as e:
+        return {"error": str(e)}
+    carac = caracteristicas_curva(t_exp, T_exp, T_ini, a)
+    arquivo = {}
+    if arq_cfg:
+        chute, bounds_inf, bounds_sup, arquivo = _chute_arquivo(
+            arq_cfg if isinstance(arq_cfg, dict) else {}, carac,
+            _to_beta_scale(chute if chute is not None else cfg.get("chute", DEFAULT_CHUTE)),
+            _to_beta_scale(cfg.get("bounds_inf", DEFAULT_BOUNDS_INF)), _to_beta_scale(cfg.get("bounds_sup", DEFAULT_BOUNDS_SUP)),
+            t_fit, T_fit, 1.0 if pesos is None else np.sqrt(pesos), T_ini, a, motor)
+        chute = [float(x) for x in chute]
+        cfg.update(bounds_inf=[float(x) for x in bounds_inf], bounds_sup=[float(x) for x in bounds_sup])
+    arrays = {"tempos": tempos, "temperaturas": temperaturas, "chute": chute}
+    out = _com_cache("otimizar", arrays, cfg, status_cache, lambda: _run_otimizacao(tempos, temperaturas, chute, cfg))
+    if "error" in out:
+        return out
+    p_opt = _to_beta_scale([p["estimado"] for p in out["parametros"]])
+    perfil = _PERFIL.get()
+    nfev = sum(n for nome, n in perfil.contadores.items() if nome.startswith("nfev_")) if perfil else 0
+    arquivo["id"] = ARQUIVO.gravar(carac, p_opt, custo=out.get("custo"), erro_mae=out["erro_mae"], nfev=nfev or None,
+                                   n_pontos=len(t_exp), rotulo=cfg.get("rotulo"))
+    return {**out, "arquivo": arquivo}
+
+def _run_otimizacao(tempos, temperaturas, chute, config, estado=None):
+    cfg = config or {}
+    T_ini = float(cfg.get("T_ini", DEFAULT_T_INI))
+    a = float(cfg["diametro"]) / 2.0 if "diametro" in cfg else float(cfg.get("raio", DEFAULT_A))
+    chute = chute if chute is not None else list(cfg.get("chute", DEFAULT_CHUTE))
+    bounds_inf = list(cfg.get("bounds_inf", DEFAULT_BOUNDS_INF))
+    bounds_sup = list(cfg.get("bounds_sup", DEFAULT_BOUNDS_SUP))
+    try:
+        motor = ler_motor(cfg)
+        T_limite = _ler_T_limite(cfg)
+        ms_cfg = _ler_multi_start(cfg)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    # Auto-converter de unidades físicas para escala beta se necessário
+    chute = _to_beta_scale(chute)
+    bounds_inf = _to_beta_scale(bounds_inf)
+    bounds_sup = _to_beta_scale(bounds_sup)
+
+    log.debug("chute (beta): %s; bounds (beta): %s .. %s; T_ini=%s, a=%s", chute, bounds_inf, bounds_sup, T_ini, a)
+    verbose = 2 if log.isEnabledFor(logging.DEBUG) else 0
+
+    try:
+        t_exp, T_exp, t_fit, T_fit, pesos, idx_pico_exp = _pontos_ajuste(tempos, temperaturas, cfg.get("reducao"))
+    except ValueError as e:
+        return {"error": str(e)}
+
+    no_passo1 = t_fit <= t_exp[min(idx_pico_exp + 5, len(t_exp) - 1)]  # Até o pico + pequena margem
+    t_step1, T_step1 = t_fit[no_passo1], T_fit[no_passo1]
+    pesos_step1 = None if pesos is None else pesos[no_passo1]
+    raiz_w = 1.0 if pesos is None else np.sqrt(pesos)
+
+    multi = quente = fidelidade = None
+    if estado is not None and estado.get("p_opt") is not None:
+        with fase("quente"):
+            p_opt, Fdot, quente = _ajuste_quente(estado, cfg, t_exp, T_exp, idx_pico_exp, t_step1, T_step1, pesos_step1,
+                                                 t_fit, T_fit, pesos, bounds_inf, bounds_sup, T_ini, a, motor, verbose)
+        p_hill_opt = chute_step2 = None
+    elif ms_cfg["n"] > 1:
+        with fase("multi_start"):
+            p_opt, Fdot, multi = _multi_start(ms_cfg, chute, bounds_inf, bounds_sup, t_step1, T_step1,
+                                              t_fit, T_fit, T_ini, a, motor, pesos_step1, pesos)
+        p_hill_opt = chute_step2 = None
+    elif cfg.get("fidelidade") not in (None, False, "unica"):
+        try:
+            p_opt, Fdot, fidelidade = _ajuste_multifidelidade(cfg, chute, t_exp, T_exp, t_step1, T_step1, pesos_step1,
+                                                              t_fit, T_fit, pesos, bounds_inf, bounds_sup, T_ini, a,
+                                                              motor, verbose)
+        except ValueError as e:
+            return {"error": str(e)}
+        p_hill_opt = chute_step2 = None
+    else:
+        # Médias por intervalo (reducao "bins", a única ponderada) têm ruído ~1/sqrt(n) do medido e custo
+        # no ótimo menor pelo mesmo fator: o ftol relativo equivalente ao do ajuste em todos os pontos é
+        # n vezes maior (sem isso o passo 2 rasteja no vale plano, abaixo do ruído)
+        tol = 1e-5 if pesos is None else min(1e-5 * len(t_exp) / len(t_fit), 1e-4)
+        res1, res2 = _dois_passos(chute, t_step1, T_step1, pesos_step1, t_fit, T_fit, pesos, bounds_inf, bounds_sup,
+                                  T_ini, a, motor, verbose, tol=tol)
+        p_hill_opt, chute_step2 = res1.x, res2.x0
+        p_opt, Fdot = res2.x, res2.jac
+    if estado is not None:
+        # Escala para o próximo ajuste a quente: a mesma que x_scale="jac" usaria (1 / norma das colunas)
+        normas = np.linalg.norm(Fdot, axis=0)
+        estado.update(p_opt=np.array(p_opt), x_scale=np.where(normas > 1e-12, 1.0 / np.maximum(normas, 1e-12), 1.0))
+    # Verificação cruzada: custo real vs custo reportado (resíduos ponderados, como no least_squares)
+    resid_check = calc_temperatura_centro(t_fit, p_opt, T_ini=T_ini, a=a, motor=motor) - T_fit
+    resid_w = raiz_w * resid_check
+    cost_check = 0.5 * np.sum(resid_w**2)
+    log.debug("passo 1: %s; passo 2: chute %s -> %s, cost_check=%.4e", p_hill_opt, chute_step2, p_opt, cost_check)
+
+    # --- Estatística Assintótica ---
+    with fase("covariancia"):
+        conf_raw = float(cfg.get("confianca", 95))
+        confianca_nivel = conf_raw / 100.0 if conf_raw > 1.0 else conf_raw
+        n_obs, p_par = len(t_fit), len(p_opt)
+        df_resid = n_obs - p_par
+        t_crit = stats.t.ppf(1 - (1 - confianca_nivel) / 2, df_resid)
+
+        # Jacobiano analítico (calc_jacobiano_centro, Fdot do passo 2) + residuais verificados (cross-check)
+        # Usar resíduos verificados (avaliados diretamente), não res2.fun
+        # que pode estar em escala interna diferente se x_scale foi usado
+        # Com pesos, Fdot já vem ponderado e s2 é a variância dos resíduos ponderados
+        s2 = np.sum(resid_w**2) / df_resid
+        s = np.sqrt(s2)
+
+        FtF_inv = _inversa_FtF(Fdot)
+        Sigma = s2 * FtF_inv
+        SE_param = np.sqrt(np.clip(np.diag(Sigma), 0, None))
+        IC_inf, IC_sup = p_opt - t_crit * SE_param, p_opt + t_crit * SE_param
+
+        CV_pct = np.zeros(p_par)
+        for idx_cv in range(p_par):
+            if abs(p_opt[idx_cv]) > 1e-10:
+                CV_pct[idx_cv] = (SE_param[idx_cv] / abs(p_opt[idx_cv])) * 100
 
     # --- Amostragem Final ---
-    indices_plot = np.unique(np.concatenate([np.where(t_exp < 2.0)[0], np.linspace(0, idx_pico_exp, 50, dtype=int), np.linspace(idx_pico_exp, len(t_exp)-1, 80, dtype=int)]))
-    indices_plot = indices_plot[indices_plot < len(t_exp)]
-    t_plot = t_exp[indices_plot]
-    T_plot = calc_temperatura_centro(t_plot, p_opt, T_ini=T_ini, a=a)
-    v_plot = calc_derivada_centro(t_plot, p_opt, a=a)
+    with fase("amostragem"):
+        inicio = np.where(t_exp < 2.0)[0]
+        inicio = inicio[np.linspace(0, len(inicio) - 1, min(len(inicio), 50), dtype=int)]  # no máximo 50: custo fixo para entradas grandes
+        indices_plot = np.unique(np.concatenate([inicio, np.linspace(0, idx_pico_exp, 50, dtype=int), np.linspace(idx_pico_exp, len(t_exp)-1, 80, dtype=int)]))
+        indices_plot = indices_plot[indices_plot < len(t_exp)]
+        t_plot = t_exp[indices_plot]
+        T_plot, v_plot = (x[0] for x in calc_temperatura_lote(t_plot, [p_opt], T_ini=T_ini, a=a, derivada=True, motor=motor))
 
     # Bandas usando eps_rel maior para diferenças fintas da curva (separado da estatística)
-    eps_band = 1e-2
-    Fdot_grade = np.zeros((len(t_plot), p_par))
-    for j in range(p_par):
-        h = max(eps_band * abs(p_opt[j]), 1e-4)
-        p_plus, p_minus = p_opt.copy(), p_opt.copy()
-        p_plus[j] += h
-        p_minus[j] -= h
-        T_plus = calc_temperatura_centro(t_plot, p_plus, T_ini=T_ini, a=a)
-        T_minus = calc_temperatura_centro(t_plot, p_minus, T_ini=T_ini, a=a)
-        Fdot_grade[:, j] = (T_plus - T_minus) / (2 * h)
-
-    se_curva = s * np.sqrt(np.clip(np.sum((Fdot_grade @ FtF_inv) * Fdot_grade, axis=1), 0, None))
-    CI_lwr, CI_upr = T_plot - t_crit * se_curva, T_plot + t_crit * se_curva
-
-    nomes_parametros = ["dT_adi1", "dT_adi2", "tau1", "beta1", "tau2", "beta2", "k_rel", "alpha1", "alpha2"]
+    # Os 2·p conjuntos p_opt ± h·e_j são avaliados numa única chamada em lote
+    with fase("bandas"):
+        eps_band = 1e-2
+        h = np.maximum(eps_band * np.abs(p_opt), 1e-4)
+        passos = np.diag(h)
+        p_band = np.concatenate([p_opt + passos, p_opt - passos])
+        T_band = calc_temperatura_lote(t_plot, p_band, T_ini=T_ini, a=a, motor=motor)
+        Fdot_grade = ((T_band[:p_par] - T_band[p_par:]) / (2 * h.reshape(-1, 1))).T
+
+        se_curva = s * np.sqrt(np.clip(np.sum((Fdot_grade @ FtF_inv) * Fdot_grade, axis=1), 0, None))
+        CI_lwr, CI_upr = T_plot - t_crit * se_curva, T_plot + t_crit * se_curva
+
+    inc_cfg = cfg.get("incerteza") or "assintotica"
+    inc_cfg = inc_cfg if isinstance(inc_cfg, dict) else {"metodo": inc_cfg}
+    incerteza = None
+    if inc_cfg.get("metodo", "assintotica") != "assintotica":
+        with fase("incerteza"):
+            try:
+                P_amostras, incerteza = _reamostrar(inc_cfg, p_opt, Fdot, resid_w, raiz_w, t_fit, T_fit, pesos,
+                                                    bounds_inf, bounds_sup, T_ini, a, motor)
+            except ValueError as e:
+                return {"error": str(e)}
+            if len(P_amostras) >= 10:
+                # Intervalos empíricos (percentis) e bandas de todas as amostras numa só avaliação em lote
+                q = 50 * (1 - confianca_nivel), 50 * (1 + confianca_nivel)
+                IC_inf, IC_sup = np.percentile(P_amostras, q, axis=0)
+                SE_param = P_amostras.std(axis=0, ddof=1)
+                CV_pct = np.where(np.abs(p_opt) > 1e-10, 100 * SE_param / np.maximum(np.abs(p_opt), 1e-10), 0.0)
+                T_amostras = calc_temperatura_lote(t_plot, P_amostras, T_ini=T_ini, a=a, motor=motor)
+                CI_lwr, CI_upr = np.percentile(T_amostras, q, axis=0)
+            else:
+                incerteza["aviso"] = "menos de 10 amostras no tempo disponível: mantidos os intervalos assintóticos"
+
     stats_data = []
     for i in range(p_par):
         est, ic_i, ic_s, se = float(p_opt[i]), float(IC_inf[i]), float(IC_sup[i]), float(SE_param[i])
@@ -307,25 +2137,508 @@ def run_otimizacao(tempos, temperaturas, chute=None, config=None):
             ic_i *= ALPHA_SCALE
             ic_s *= ALPHA_SCALE
             se *= ALPHA_SCALE
-        stats_data.append({"nome": nomes_parametros[i], "estimado": est, "se": se, "ic_inf": ic_i, "ic_sup": ic_s, "cv": float(CV_pct[i])})
+        stats_data.append({"nome": NOMES_PARAMETROS[i], "estimado": est, "se": se, "ic_inf": ic_i, "ic_sup": ic_s, "cv": float(CV_pct[i])})
 
-    return {
+    out = {
         "parametros": stats_data,
         "t_plot": t_plot.tolist(),
         "T_plot": T_plot.tolist(),
         "v_plot": v_plot.tolist(),
         "CI_lwr": CI_lwr.tolist(),
         "CI_upr": CI_upr.tolist(),
-        "erro_mae": float(np.mean(np.abs(res2.fun))),
+        "erro_mae": float(np.mean(np.abs(resid_check))),
+        "custo": float(cost_check),
         "confianca": confianca_nivel
     }
+    if cfg.get("reducao"):
+        out["reducao"] = {"pontos": len(t_fit), "ponderado": pesos is not None}
+    if multi is not None:
+        out["multi_start"] = multi
+    if quente is not None:
+        out["quente"] = quente
+    if fidelidade is not None:
+        out["fidelidade"] = fidelidade
+    if incerteza is not None:
+        out["incerteza"] = incerteza
+    if cfg.get("metricas") or T_limite is not None:
+        with fase("metricas"):
+            out["metricas"] = metricas_curva(p_opt, T_ini, a, t_exp[0], t_exp[-1], T_limite, motor)
+    if cfg.get("estatisticas_cache"):
+        out["cache"] = CACHE_GRADE.estatisticas()
+    return out
+
+
+# ==========================================================
+# AJUSTE CONJUNTO (vários sensores / tubulões com a mesma cinética)
+# ==========================================================
+NOMES_HILL = NOMES_PARAMETROS[:6]
+
+def _ajuste_empilhado(dados, x0, inf, sup, colunas, fixos, motor, esparso, passo):
+    """least_squares sobre os resíduos das séries empilhados.
+
+    dados[s] = (t, T, sqrt(pesos), T_ini, a); colunas[s][j] é o índice em x do parâmetro j da série s
+    (-1: fixo em fixos[s][j]). Cada série só toca as colunas globais e as suas, então o jacobiano é
+    esparso em blocos; com esparso=True ele é montado como CSR e resolvido com lsmr.
+    """
+    linhas = np.cumsum([0] + [len(d[0]) for d in dados])
+    livres = [c >= 0 for c in colunas]
+
+    def params(x, s):
+        p = fixos[s].copy()
+        p[livres[s]] = x[colunas[s][livres[s]]]
+        return p
+
+    def fun(x):
+        return np.concatenate([w * (calc_temperatura_centro(t, params(x, s), T_ini=T_ini, a=a, motor=motor) - T)
+                               for s, (t, T, w, T_ini, a) in enumerate(dados)])
+
+    def jac(x):
+        blocos = [np.reshape(w, (-1, 1)) * calc_jacobiano_centro(t, params(x, s), a=a, motor=motor)[:, livres[s]]
+                  for s, (t, T, w, T_ini, a) in enumerate(dados)]
+        if esparso:
+            linhas_nz = np.concatenate([np.repeat(np.arange(linhas[s], linhas[s + 1]), J.shape[1]) for s, J in enumerate(blocos)])
+            colunas_nz = np.concatenate([np.tile(colunas[s][livres[s]], J.shape[0]) for s, J in enumerate(blocos)])
+            valores = np.concatenate([J.ravel() for J in blocos])
+            return sparse.csr_matrix((valores, (linhas_nz, colunas_nz)), shape=(linhas[-1], len(x)))
+        J_total = np.zeros((linhas[-1], len(x)))
+        for s, J in enumerate(blocos):
+            J_total[linhas[s]:linhas[s + 1], colunas[s][livres[s]]] = J
+        return J_total
+
+    return least_squares(fun, x0, jac=jac, bounds=(inf, sup), method="trf", x_scale="jac", ftol=1e-5, xtol=1e-5,
+                         tr_solver="lsmr" if esparso else "exact", callback=_callback_passo(passo))
+
+def run_otimizacao_conjunta(series, chute=None, config=None):
+    """Ajuste conjunto de várias séries com cinética compartilhada.
+
+    series: [{id?, tempos, temperaturas, config?}]; a config de cada série (diametro/raio, T_ini) é
+    aplicada sobre config. config["globais"] lista os parâmetros comuns (padrão: os 6 de Hill); os
+    demais (k_rel, alphas) são ajustados por série. config["jacobiano"] = "auto" | "esparso" | "denso".
+    """
+    return _com_perfil("otimizar_conjunto", config, _run_otimizacao_conjunta, series, chute, config)
+
+def _run_otimizacao_conjunta(series, chute, config):
+    cfg = config or {}
+    if not series:
+        return {"error": "Envie ao menos uma série."}
+    globais = list(cfg.get("globais", NOMES_HILL))
+    if any(nome not in NOMES_PARAMETROS for nome in globais):
+        return {"error": f"globais deve conter nomes de {NOMES_PARAMETROS}"}
+    ig = sorted(NOMES_PARAMETROS.index(nome) for nome in globais)
+    il = [j for j in range(N_PARAMS) if j not in ig]
+    chute = np.array(_to_beta_scale(chute if chute is not None else cfg.get("chute", DEFAULT_CHUTE)), dtype=float)
+    inf = np.array(_to_beta_scale(cfg.get("bounds_inf", DEFAULT_BOUNDS_INF)), dtype=float)
+    sup = np.array(_to_beta_scale(cfg.get("bounds_sup", DEFAULT_BOUNDS_SUP)), dtype=float)
+    try:
+        motor = ler_motor(cfg)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    # Dados de cada série: pontos reduzidos (como em run_otimizacao), T_ini e raio próprios
+    dados, dados1, brutos = [], [], []
+    for k, serie in enumerate(series):
+        if not isinstance(serie, dict) or not isinstance(serie.get("config") or {}, dict):
+            return {"error": f"Série {k}: deve ser um objeto {{tempos, temperaturas, config?}}."}
+        c = {**cfg, **(serie.get("config") or {})}
+        try:
+            t = np.asarray(serie.get("tempos", []), dtype=float)
+            T = np.asarray(serie.get("temperaturas", []), dtype=float)
+            T_ini = float(c.get("T_ini", DEFAULT_T_INI))
+            a = float(c["diametro"]) / 2.0 if "diametro" in c else float(c.get("raio", DEFAULT_A))
+        except (TypeError, ValueError):
+            return {"error": f"Série {k}: 'tempos', 'temperaturas' e a config devem ser numéricos."}
+        if t.ndim != 1 or t.shape != T.shape:
+            return {"error": f"Série {k}: 'tempos' e 'temperaturas' devem ser listas do mesmo tamanho."}
+        ok = (t > 0.1) & np.isfinite(t) & np.isfinite(T)
+        ordem = np.argsort(t[ok], kind="stable")
+        t, T = t[ok][ordem], T[ok][ordem]
+        if len(t) < 2 * len(il) + 4:
+            return {"error": f"Série {k}: pontos válidos insuficientes ({len(t)})."}
+        try:
+            t_fit, T_fit, pesos, idx_pico = reduzir_pontos(t, T, c.get("reducao"))
+        except ValueError as e:
+            return {"error": str(e)}
+        w = np.ones(len(t_fit)) if pesos is None else np.sqrt(pesos)
+        no_passo1 = t_fit <= t[min(idx_pico + 5, len(t) - 1)]
+        dados.append((t_fit, T_fit, w, T_ini, a))
+        dados1.append((t_fit[no_passo1], T_fit[no_passo1], w[no_passo1], T_ini, a))
+        brutos.append((serie.get("id", k), t, T, idx_pico))
+
+    S = len(series)
+    modo = cfg.get("jacobiano", "auto")
+    esparso = modo == "esparso" or (modo == "auto" and S > 32)  # até ~100 parâmetros o QR denso ainda é mais rápido
+
+    # PASSO 1 conjunto: só Hill (comum a todas as séries), com k_rel = 1 e alphas iguais, como no ajuste simples
+    colunas1 = [np.array([0, 1, 2, 3, 4, 5, -1, -1, -1]) for _ in range(S)]
+    fixos1 = [np.array([0.0] * 6 + [1.0, chute[7], chute[7]]) for _ in range(S)]
+    with fase("passo1"):
+        res1 = _ajuste_empilhado(dados1, np.clip(chute[:6], inf[:6], sup[:6]), inf[:6], sup[:6],
+                                 colunas1, fixos1, motor, esparso, "passo1")
+    _contar("nfev_passo1", res1.nfev)
+    _contar("njev_passo1", res1.njev)
+
+    # PASSO 2 conjunto: x = [globais, locais da série 0, locais da série 1, ...]
+    colunas = []
+    for s in range(S):
+        c = np.empty(N_PARAMS, dtype=int)
+        c[ig] = np.arange(len(ig))
+        c[il] = len(ig) + s * len(il) + np.arange(len(il))
+        colunas.append(c)
+    p0 = np.clip(np.concatenate([res1.x, chute[6:]]), inf, sup)
+    x0 = np.concatenate([p0[ig]] + [p0[il]] * S)
+    x_inf = np.concatenate([inf[ig]] + [inf[il]] * S)
+    x_sup = np.concatenate([sup[ig]] + [sup[il]] * S)
+    with fase("passo2"):
+        res2 = _ajuste_empilhado(dados, x0, x_inf, x_sup, colunas, [p0] * S, motor, esparso, "passo2")
+    _contar("nfev_passo2", res2.nfev)
+    _contar("njev_passo2", res2.njev)
+
+    with fase("covariancia"):
+        x = res2.x
+        J = res2.jac.toarray() if sparse.issparse(res2.jac) else res2.jac
+        resid_w = res2.fun
+        n_obs = len(resid_w)
+        df_resid = max(n_obs - len(x), 1)
+        conf_raw = float(cfg.get("confianca", 95))
+        confianca_nivel = conf_raw / 100.0 if conf_raw > 1.0 else conf_raw
+        t_crit = stats.t.ppf(1 - (1 - confianca_nivel) / 2, df_resid)
+        SE = np.sqrt(np.clip(np.diag(np.sum(resid_w**2) / df_resid * _inversa_FtF(J)), 0, None))
+
+    def estatisticas(j, valor, se):
+        valor, se = float(valor), float(se)
+        fator = ALPHA_SCALE if j >= 7 else 1.0
+        return {"nome": NOMES_PARAMETROS[j], "estimado": valor * fator, "se": se * fator,
+                "ic_inf": (valor - t_crit * se) * fator, "ic_sup": (valor + t_crit * se) * fator,
+                "cv": 100 * se / abs(valor) if abs(valor) > 1e-10 else 0.0}
+
+    with fase("amostragem"):
+        saida_series = []
+        for s, ((t_fit, T_fit, _, T_ini, a), (ident, t, T, idx_pico)) in enumerate(zip(dados, brutos)):
+            p = x[colunas[s]]
+            idx_plot = np.unique(np.concatenate([np.linspace(0, idx_pico, 50, dtype=int),
+                                                 np.linspace(idx_pico, len(t) - 1, 80, dtype=int)]))
+            t_plot = t[idx_plot]
+            resid = calc_temperatura_centro(t_fit, p, T_ini=T_ini, a=a, motor=motor) - T_fit
+            saida_series.append({
+                "id": ident,
+                "parametros": [estatisticas(j, p[j], SE[colunas[s][j]]) for j in range(N_PARAMS)],
+                "erro_mae": float(np.mean(np.abs(resid))),
+                "t_plot": t_plot.tolist(),
+                "T_plot": calc_temperatura_centro(t_plot, p, T_ini=T_ini, a=a, motor=motor).tolist(),
+            })
+
+    return {
+        "globais": [estatisticas(j, x[k], SE[k]) for k, j in enumerate(ig)],
+        "series": saida_series,
+        "erro_mae": float(np.mean([s_["erro_mae"] for s_ in saida_series])),
+        "custo": float(res2.cost),
+        "n_parametros": len(x),
+        "jacobiano": "esparso" if esparso else "denso",
+        "confianca": confianca_nivel,
+    }
+
+def _tarefa_otimizacao(args):
+    tempos, temperaturas, chute, config = args
+    try:
+        return run_otimizacao(tempos, temperaturas, chute=chute, config=config)
+    except Exception as e:
+        log.exception("falha no ajuste do lote")
+        return {"error": str(e)}
+
+def otimizar_lote(conjuntos, config=None):
+    """Ajusta vários conjuntos {id?, tempos, temperaturas, chute?, config?} no pool de processos.
+
+    Gerador: produz {"indice", "id", **resultado} de cada conjunto assim que ele termina (fora de
+    ordem) e, por último, {"resumo": {...}}. config é a base sobre a qual cada config é aplicada.
+    Fechar o gerador cancela os ajustes que ainda não começaram.
+    """
+    t0 = time.perf_counter()
+    base = dict(config or {})
+    tarefas, erros = {}, 0
+    for i, c in enumerate(conjuntos):
+        c = c if isinstance(c, dict) else {}
+        if not c.get("tempos") or not c.get("temperaturas"):
+            erros += 1
+            yield {"indice": i, "id": c.get("id"), "error": "Conjunto sem 'tempos' e 'temperaturas'."}
+            continue
+        tarefas[i] = (c.get("id"), (c["tempos"], c["temperaturas"], c.get("chute"), {**base, **(c.get("config") or {})}))
+
+    pool = get_pool()
+    if pool is None:
+        concluidos = ((i, _tarefa_otimizacao(args)) for i, (_, args) in tarefas.items())
+    else:
+        futuros = {pool.submit(_tarefa_otimizacao, args): i for i, (_, args) in tarefas.items()}
+        concluidos = ((futuros[f], f.result() if f.exception() is None else {"error": str(f.exception())})
+                      for f in as_completed(futuros))
+    try:
+        for i, out in concluidos:
+            erros += "error" in out
+            yield {"indice": i, "id": tarefas[i][0], **out}
+    finally:
+        if pool is not None:
+            for f in futuros:
+                f.cancel()
+    yield {"resumo": {"total": len(conjuntos), "erros": erros, "workers": POOL_WORKERS,
+                      "tempo_s": time.perf_counter() - t0}}
+
+
+def run_campo(params, config=None, tempos=None, raios=None, status_cache=None):
+    """Campo T(r, t) (9 parâmetros) do centro ao solo, com a diferença centro-superfície no tempo.
+
+    raios: lista em m ou None (50 raios de 0 a config["r_max"], padrão 3·a, mais a própria interface).
+    """
+    arrays = {"params": params, "tempos": tempos, "raios": raios}
+    return _com_perfil("campo", config, _com_cache, "campo", arrays, config, status_cache,
+                       lambda: _run_campo(params, config, tempos, raios))
+
+def _run_campo(params, config, tempos, raios):
+    params = _to_beta_scale(params)
+    if len(params) != N_PARAMS:
+        return {"error": "params deve ter 9 elementos."}
+    try:
+        motor = ler_motor(config)
+    except ValueError as e:
+        return {"error": str(e)}
+    cfg = config or {}
+    T_ini = float(cfg.get("T_ini", DEFAULT_T_INI))
+    a = float(cfg["diametro"]) / 2.0 if "diametro" in cfg else float(cfg.get("raio", DEFAULT_A))
+    tempos = np.linspace(0.1, 100.0, 300) if tempos is None or len(tempos) == 0 else np.asarray(tempos, dtype=float)
+    if raios is None or len(raios) == 0:
+        raios = np.union1d(np.linspace(0.0, float(cfg.get("r_max", 3 * a)), int(cfg.get("n_raios", 50))), [a])
+    raios = np.asarray(raios, dtype=float)
+    if np.any(raios < 0):
+        return {"error": "raios devem ser não negativos."}
+    with fase("campo"):
+        T = calc_temperatura_campo(tempos, params, np.concatenate([raios, [0.0, a]]), T_ini, a, motor)
+    dT = T[-2] - T[-1]  # centro - superfície (r = a)
+    i = int(np.argmax(dT))
+    return {"raios": raios.tolist(), "tempos": tempos.tolist(), "T": T[:-2].tolist(),
+            "gradiente": {"dT_centro_superficie": dT.tolist(), "dT_max": float(dT[i]), "t_dT_max": float(tempos[i])}}
+
+# ==========================================================
+# VARREDURA DE PARÂMETROS (estudos de projeto)
+# ==========================================================
+VARREDURA_MAX = int(os.environ.get("VARREDURA_MAX", 1_000_000))  # combinações por requisição
+VARREDURA_BLOCO = 256  # conjuntos por tarefa
+VARREDURA_TEMPOS_MAX = int(os.environ.get("VARREDURA_TEMPOS_MAX", 20_000))  # instantes por curva
+VARREDURA_VALORES_MAX = int(os.environ.get("VARREDURA_VALORES_MAX", 10_000_000))  # valores na resposta
+_EIXOS_EXTRAS = ("params", "diametro", "raio", "T_ini")
 
+def _combinacoes_varredura(spec):
+    """(P (n, 9) em escala beta, raios (n,), T_ini (n,), eixos, forma) a partir de spec.
 
-def run_curva(params, config=None, tempos=None):
-    """Gera apenas a curva T x t (9 parâmetros). Sem regressão."""
+    spec["grade"] = {nome: [valores]} (produto cartesiano, na ordem das chaves) ou
+    spec["combinacoes"] = [{nome: valor}]; nomes: os 9 parâmetros, "params" (vetor completo, ex.:
+    traços de cimento), "diametro", "raio" e "T_ini". O que não varia vem de spec["base"] e da config.
+    """
+    cfg = spec.get("config") or {}
+    base = np.array(spec.get("base") or DEFAULT_CHUTE, dtype=float)
+    a_base = float(cfg["diametro"]) / 2.0 if "diametro" in cfg else float(cfg.get("raio", DEFAULT_A))
+    T_base = float(cfg.get("T_ini", DEFAULT_T_INI))
+    if len(base) != N_PARAMS:
+        raise ValueError("base deve ter 9 elementos.")
+
+    if spec.get("combinacoes") is not None:
+        linhas = list(spec["combinacoes"])
+        if len(linhas) > VARREDURA_MAX:
+            raise ValueError(f"{len(linhas)} combinações excedem o limite de {VARREDURA_MAX}.")
+        nomes = list(dict.fromkeys(k for linha in linhas for k in linha))
+        eixos, forma = None, (len(linhas),)
+        colunas = {k: [linha.get(k) for linha in linhas] for k in nomes}
+    else:
+        grade = spec.get("grade") or {}
+        nomes = list(grade)
+        eixos = [{"nome": k, "valores": list(grade[k])} for k in nomes]
+        forma = tuple(len(grade[k]) for k in nomes)
+        n = int(np.prod(forma)) if forma else 1
+        if n > VARREDURA_MAX:
+            raise ValueError(f"{n} combinações excedem o limite de {VARREDURA_MAX}.")
+        malha = np.unravel_index(np.arange(n), forma) if forma else ()
+        colunas = {k: [grade[k][i] for i in malha[j]] for j, k in enumerate(nomes)}
+    for k in nomes:
+        if k not in NOMES_PARAMETROS and k not in _EIXOS_EXTRAS:
+            raise ValueError(f"eixo desconhecido: {k}")
+    n = int(np.prod(forma)) if forma else 1
+
+    P = np.tile(base, (n, 1))
+    if "params" in colunas:
+        P = np.array([base if v is None else v for v in colunas["params"]], dtype=float).reshape(n, N_PARAMS)
+    for k in nomes:
+        if k in NOMES_PARAMETROS:
+            j = NOMES_PARAMETROS.index(k)
+            P[:, j] = [P[i, j] if v is None else v for i, v in enumerate(colunas[k])]
+    for j in (7, 8):  # alphas em unidades físicas -> escala beta, como em _to_beta_scale
+        P[:, j] = np.where(P[:, j] < 1.0, P[:, j] / ALPHA_SCALE, P[:, j])
+    raios = np.full(n, a_base)
+    if "raio" in colunas:
+        raios = np.array([a_base if v is None else v for v in colunas["raio"]], dtype=float)
+    if "diametro" in colunas:
+        raios = np.array([r if v is None else v / 2.0 for r, v in zip(raios, colunas["diametro"])], dtype=float)
+    T_ini = np.array([T_base if v is None else v for v in colunas.get("T_ini", [None] * n)], dtype=float)
+    return P, raios, T_ini, eixos, forma
+
+def _metricas_grade(t, T, dt=None):
+    """Pico (refinado por parábola em grades uniformes) e taxa máxima de aquecimento de cada curva."""
+    linhas = np.arange(T.shape[0])
+    i = np.argmax(T, axis=1)
+    t_pico, T_pico = t[i].copy(), T[linhas, i].copy()
+    interior = (i > 0) & (i < len(t) - 1)
+    if dt is not None and interior.any():
+        li, ii = linhas[interior], i[interior]
+        y0, y1, y2 = T[li, ii - 1], T[li, ii], T[li, ii + 1]
+        curv = y0 - 2 * y1 + y2
+        delta = np.where(curv < 0, 0.5 * (y0 - y2) / np.where(curv < 0, curv, -1.0), 0.0)
+        t_pico[interior] = t[ii] + delta * dt
+        T_pico[interior] = y1 - 0.25 * (y0 - y2) * delta
+    taxa = np.gradient(T, t, axis=1)
+    j = np.argmax(taxa, axis=1)
+    return {"t_pico": t_pico, "T_pico": T_pico, "pico_interior": interior,
+            "taxa_max": taxa[linhas, j], "t_taxa_max": t[j]}
+
+def _tarefa_varredura(args):
+    """Avalia um bloco (mesmo raio) da varredura: curvas ou métricas, em colunas."""
+    indices, P, a, T_ini, tempos, motor, saida, conv = args
+    dt = grade_uniforme(tempos)
+    if conv:
+        T = calc_temperatura_convolucao(tempos, P, T_ini=0.0, a=a, motor=motor)
+    else:
+        T = calc_temperatura_lote(tempos, P, T_ini=0.0, a=a, motor=motor)
+    T = T + T_ini.reshape(-1, 1)
+    out = {"indices": indices.tolist()}
+    if saida == "curvas":
+        out["T"] = T.astype(np.float32 if motor.get("float32") else float).tolist()
+    else:
+        out.update({k: v.tolist() for k, v in _metricas_grade(tempos, T, dt).items()})
+    return out
+
+def varredura(spec):
+    """Prepara a varredura: (cabeçalho, gerador de blocos em colunas, na ordem em que terminam).
+
+    Os conjuntos são agrupados por raio e divididos em blocos de VARREDURA_BLOCO, distribuídos no
+    pool de processos; grades de tempo uniformes finas o bastante (usar_convolucao, com
+    config["convolucao"] como em run_curva) usam a convolução por FFT (resposta do solo em cache por
+    raio/solo), as demais a inversão em lote. spec["saida"]: "metricas" (padrão) ou "curvas".
+    Levanta ValueError para specs inválidos.
+    """
+    cfg = spec.get("config") or {}
+    motor = ler_motor(cfg)
+    saida = spec.get("saida", "metricas")
+    if saida not in ("metricas", "curvas"):
+        raise ValueError("saida deve ser 'metricas' ou 'curvas'.")
+    tempos = spec.get("tempos") or {}
+    if isinstance(tempos, dict):
+        n_t = int(tempos.get("n", 2017))
+        if not 2 <= n_t <= VARREDURA_TEMPOS_MAX:
+            raise ValueError(f"tempos.n deve estar entre 2 e {VARREDURA_TEMPOS_MAX}.")
+        tempos = np.linspace(float(tempos.get("t_min", 0.0)), float(tempos.get("t_max", 168.0)), n_t)
+    tempos = np.asarray(tempos, dtype=float).ravel()
+    if not 1 <= tempos.size <= VARREDURA_TEMPOS_MAX:
+        raise ValueError(f"tempos deve ter entre 1 e {VARREDURA_TEMPOS_MAX} instantes.")
+    P, raios, T_ini, eixos, forma = _combinacoes_varredura(spec)
+    valores = len(P) * (tempos.size if saida == "curvas" else 5)
+    if valores > VARREDURA_VALORES_MAX:
+        raise ValueError(f"a resposta teria {valores} valores (limite {VARREDURA_VALORES_MAX}): "
+                         "reduza a grade, os instantes ou use saida='metricas'.")
+
+    conv = usar_convolucao(tempos, cfg.get("convolucao", "auto"))
+    cabecalho = {"n": len(P), "forma": list(forma), "eixos": eixos, "saida": saida,
+                 "motor": "convolucao" if conv else "laplace"}
+    if saida == "curvas":
+        cabecalho["tempos"] = tempos.tolist()
+
+    def blocos():
+        ordem = np.argsort(raios, kind="stable")
+        tarefas = []
+        for a in np.unique(raios):
+            grupo = ordem[raios[ordem] == a]
+            for i in range(0, len(grupo), VARREDURA_BLOCO):
+                idx = grupo[i:i + VARREDURA_BLOCO]
+                tarefas.append((idx, P[idx], float(a), T_ini[idx], tempos, motor, saida, conv))
+        pool = get_pool()
+        if pool is None:
+            for tarefa in tarefas:
+                yield _tarefa_varredura(tarefa)
+            return
+        # Janela limitada de blocos no pool: uma varredura grande não enfileira tudo na frente
+        # dos ajustes e jobs que compartilham o pool
+        pendentes, proximas = set(), iter(tarefas)
+        try:
+            while True:
+                for tarefa in itertools.islice(proximas, 2 * POOL_WORKERS - len(pendentes)):
+                    pendentes.add(pool.submit(_tarefa_varredura, tarefa))
+                if not pendentes:
+                    return
+                prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                for f in prontos:
+                    yield f.result()
+        finally:
+            for f in pendentes:
+                f.cancel()
+
+    return cabecalho, blocos()
+
+VARREDURA_STREAM_MIN = 200_000  # valores na resposta acima dos quais /api/sweep responde em NDJSON
+
+def juntar_varredura(cabecalho, blocos):
+    """Resposta única da varredura: colunas de todos os blocos, na ordem das combinações."""
+    n = cabecalho["n"]
+    colunas = {}
+    for bloco in blocos:
+        idx = bloco.pop("indices")
+        for k, v in bloco.items():
+            col = colunas.setdefault(k, [None] * n)
+            for i, x in zip(idx, v):
+                col[i] = x
+    return {**cabecalho, **colunas}
+
+
+def run_curva(params, config=None, tempos=None, status_cache=None):
+    """Gera apenas a curva T x t (9 parâmetros). Sem regressão; com cache de resultados como run_otimizacao.
+
+    config["convolucao"] (False por padrão, True ou "auto") usa calc_temperatura_convolucao em grades
+    uniformes; em "auto", só a partir de CONVOLUCAO_N_MIN pontos com passo até CONVOLUCAO_DT_MAX (ver
+    usar_convolucao). É opt-in porque a convolução tem erro O(dt²) próprio (décimos de °C em
+    passos de ~0.5 h), e a curva não deve mudar de motor conforme o número de pontos pedido.
+    """
+    arrays = {"params": params, "tempos": tempos}
+    return _com_perfil("curva", config, _com_cache, "curva", arrays, config, status_cache,
+                       lambda: _run_curva(params, config, tempos))
+
+def _curva_pontual(tempos, params, T_ini, a, motor):
+    """calc_temperatura_centro reaproveitando os instantes já avaliados para os mesmos parâmetros.
+
+    Cada instante é invertido de forma independente (nós s = k·ln2/t), então os pontos em comum com
+    grades anteriores saem de CACHE_PONTOS e só os novos passam pelo domínio de Laplace.
+    """
+    t = np.asarray(tempos, dtype=float)
+    chave = ("curva", chave_array(np.asarray(params, dtype=float)), float(T_ini), float(a),
+             tuple(sorted((k, v) for k, v in motor.items() if k != "memoria_mb")))
+    anterior = CACHE_PONTOS.consultar(chave)
+    t_c, T_c = anterior if anterior is not None else (np.empty(0), np.empty(0))
+    idx = np.minimum(np.searchsorted(t_c, t), max(len(t_c) - 1, 0))
+    achados = t_c[idx] == t if len(t_c) else np.zeros(len(t), dtype=bool)
+    _contar("pontos_reaproveitados", int(achados.sum()))
+    if achados.all():
+        return T_c[idx].copy()
+    novos = np.unique(t[~achados])
+    T_novos = calc_temperatura_centro(novos, params, T_ini=T_ini, a=a, motor=motor)
+    if len(t_c) + len(novos) > 200000:
+        t_c, T_c = np.empty(0, dtype=float), np.empty(0, dtype=T_novos.dtype)
+    t_m = np.concatenate([t_c, novos])
+    ordem = np.argsort(t_m, kind="stable")
+    t_m, T_m = t_m[ordem], np.concatenate([T_c, T_novos])[ordem]
+    CACHE_PONTOS.guardar(chave, (t_m, T_m))
+    return T_m[np.searchsorted(t_m, t)]
+
+def _run_curva(params, config, tempos):
     params = np.asarray(params, dtype=float).copy()
     if len(params) != N_PARAMS:
         return {"error": "params deve ter 9 elementos."}
+    try:
+        motor = ler_motor(config)
+        T_limite = _ler_T_limite(config or {})
+    except ValueError as e:
+        return {"error": str(e)}
     # Auto-converter alpha de unidades físicas para escala beta
     for idx in (7, 8):
         if params[idx] < 1.0:
@@ -338,8 +2651,24 @@ def run_curva(params, config=None, tempos=None):
         tempos = np.linspace(0.1, 100.0, 300)
     else:
         tempos = np.asarray(tempos, dtype=float)
-    T_plot = calc_temperatura_centro(tempos, params, T_ini=T_ini, a=a)
-    return {"t_plot": tempos.tolist(), "T_plot": T_plot.tolist()}
+    with fase("curva"):
+        if usar_convolucao(tempos, cfg.get("convolucao", False)):
+            T_plot = calc_temperatura_convolucao(tempos, [params], T_ini=T_ini, a=a, motor=motor)[0]
+        else:
+            T_plot = _curva_pontual(tempos, params, T_ini, a, motor)
+    out = {"t_plot": tempos.tolist(), "T_plot": T_plot.tolist()}
+    if cfg.get("comparar_inversao"):
+        with fase("comparar_inversao"):
+            out["inversao"] = comparar_inversoes(tempos, params, T_ini=T_ini, a=a, tol=float(cfg.get("tol_inversao", 1e-3)))
+    if cfg.get("metricas") or T_limite is not None:
+        t_pos = tempos[tempos > 0]
+        if t_pos.size == 0:
+            return {"error": "metricas exigem ao menos um instante positivo em 'tempos'."}
+        with fase("metricas"):
+            out["metricas"] = metricas_curva(params, T_ini, a, t_pos.min(), t_pos.max(), T_limite, motor)
+    if cfg.get("estatisticas_cache"):
+        out["cache"] = CACHE_GRADE.estatisticas()
+    return out
 
 
 if functions_framework is not None:
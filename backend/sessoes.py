@@ -0,0 +1,107 @@
+"""
+Sessões de monitoramento ao vivo: uma concretagem registrada recebe leituras novas e é reajustada
+a quente a partir do ajuste anterior (run_otimizacao_quente), em vez de recomeçar do DEFAULT_CHUTE.
+
+O estado (leituras, p_opt, escala) fica na memória do processo do servidor, com despejo LRU
+(SESSOES_MAX) e por inatividade (SESSOES_TTL_S).
+"""
+import array
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+from backend.main import run_otimizacao_quente
+
+SESSOES_MAX = int(os.environ.get("SESSOES_MAX", 64))
+SESSOES_TTL_S = float(os.environ.get("SESSOES_TTL_S", 12 * 3600))
+PONTOS_MIN = 20  # abaixo disso as leituras só são acumuladas
+
+
+class Sessao:
+    def __init__(self, sessao_id, config):
+        self.id = sessao_id
+        self.config = dict(config or {})
+        self.tempos, self.temperaturas = array.array("d"), array.array("d")
+        self.estado = {}  # p_opt e x_scale do último ajuste
+        self.resultado = None
+        self.ajustes = 0
+        self.criada = self.atualizada = time.time()
+        self.lock = threading.Lock()
+
+    def resumo(self):
+        return {"id": self.id, "pontos": len(self.tempos), "ajustes": self.ajustes, "config": self.config,
+                "criada": self.criada, "atualizada": self.atualizada}
+
+
+class GerenciadorSessoes:
+    """Sessões por id com limite de quantidade e de inatividade."""
+
+    def __init__(self, max_sessoes=SESSOES_MAX, ttl_s=SESSOES_TTL_S):
+        self.max_sessoes = max_sessoes
+        self.ttl_s = ttl_s
+        self._sessoes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _despejar(self):
+        agora = time.time()
+        for sessao_id in [s.id for s in self._sessoes.values() if agora - s.atualizada > self.ttl_s]:
+            del self._sessoes[sessao_id]
+        while len(self._sessoes) > self.max_sessoes:
+            self._sessoes.popitem(last=False)
+
+    def criar(self, config=None):
+        with self._lock:
+            sessao = Sessao(uuid.uuid4().hex, config)
+            self._sessoes[sessao.id] = sessao
+            self._despejar()
+        return sessao
+
+    def obter(self, sessao_id):
+        with self._lock:
+            self._despejar()
+            sessao = self._sessoes.get(sessao_id)
+            if sessao is not None:
+                self._sessoes.move_to_end(sessao_id)
+            return sessao
+
+    def remover(self, sessao_id):
+        with self._lock:
+            return self._sessoes.pop(sessao_id, None) is not None
+
+    def anexar(self, sessao_id, tempos, temperaturas, reajustar=True):
+        """Acrescenta leituras e reajusta a quente; None se a sessão não existir.
+
+        Leituras com tempo não posterior à última já registrada são ignoradas (reenvios do logger).
+        """
+        sessao = self.obter(sessao_id)
+        if sessao is None:
+            return None
+        t = np.asarray(tempos, dtype=float)
+        T = np.asarray(temperaturas, dtype=float)
+        if t.shape != T.shape:
+            return {"error": "'tempos' e 'temperaturas' devem ter o mesmo tamanho."}
+        with sessao.lock:
+            ultimo = sessao.tempos[-1] if sessao.tempos else -np.inf
+            novos = (t > ultimo) & np.isfinite(t) & np.isfinite(T)
+            sessao.tempos.extend(t[novos])
+            sessao.temperaturas.extend(T[novos])
+            sessao.atualizada = time.time()
+            info = {"sessao": sessao.id, "novos": int(novos.sum()), "pontos": len(sessao.tempos)}
+            if not reajustar or len(sessao.tempos) < PONTOS_MIN:
+                return info
+            t0 = time.perf_counter()
+            out = run_otimizacao_quente(np.array(sessao.tempos), np.array(sessao.temperaturas),
+                                        config=sessao.config, estado=sessao.estado)
+            if "error" in out:
+                return {**out, "sessao": info}
+            sessao.ajustes += 1
+            sessao.resultado = out
+            out["sessao"] = {**info, "ajustes": sessao.ajustes, "tempo_ms": 1e3 * (time.perf_counter() - t0)}
+            return out
+
+
+SESSOES = GerenciadorSessoes()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""Benchmark do motor térmico e do ajuste - roda direto sem servidor web.
+
+Mede, contra o próprio backend.main:
+  - get_theta_bar_centro, calc_temperatura_centro e calc_derivada_centro em grades de tempo crescentes
+    (vazão em pontos/s, pico de memória via tracemalloc e erro contra a referência Euler-16);
+  - run_otimizacao em dados sintéticos como os de scripts/diag_regression.py (diâmetros, ruídos e
+    comprimentos variados): tempo, nfev/njev, MAE e erro dos parâmetros de Hill;
+  - os mesmos ajustes em fidelidade única e com o cronograma grosso-para-fino (integrandos de
+    quadratura, chamadas dos kernels, tempo e MAE);
+  - o ajuste com reducao "bins" (médias ponderadas por intervalo) contra o ajuste em todos os pontos:
+    nfev e erro dos parâmetros de Hill;
+  - uma sessão de monitoramento recebendo leituras depois do pico: tempo e nfev das atualizações
+    a quente, passo 1 pulado e parada antecipada, contra o ajuste do zero;
+  - as quadraturas adaptativas ("fast", "standard") contra o Gauss-Legendre de 150 nós ("reference")
+    em conjuntos suaves: nós por coluna de s, tempo e erro contra "standard";
+  - o CACHE_GRADE depois de uma curva longa: despejos e misses ao repetir as avaliações de um ajuste.
+
+Uso:
+  python scripts/benchmark.py                                  # imprime o JSON
+  python scripts/benchmark.py --saida resultado.json
+  python scripts/benchmark.py --gravar-baseline                # atualiza benchmarks/baseline.json
+  python scripts/benchmark.py --baseline benchmarks/baseline.json --tol-tempo 0.3
+  python scripts/benchmark.py --config '{"quadratura": "table", "bessel": "table"}'
+Com --baseline o script sai com código 1 se algum caso ficar mais lento que a tolerância ou
+menos preciso que o registrado; sai com código 1 também se o cronograma grosso-para-fino não
+calcular menos integrandos que o ajuste em fidelidade única, ou perder precisão, se a redução
+"bins" precisar de mais avaliações ou errar mais que o ajuste em todos os pontos, se as
+atualizações a quente depois do pico não pularem o passo 1 ou nunca pararem antes, se "fast" ou
+"standard" usarem tantos nós quanto "reference" em conjuntos suaves, e se uma curva longa
+despejar do CACHE_GRADE as entradas de um ajuste.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+import numpy as np
+from backend.sessoes import GerenciadorSessoes
+from backend.main import (
+    run_otimizacao, calc_temperatura_centro, calc_derivada_centro, calc_temperatura_lote, calc_jacobiano_centro,
+    get_theta_bar_centro, _grade_inversao, ler_motor, CACHE_GRADE, Perfil, _PERFIL
+)
+
+BASELINE_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "baseline.json")
+P_REF = [50.0, 45.0, 8.0, 2.5, 40.0, 1.8, 3.5, 35.0, 25.0]
+T_INI = 20.0
+MOTOR_REF = {"inversao": ("euler", 16), "quadratura": "standard"}
+
+def medir(funcao, repeticoes):
+    """Melhor tempo (ms) em 'repeticoes' execuções e pico de memória (MB) de uma execução extra.
+
+    O cache de grades é esvaziado antes de cada execução, para que repetições não se beneficiem
+    das anteriores (o reaproveitamento dentro de um mesmo ajuste continua medido).
+    """
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        CACHE_GRADE.limpar()
+        t0 = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - t0)
+    CACHE_GRADE.limpar()
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, 1e3 * melhor, pico / 2**20
+
+def bench_kernels(tamanhos, config, repeticoes):
+    motor = ler_motor(config)
+    casos = {}
+    for n in tamanhos:
+        t = np.geomspace(0.1, 500.0, n)
+        S, _ = _grade_inversao(t, motor["inversao"])
+        ref = calc_temperatura_centro(t, P_REF, T_INI, 0.7, motor=MOTOR_REF)
+        ref_v = calc_derivada_centro(t, P_REF, 0.7, motor=MOTOR_REF)
+        for nome, funcao, erro in (
+            ("get_theta_bar_centro", lambda: get_theta_bar_centro(S, P_REF, 0.7, motor), None),
+            ("calc_temperatura_centro", lambda: calc_temperatura_centro(t, P_REF, T_INI, 0.7, motor=motor), ref),
+            ("calc_derivada_centro", lambda: calc_derivada_centro(t, P_REF, 0.7, motor=motor), ref_v),
+        ):
+            res, ms, mb = medir(funcao, repeticoes)
+            caso = {"n": n, "tempo_ms": ms, "pontos_por_s": n / (ms / 1e3), "pico_mb": mb}
+            if erro is not None:
+                caso["erro_max"] = float(np.max(np.abs(res - erro)))
+            casos[f"{nome}/n={n}"] = caso
+    return casos
+
+def dados_sinteticos(diametro, ruido, n, seed=42):
+    """Curva como a de diag_regression.py (aquecimento, pico, resfriamento) com n pontos e ruído gaussiano."""
+    t = np.concatenate([np.linspace(0.5, 10, n * 2 // 5), np.linspace(12, 40, n * 3 // 10),
+                        np.linspace(45, 120, n - n * 2 // 5 - n * 3 // 10)])
+    T = calc_temperatura_lote(t, [P_REF], T_INI, diametro / 2, motor=MOTOR_REF)[0]
+    return t, T + np.random.default_rng(seed).normal(0, ruido, len(t))
+
+def bench_ajustes(diametros, ruidos, comprimentos, config, repeticoes):
+    casos = {}
+    for d in diametros:
+        for ruido in ruidos:
+            for n in comprimentos:
+                t, T = dados_sinteticos(d, ruido, n)
+                cfg = {**config, "T_ini": T_INI, "diametro": d, "perfil": True, "cache": False}
+                out, ms, mb = medir(lambda: run_otimizacao(t.tolist(), T.tolist(), config=cfg), repeticoes)
+                if "error" in out:
+                    casos[f"ajuste/d={d}/ruido={ruido}/n={n}"] = {"erro": out["error"]}
+                    continue
+                est = np.array([p["estimado"] for p in out["parametros"][:6]])
+                cont = out["perfil"]["contadores"]
+                casos[f"ajuste/d={d}/ruido={ruido}/n={n}"] = {
+                    "tempo_ms": ms, "pico_mb": mb, "erro_mae": out["erro_mae"],
+                    "erro_rel_hill": float(np.max(np.abs(est - P_REF[:6]) / np.array(P_REF[:6]))),
+                    "nfev": cont.get("nfev_passo1", 0) + cont.get("nfev_passo2", 0),
+                    "njev": cont.get("njev_passo1", 0) + cont.get("njev_passo2", 0),
+                }
+    return casos
+
+def bench_fidelidade(diametros, ruidos, comprimentos, config, repeticoes):
+    """Ajuste em fidelidade única contra o cronograma grosso-para-fino (config["fidelidade"] = "multi")."""
+    casos = {}
+    for d in diametros:
+        for ruido in ruidos:
+            for n in comprimentos:
+                t, T = dados_sinteticos(d, ruido, n)
+                caso = {}
+                for sufixo, extra in (("_unica", {}), ("", {"fidelidade": "multi"})):
+                    cfg = {**config, **extra, "T_ini": T_INI, "diametro": d, "perfil": True, "cache": False}
+                    out, ms, _ = medir(lambda: run_otimizacao(t.tolist(), T.tolist(), config=cfg), repeticoes)
+                    cont = out["perfil"]["contadores"]
+                    caso.update({f"tempo_ms{sufixo}": ms, f"erro_mae{sufixo}": out["erro_mae"],
+                                 f"integrandos{sufixo}": cont.get("integrandos", 0),
+                                 f"kernels{sufixo}": cont.get("kernel_theta", 0) + cont.get("kernel_jacobiano", 0)})
+                casos[f"fidelidade/d={d}/ruido={ruido}/n={n}"] = caso
+    return casos
+
+def bench_reducao(repeticoes):
+    """Ajuste com reducao "bins" (100 médias ponderadas) contra o ajuste em todos os 400 pontos."""
+    t, T = dados_sinteticos(1.4, 0.1, 400)
+    caso = {}
+    for sufixo, reducao in (("", "bins"), ("_completo", {"metodo": "indice", "pontos": len(t)})):
+        cfg = {"T_ini": T_INI, "diametro": 1.4, "reducao": reducao, "perfil": True, "cache": False}
+        out, ms, _ = medir(lambda: run_otimizacao(t.tolist(), T.tolist(), config=cfg), repeticoes)
+        est = np.array([p["estimado"] for p in out["parametros"][:6]])
+        caso.update({f"tempo_ms{sufixo}": ms, f"nfev_passo2{sufixo}": out["perfil"]["contadores"].get("nfev_passo2", 0),
+                     f"erro_rel_hill{sufixo}": float(np.max(np.abs(est - P_REF[:6]) / np.array(P_REF[:6])))})
+    return {"reducao/bins/n=400": caso}
+
+def bench_sessao():
+    """Sessão com leituras até 60 h (pico passado) e mais cinco blocos de 0.5 h, ajustados a quente."""
+    t = np.arange(0.5, 120.0, 0.25)
+    T = calc_temperatura_lote(t, [P_REF], T_INI, 0.7)[0] + np.random.default_rng(0).normal(0, 0.3, len(t))
+    config = {"T_ini": T_INI, "diametro": 1.4}
+    sessoes = GerenciadorSessoes()
+    sessao = sessoes.criar(config)
+    sessoes.anexar(sessao.id, t[t < 60.0], T[t < 60.0])
+    atualizacoes = []
+    for fim in (60.5, 61.0, 61.5, 62.0, 62.5):
+        bloco = (t >= fim - 0.5) & (t < fim)
+        t0 = time.perf_counter()
+        quente = sessoes.anexar(sessao.id, t[bloco], T[bloco])["quente"]
+        atualizacoes.append({**quente, "tempo_ms": 1e3 * (time.perf_counter() - t0)})
+    _, ms_frio, _ = medir(lambda: run_otimizacao(t[t < 62.5].tolist(), T[t < 62.5].tolist(),
+                                                 config={**config, "cache": False}), 1)
+    return {"sessao/quente": {
+        "tempo_ms": max(a["tempo_ms"] for a in atualizacoes), "tempo_ms_frio": ms_frio,
+        "nfev": [a["nfev"] for a in atualizacoes],
+        "passo1_pulado": sum(a["passo1_pulado"] for a in atualizacoes),
+        "paradas_antecipadas": sum(a["parada_antecipada"] for a in atualizacoes), "atualizacoes": len(atualizacoes)}}
+
+def bench_quadraturas(tamanhos, repeticoes):
+    """Nós por coluna de s, tempo e erro das camadas de quadratura em um conjunto (P_REF) e em 18
+    conjuntos suaves (P_REF ±20%), com o erro medido contra "standard"."""
+    conjuntos = {"1": np.array([P_REF]),
+                 "18": np.array(P_REF) * np.random.default_rng(1).uniform(0.8, 1.2, (18, len(P_REF)))}
+    casos = {}
+    for n in tamanhos[:2]:
+        t = np.geomspace(0.1, 500.0, n)
+        n_s = _grade_inversao(t, ler_motor({})["inversao"])[0].size
+        for nome, P in conjuntos.items():
+            ref = calc_temperatura_lote(t, P, T_INI, 0.7, motor={"quadratura": "standard"})
+            for quadratura in ("reference", "fast", "standard"):
+                perfil = Perfil()
+                token = _PERFIL.set(perfil)
+                try:
+                    res, ms, _ = medir(lambda: calc_temperatura_lote(t, P, T_INI, 0.7, motor={"quadratura": quadratura}),
+                                       repeticoes)
+                finally:
+                    _PERFIL.reset(token)
+                execucoes = repeticoes + 1  # medir() roda uma vez a mais para o pico de memória
+                casos[f"quadratura/{quadratura}/conjuntos={nome}/n={n}"] = {
+                    "tempo_ms": ms, "erro_max": float(np.max(np.abs(res - ref))),
+                    "nos_por_coluna": perfil.contadores.get("integrandos", 0) / (execucoes * P.shape[0] * n_s)}
+    return casos
+
+def bench_cache():
+    """Entradas pequenas do CACHE_GRADE (as de um ajuste) antes e depois de uma curva longa.
+
+    A curva longa passa pelos blocos de instantes do avaliador (10^4 pontos) ou, com memoria_mb alto,
+    por um único bloco de ~62 MB (acima do limite por entrada); nenhuma pode despejar as do ajuste.
+    """
+    t = np.geomspace(0.5, 120.0, 100)
+    motor = {**ler_motor({}), "alphas_fixos": True}
+    pequenas = lambda: (calc_temperatura_centro(t, P_REF, T_INI, 0.7, motor=motor),
+                        calc_jacobiano_centro(t, P_REF, 0.7, motor=motor))
+    casos = {}
+    for nome, n_longo, config in (("blocos", 10000, {}), ("bloco_unico", 2700, {"memoria_mb": 4096})):
+        CACHE_GRADE.limpar()
+        pequenas()
+        antes = CACHE_GRADE.estatisticas()
+        t0 = time.perf_counter()
+        calc_temperatura_centro(np.linspace(0.1, 500.0, n_longo), P_REF, T_INI, 0.7, motor=ler_motor(config))
+        ms = 1e3 * (time.perf_counter() - t0)
+        depois = CACHE_GRADE.estatisticas()
+        pequenas()
+        fim = CACHE_GRADE.estatisticas()
+        casos[f"cache_grade/{nome}/n={n_longo}"] = {
+            "tempo_ms": ms, "evictions": depois["evictions"] - antes["evictions"],
+            "recusadas": depois["recusadas"] - antes["recusadas"],
+            "misses_repeticao": fim["misses"] - depois["misses"], "hits_repeticao": fim["hits"] - depois["hits"]}
+    CACHE_GRADE.limpar()
+    return casos
+
+def verificar(atual):
+    """Invariantes que não dependem do baseline: o cronograma grosso-para-fino calcula menos
+    integrandos de quadratura que o ajuste em fidelidade única, com o mesmo erro final, a redução
+    "bins" não custa mais avaliações nem erra mais que o ajuste em todos os pontos, as atualizações a
+    quente depois do pico pulam o passo 1 e param antes quando o custo para de cair, "fast" e
+    "standard" usam menos nós que "reference" em conjuntos suaves sem perder precisão, e uma
+    curva longa não despeja do CACHE_GRADE as entradas de um ajuste."""
+    falhas = []
+    for chave, caso in atual["casos"].items():
+        if chave == "sessao/quente":
+            if caso["passo1_pulado"] < caso["atualizacoes"]:
+                falhas.append(f"{chave}: passo 1 pulado em {caso['passo1_pulado']} de {caso['atualizacoes']} atualizações depois do pico")
+            if not caso["paradas_antecipadas"]:
+                falhas.append(f"{chave}: nenhuma parada antecipada em {caso['atualizacoes']} atualizações (nfev {caso['nfev']})")
+        if chave.startswith("reducao/"):
+            if caso["nfev_passo2"] > caso["nfev_passo2_completo"]:
+                falhas.append(f"{chave}: nfev do passo 2 {caso['nfev_passo2']} > {caso['nfev_passo2_completo']} em todos os pontos")
+            if caso["erro_rel_hill"] > caso["erro_rel_hill_completo"] + 0.05:
+                falhas.append(f"{chave}: erro_rel_hill {caso['erro_rel_hill']:.3f} > {caso['erro_rel_hill_completo']:.3f} em todos os pontos")
+        if chave.startswith(("quadratura/fast/", "quadratura/standard/")):
+            ref = atual["casos"][chave.replace("/fast/", "/reference/").replace("/standard/", "/reference/")]
+            if caso["nos_por_coluna"] >= ref["nos_por_coluna"]:
+                falhas.append(f"{chave}: {caso['nos_por_coluna']:.0f} nós por coluna >= {ref['nos_por_coluna']:.0f} em reference")
+            if caso["erro_max"] > max(ref["erro_max"], 1e-6):
+                falhas.append(f"{chave}: erro_max {caso['erro_max']:.1e} > {ref['erro_max']:.1e} em reference")
+        if chave.startswith("cache_grade/") and (caso["evictions"] or caso["misses_repeticao"]):
+            falhas.append(f"{chave}: {caso['evictions']} despejos e {caso['misses_repeticao']} misses ao repetir o ajuste")
+        if chave.startswith("fidelidade/"):
+            if caso["integrandos"] >= caso["integrandos_unica"]:
+                falhas.append(f"{chave}: {caso['integrandos']} integrandos >= {caso['integrandos_unica']} em fidelidade única")
+            if caso["erro_mae"] > caso["erro_mae_unica"] * (1 + 1e-3):
+                falhas.append(f"{chave}: erro_mae {caso['erro_mae']:.6f} > {caso['erro_mae_unica']:.6f} em fidelidade única")
+    return falhas
+
+def comparar(atual, baseline, tol_tempo, tol_erro):
+    """Lista de regressões: tempo acima de (1 + tol_tempo)·baseline ou erro acima de (1 + tol_erro)·baseline."""
+    falhas = []
+    for chave, base in baseline["casos"].items():
+        caso = atual["casos"].get(chave)
+        if caso is None:
+            continue
+        if "tempo_ms" in base and caso.get("tempo_ms", 0) > (1 + tol_tempo) * base["tempo_ms"]:
+            falhas.append(f"{chave}: tempo {caso['tempo_ms']:.1f} ms > {base['tempo_ms']:.1f} ms (+{100 * tol_tempo:.0f}%)")
+        for campo in ("erro_max", "erro_mae"):
+            if campo in base and caso.get(campo, 0) > (1 + tol_erro) * base[campo] + 1e-9:
+                falhas.append(f"{chave}: {campo} {caso[campo]:.3e} > {base[campo]:.3e}")
+    return falhas
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--config", default="{}", help="config do motor (JSON), como na API")
+    ap.add_argument("--rapido", action="store_true", help="grades e ajustes reduzidos")
+    ap.add_argument("--repeticoes", type=int, default=3)
+    ap.add_argument("--saida", help="grava o JSON neste arquivo")
+    ap.add_argument("--baseline", help="compara com este JSON e falha em regressão")
+    ap.add_argument("--gravar-baseline", action="store_true", help=f"grava o resultado em {BASELINE_PADRAO}")
+    ap.add_argument("--tol-tempo", type=float, default=0.25)
+    ap.add_argument("--tol-erro", type=float, default=0.5)
+    args = ap.parse_args()
+    config = json.loads(args.config)
+
+    if args.rapido:
+        tamanhos, diametros, ruidos, comprimentos = (100, 1000), (1.4,), (0.5,), (50,)
+    else:
+        tamanhos, diametros, ruidos, comprimentos = (100, 1000, 10000), (1.0, 1.4, 2.0), (0.1, 0.5), (50, 200)
+
+    resultado = {
+        "meta": {"config": config, "python": platform.python_version(), "numpy": np.__version__,
+                 "maquina": platform.machine(), "processador": platform.processor(), "rapido": args.rapido},
+        "casos": {**bench_kernels(tamanhos, config, args.repeticoes),
+                  **bench_ajustes(diametros, ruidos, comprimentos, config, max(1, args.repeticoes - 2)),
+                  **bench_fidelidade(diametros, ruidos, comprimentos, config, 1),
+                  **bench_reducao(1),
+                  **bench_sessao(),
+                  **bench_quadraturas(tamanhos, args.repeticoes),
+                  **bench_cache()},
+    }
+    texto = json.dumps(resultado, indent=2)
+    print(texto)
+    if args.saida:
+        with open(args.saida, "w") as f:
+            f.write(texto + "\n")
+    if args.gravar_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PADRAO), exist_ok=True)
+        with open(BASELINE_PADRAO, "w") as f:
+            f.write(texto + "\n")
+    falhas = verificar(resultado)
+    if args.baseline:
+        with open(args.baseline) as f:
+            falhas += comparar(resultado, json.load(f), args.tol_tempo, args.tol_erro)
+    for falha in falhas:
+        print("REGRESSÃO:", falha, file=sys.stderr)
+    if falhas:
+        sys.exit(1)
+    if args.baseline:
+        print("Sem regressões em relação ao baseline.", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
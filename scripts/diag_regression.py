@@ -5,7 +5,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 import numpy as np
 from backend.main import (
-    run_otimizacao, calc_temperatura_centro, get_stehfest_V,
+    run_otimizacao, calc_temperatura_centro, calc_jacobiano_centro, get_stehfest_V,
     get_theta_bar_centro, _to_beta_scale, ALPHA_SCALE,
     DEFAULT_CHUTE, DEFAULT_BOUNDS_INF, DEFAULT_BOUNDS_SUP
 )
@@ -50,9 +50,12 @@ print(f"Bounds sup: {bounds_sup}")
 def residuals(p):
     return calc_temperatura_centro(tempos_synth, p, T_ini=T_ini, a=a) - T_synth
 
+def jac(p):
+    return calc_jacobiano_centro(tempos_synth, p, a=a)
+
 print("\n--- Rodando least_squares (9 params, todos livres) ---")
-res = least_squares(residuals, chute, bounds=(bounds_inf, bounds_sup),
-                    method="trf", x_scale="jac", diff_step=1e-6, verbose=2)
+res = least_squares(residuals, chute, jac=jac, bounds=(bounds_inf, bounds_sup),
+                    method="trf", x_scale="jac", verbose=2)
 
 print(f"\nStatus: {res.status} — {res.message}")
 print(f"nfev: {res.nfev}, njev: {res.njev}")
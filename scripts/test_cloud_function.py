@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
-Testa se a Cloud Function (ou o servidor local) está respondendo corretamente.
+Testa se a Cloud Function (ou o servidor local) está respondendo corretamente e se configs
+inválidas (multi_start não numérico ou fora da faixa) voltam como 400 com {"error": ...}.
 Uso:
   python scripts/test_cloud_function.py
   python scripts/test_cloud_function.py https://us-central1-PROJECT.cloudfunctions.net/otimizar_tubulao
@@ -15,6 +16,29 @@ import urllib.request
 tempos = [0.2, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0, 12.0, 15.0, 20.0]
 temperaturas = [25.1, 25.3, 25.8, 26.2, 26.5, 26.8, 27.0, 27.2, 27.3, 27.4, 27.5, 27.6, 27.7, 27.7, 27.8, 27.8, 27.9, 27.9, 28.0]
 
+# Configs que devem ser recusadas com 400 (e não derrubar o ajuste com 500)
+CONFIGS_INVALIDAS = [
+    {"multi_start": "abc"},
+    {"multi_start": {"n": "x"}},
+    {"multi_start": 10**6},
+    {"multi_start": {"n": 2, "poda": 0.5}},
+]
+
+def verificar_invalidas(url):
+    """Lista de falhas: configs de CONFIGS_INVALIDAS que não voltaram como 400 com "error"."""
+    falhas = []
+    for config in CONFIGS_INVALIDAS:
+        payload = json.dumps({"tempos": tempos, "temperaturas": temperaturas, "config": config}).encode("utf-8")
+        req = urllib.request.Request(url, data=payload, method="POST", headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=120) as resp:
+                falhas.append(f"{config}: status {resp.status}, esperado 400")
+        except urllib.error.HTTPError as e:
+            body = e.read().decode("utf-8")
+            if e.code != 400 or "error" not in json.loads(body or "{}"):
+                falhas.append(f"{config}: HTTP {e.code} {body[:200]}")
+    return falhas
+
 def main():
     url = (
         os.environ.get("TEST_GCF_URL")
@@ -40,6 +64,12 @@ def main():
             print("erro_mae:", data.get("erro_mae"))
             print("t_plot length:", len(data.get("t_plot", [])))
             print("CI_lwr/CI_upr:", "OK" if data.get("CI_lwr") and data.get("CI_upr") else "ausente")
+        falhas = verificar_invalidas(url)
+        for falha in falhas:
+            print("Config inválida aceita:", falha)
+        if falhas:
+            sys.exit(1)
+        print("Configs inválidas:", len(CONFIGS_INVALIDAS), "recusadas com 400")
     except urllib.error.HTTPError as e:
         body = e.read().decode("utf-8")
         print("HTTP Error", e.code, body[:500])
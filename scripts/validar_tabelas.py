@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Valida as tabelas de Hill e de Bessel contra os caminhos exatos - roda direto sem servidor web.
+
+Uso: python scripts/validar_tabelas.py [n_conjuntos]
+Imprime um JSON com os erros das funções tabeladas e o erro em T (°C) para conjuntos de
+parâmetros aleatórios dentro dos limites padrão.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import json
+import time
+import numpy as np
+from backend.main import (
+    calc_temperatura_lote, validar_bessel_tabela, get_tabela_hill, ln_g_hill,
+    DEFAULT_BOUNDS_INF, DEFAULT_BOUNDS_SUP
+)
+
+n_conjuntos = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+rng = np.random.default_rng(0)
+
+# ln g(x, beta) da tabela de Hill contra a integral direta
+lnx = rng.uniform(-25.0, 25.0, 2000)
+beta = np.exp(rng.uniform(np.log(0.5), np.log(10.0), 2000))
+exato = np.array([ln_g_hill([x], [b])[0, 0] for x, b in zip(lnx, beta)])
+erro_hill = float(np.max(np.abs(get_tabela_hill().ev(lnx, np.log(beta)) - exato)))
+
+# T(t) com as tabelas contra a quadratura de referência em alta resolução
+lo, hi = np.array(DEFAULT_BOUNDS_INF), np.array(DEFAULT_BOUNDS_SUP)
+P = lo + (hi - lo) * rng.random((n_conjuntos, len(lo)))
+tempos = np.linspace(0.5, 200.0, 200)
+motor_ref = {"inversao": ("stehfest", 10), "quadratura": "standard", "bessel": "exact"}
+T_ref = calc_temperatura_lote(tempos, P, 20.0, 0.7, motor=motor_ref)
+erros_T = {}
+for quadratura, bessel in (("reference", "exact"), ("table", "exact"), ("reference", "table"), ("table", "table")):
+    t0 = time.time()
+    T = calc_temperatura_lote(tempos, P, 20.0, 0.7, motor={**motor_ref, "quadratura": quadratura, "bessel": bessel})
+    erros_T[f"{quadratura}/{bessel}"] = {
+        "erro_max": float(np.max(np.abs(T - T_ref))),
+        "erro_mediano": float(np.median(np.abs(T - T_ref))),
+        "tempo_ms": 1000 * (time.time() - t0),
+    }
+
+print(json.dumps({
+    "hill_ln_g_erro_max": erro_hill,
+    "bessel_erro_relativo_max": validar_bessel_tabela(),
+    "T_vs_standard": erros_T,
+}, indent=2))